@@ -9,22 +9,122 @@ load_dotenv()
 
 # API Configuration
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+FAST_RESPONSE_ENABLED = os.getenv("FAST_RESPONSE_ENABLED", "1") == "1"  # /ask* dikirim sebagai bytes siap kirim (tanpa validasi ulang response_model)
 
 # LLM Configuration - Model hemat token
 LLM_MODEL = "llama-3.1-8b-instant"  # Model yang lebih cepat dan hemat token
 LLM_TEMPERATURE = 0.5  # Sedikit lebih tinggi untuk jawaban lebih natural
 LLM_MAX_TOKENS = 200  # Cukup untuk penjelasan informatif
+LLM_MODEL_LARGE = os.getenv("LLM_MODEL_LARGE") or LLM_MODEL  # Tier "large" untuk intent tertentu (default = model yang sama)
+
+# LLM Gateway Configuration - koneksi, kuota, dan concurrency ke provider
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None  # Override endpoint (mis. fake server lokal untuk benchmark)
+LLM_TIMEOUT = 10.0  # Timeout per request ke provider (detik)
+LLM_HTTP2 = True  # Dipakai hanya jika paket h2 terpasang
+LLM_MAX_CONNECTIONS = 32  # Ukuran pool koneksi keep-alive
+LLM_KEEPALIVE_EXPIRY = 60.0  # Koneksi idle ditutup setelah N detik
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))  # Kuota provider (0 = tanpa batas)
+LLM_BURST = 5  # Kapasitas token bucket (request beruntun yang boleh lolos sekaligus)
+LLM_CONCURRENCY_INITIAL = 8  # Batas concurrency awal (AIMD)
+LLM_CONCURRENCY_MIN = 1
+LLM_CONCURRENCY_MAX = 32
+LLM_LATENCY_TARGET = 3.0  # Latency di atas ini dianggap overload, batas concurrency diturunkan (detik)
+LLM_QUEUE_TIMEOUT = 5.0  # Maksimal menunggu slot sebelum menyerah (detik)
+LLM_MAX_RETRIES = 2  # Retry untuk 429 / 5xx / timeout
+LLM_BACKOFF_BASE = 0.25  # Backoff eksponensial dengan full jitter (detik)
+LLM_BACKOFF_MAX = 4.0
 
 # Cache Configuration
 CACHE_ENABLED = True
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # memory | sqlite | redis
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", "data/cache.sqlite3")  # Dipakai bersama semua worker
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_WARM_ENTRIES = 500  # Entry terpopuler yang dimuat ke semantic index saat startup (0 = nonaktif)
 CACHE_TTL = 3600  # Time to live: 1 jam (dalam detik)
+CACHE_MAX_ENTRIES = 10000  # Maksimal jumlah entry sebelum eviction LRU
+CACHE_MAX_BYTES = 32 * 1024 * 1024  # Budget memori cache (perkiraan, dalam byte)
+CACHE_SWEEP_INTERVAL = 100  # Sweep entry expired setiap N operasi cache
+SEMANTIC_CACHE_ENABLED = True  # Lookup near-duplicate saat exact match gagal
+
+# Answer Table Configuration - jawaban prerender saat build (scripts/prerender_answers.py)
+ANSWER_TABLE_ENABLED = True
+ANSWER_TABLE_PATH = os.getenv("ANSWER_TABLE_PATH", "data/answers.bin")
+PRERENDER_CONCURRENCY = 4  # LLM call paralel saat prerender
+
+# Batch Configuration
+BATCH_MAX_QUESTIONS = 500  # Maksimal pertanyaan per request /ask/batch
+BATCH_LLM_CONCURRENCY = 8  # Maksimal LLM call paralel dalam satu batch
 
 # Retrieval Configuration
-MAX_CONTEXT_LENGTH = 500  # Maksimal karakter context yang dikirim ke LLM
-SIMILARITY_THRESHOLD = 0.6  # Threshold untuk menentukan relevansi
+RETRIEVAL_SNAPSHOT_PATH = os.getenv("RETRIEVAL_SNAPSHOT_PATH", "data/retrieval_snapshot.pkl")  # Kosong = selalu parse JSON
+DATA_RELOAD_INTERVAL = float(os.getenv("DATA_RELOAD_INTERVAL", "0"))  # Polling perubahan JSON (detik, 0 = nonaktif)
+MAX_CONTEXT_TOKENS = 180  # Budget token context yang dikirim ke LLM (diisi field utuh)
+TOKENIZER_LOAD_TIMEOUT = float(os.getenv("TOKENIZER_LOAD_TIMEOUT", "5"))  # Batas load encoding tiktoken saat startup, lewat = estimasi heuristik (detik)
+RETRIEVAL_TOP_K = 5  # Jumlah passage BM25 teratas yang dipertimbangkan untuk context
+PASSAGE_LIST_CHUNK = 8  # List panjang (fasilitas, mitra) dipotong per N item per passage
+SIMILARITY_THRESHOLD = 0.7  # Threshold kemiripan (soft token Jaccard, semua token harus berpasangan) untuk semantic cache
+
+# Normalizer Configuration - slang/singkatan + koreksi typo sebelum direct answer dan cache
+NORMALIZER_ENABLED = True
+NORMALIZER_MAX_EDIT_DISTANCE = 2  # Jarak edit maksimal koreksi typo (token <= 6 huruf: 1)
+NORMALIZER_MIN_TOKEN_LENGTH = 4  # Token lebih pendek hanya lewat kamus slang (tidak dikoreksi)
+NORMALIZER_CACHE_SIZE = 20_000  # Hasil koreksi per token yang diingat
+NORMALIZER_CONVERSION_BACKLOG = 4096  # Pertanyaan ternormalisasi yang dicek jalurnya saat /stats dibaca
+
+# Intent Router Configuration - klasifikasi intent lokal (CPU) sebelum LLM call
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "1") == "1"
+INTENT_DATA_PATH = "data/intents.tsv"  # Data latih berlabel: <intent><TAB><pertanyaan>
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "data/intent_model.json")  # Bobot hasil training (kosong = training di memori)
+INTENT_HASH_BUCKETS = 2 ** 18  # Dimensi hashing n-gram
+INTENT_TRAIN_EPOCHS = 30
+INTENT_MIN_CONFIDENCE = 0.7  # Di bawah ini intent hanya dicatat, pertanyaan diteruskan ke LLM seperti biasa
+INTENT_MODEL_TIERS = {  # Tier model LLM per intent (small = LLM_MODEL, large = LLM_MODEL_LARGE)
+    "direct": "small",
+    "structured": "small",
+    "retrieval": "large",
+    "off_topic": "small",
+    "greeting": "small"
+}
+
+# Rate Limit & Admission Control - per client (IP / API key) dan load shedding LLM
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_PATHS = ("/ask",)  # Prefix path yang dibatasi (/ask, /ask/batch, /ask/stream)
+RATE_LIMIT_REQUESTS_PER_MINUTE = float(os.getenv("RATE_LIMIT_REQUESTS_PER_MINUTE", "120"))  # Semua request per client
+RATE_LIMIT_BURST = 30
+RATE_LIMIT_LLM_PER_MINUTE = float(os.getenv("RATE_LIMIT_LLM_PER_MINUTE", "10"))  # Request yang butuh LLM per client
+RATE_LIMIT_LLM_BURST = 5
+RATE_LIMIT_MAX_CLIENTS = 100_000  # Client yang dilacak (~100 byte per client per bucket)
+RATE_LIMIT_API_KEY_HEADER = "X-API-Key"  # Jika dikirim, limit per API key (di-hash) bukan per IP
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "0") == "1"  # Aktifkan di belakang reverse proxy
+ADMISSION_MAX_LLM_QUEUE = 32  # Request LLM yang menunggu di gateway; di atas ini request baru ditolak 429
+CORS_ALLOW_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ALLOW_ORIGINS", "*").split(",") if origin.strip()]
+
+# Session Configuration - riwayat ringkas per session untuk pertanyaan lanjutan
+SESSION_IDLE_TTL = 1800  # Session dibuang setelah idle N detik
+SESSION_MAX_TURNS = 6  # Turn terakhir yang disimpan per session
+SESSION_MAX_BYTES = 2048  # Batas memori per session (perkiraan, byte)
+SESSION_MAX_SESSIONS = 50_000  # Session aktif maksimal (LRU)
+SESSION_MEMORY_BUDGET = 96 * 1024 * 1024  # Budget memori semua session (perkiraan, byte; ~50k session penuh)
+SESSION_FOLLOWUP_MAX_TOKENS = 2  # Pertanyaan tanpa keyword dengan token bermakna <= N dianggap lanjutan
+SESSION_QUESTION_CHARS = 160  # Pertanyaan dipotong sebelum disimpan di riwayat
+
+# Tenant Configuration - satu deployment untuk banyak sekolah (school_id di request)
+TENANTS_DIR = os.getenv("TENANTS_DIR", "data/tenants")  # <school_id>.json (+ <school_id>.answers.bin opsional)
+TENANT_SNAPSHOT_DIR = os.getenv("TENANT_SNAPSHOT_DIR", "data/tenants/.snapshots")  # Kosong = selalu parse JSON
+TENANT_MAX_LOADED = int(os.getenv("TENANT_MAX_LOADED", "500"))  # Tenant yang boleh dimuat bersamaan (LRU)
+TENANT_IDLE_TTL = 900  # Tenant tanpa request selama N detik dibongkar dari memori
+TENANT_MEMORY_BUDGET = 256 * 1024 * 1024  # Budget memori indeks semua tenant (perkiraan, byte)
+
+# Tracing Configuration - breakdown latency per request dan sampling profiler
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "1") == "1"  # Izinkan trace lewat header debug (0 = header diabaikan)
+TRACE_HEADER = "X-Debug-Trace"  # Kirim "X-Debug-Trace: 1" untuk mendapat metadata.timings + Server-Timing
+REQUEST_ID_HEADER = "X-Request-ID"  # Dipakai ulang dari client jika valid, selain itu dibuat baru
+PROFILER_MAX_SECONDS = 120.0  # Batas durasi satu sesi sampling profiler
 
 # Prompt Template - Natural dan informatif
-SYSTEM_PROMPT = """Kamu chatbot SMKN 4 Bojonegoro yang membantu siswa dengan ramah dan informatif.
+# {school} diisi nama sekolah milik tenant (profil.nama_singkat / profil.nama)
+SCHOOL_NAME = "SMKN 4 Bojonegoro"  # Nama sekolah deployment default (tanpa school_id)
+SYSTEM_PROMPT_TEMPLATE = """Kamu chatbot {school} yang membantu siswa dengan ramah dan informatif.
 
 Aturan:
 - Jawab dengan bahasa natural seperti manusia
@@ -33,3 +133,4 @@ Aturan:
 - Format: definisi singkat + penjelasan jika perlu
 - Jangan bilang "tidak tahu" jika bisa dijelaskan
 - Ringkas tapi informatif"""
+SYSTEM_PROMPT = SYSTEM_PROMPT_TEMPLATE.format(school=SCHOOL_NAME)
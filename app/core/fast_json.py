@@ -0,0 +1,63 @@
+"""
+Fast JSON module
+Serialisasi response jalur panas tanpa validasi ulang response_model dan jsonable_encoder
+- orjson jika terpasang (opsional), jika tidak json stdlib (separator ringkas, UTF-8 apa adanya)
+- PreEncoded: str jawaban yang membawa bentuk JSON-nya (bytes); dibuat sekali saat data di-load
+  (direct answer) atau saat disimpan ke cache, jawaban panjang tidak di-encode ulang per request
+- RawJSONResponse: body bytes dikirim apa adanya
+"""
+import json
+from typing import Any, Dict
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def encoder_name() -> str:
+    return "orjson" if orjson is not None else "json"
+
+class PreEncoded(str):
+    """
+    str biasa untuk semua pemakaian lain; encoded = string JSON-nya (dengan tanda kutip)
+    Ikut ter-pickle (snapshot retrieval): __new__ dipanggil ulang dengan teks aslinya
+    """
+    def __new__(cls, text: str) -> "PreEncoded":
+        value = super().__new__(cls, text)
+        value.encoded = dumps(str(text))
+        return value
+
+def preencode(text: str) -> str:
+    return text if type(text) is PreEncoded else PreEncoded(text)
+
+def encode_string(text: str) -> bytes:
+    return text.encoded if type(text) is PreEncoded else dumps(text)
+
+def encode_answer(result: Dict[str, Any]) -> bytes:
+    """
+    Response /ask ({"jawaban", "source", "metadata", ...}) sebagai bytes
+    Jawaban pre-encoded disambung apa adanya; sisanya (metadata kecil) di-encode per request
+    """
+    rest = dumps({key: value for key, value in result.items() if key != "jawaban"})
+    if len(rest) <= 2:
+        return b'{"jawaban":' + encode_string(result["jawaban"]) + b"}"
+    return b'{"jawaban":' + encode_string(result["jawaban"]) + b"," + rest[1:]
+
+def encode_batch(batch: Dict[str, Any]) -> bytes:
+    return (b'{"results":[' + b",".join(encode_answer(result) for result in batch["results"])
+            + b'],"metadata":' + dumps(batch["metadata"]) + b"}")
+
+class RawJSONResponse(Response):
+    """
+    Response JSON tanpa validasi / konversi: bytes dikirim apa adanya, selain itu di-encode dumps()
+    """
+    media_type = "application/json"
+    
+    def render(self, content: Any) -> bytes:
+        return content if isinstance(content, bytes) else dumps(content)
@@ -1,28 +1,78 @@
 """
 LLM initialization module
 Menginisialisasi Groq LLM dengan konfigurasi hemat token
+Import langchain_groq / httpx dan pembuatan client ditunda sampai LLM benar-benar
+dibutuhkan, sehingga cold start yang hanya menjawab direct/cache tidak membayarnya
 """
-from langchain_groq import ChatGroq
+import importlib.util
+import threading
 from app.core.config import (
     GROQ_API_KEY,
     LLM_MODEL,
     LLM_TEMPERATURE,
-    LLM_MAX_TOKENS
+    LLM_MAX_TOKENS,
+    LLM_BASE_URL,
+    LLM_TIMEOUT,
+    LLM_HTTP2,
+    LLM_MAX_CONNECTIONS,
+    LLM_KEEPALIVE_EXPIRY
 )
 
-def get_llm():
+_llms = {}
+_llm_lock = threading.Lock()
+
+def _http_options() -> dict:
+    """
+    Opsi pool HTTP bersama: keep-alive, batas koneksi, dan HTTP/2 jika h2 tersedia
+    """
+    import httpx
+    
+    return {
+        "http2": LLM_HTTP2 and importlib.util.find_spec("h2") is not None,
+        "limits": httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+        ),
+        "timeout": httpx.Timeout(LLM_TIMEOUT, connect=3.0)
+    }
+
+def get_llm(model_name: str = LLM_MODEL):
     """
     Mengembalikan instance LLM yang sudah dikonfigurasi
-    Menggunakan model hemat token dengan parameter optimal
+    Menggunakan model hemat token dengan parameter optimal (model_name: tier lain dari intent router)
+    Retry ditangani LLM gateway (backoff + rate limit), bukan oleh client
     """
+    import httpx
+    from langchain_groq import ChatGroq
+    
+    options = {"base_url": LLM_BASE_URL} if LLM_BASE_URL else {}
     return ChatGroq(
         groq_api_key=GROQ_API_KEY,
-        model_name=LLM_MODEL,
+        model_name=model_name,
         temperature=LLM_TEMPERATURE,
         max_tokens=LLM_MAX_TOKENS,
-        timeout=10,  # Timeout 10 detik
-        max_retries=2  # Retry maksimal 2 kali
+        timeout=LLM_TIMEOUT,
+        max_retries=0,
+        http_client=httpx.Client(**_http_options()),
+        http_async_client=httpx.AsyncClient(**_http_options()),
+        **options
     )
 
-# Instance LLM global yang bisa digunakan di seluruh aplikasi
-llm = get_llm()
+def get_shared_llm(model_name: str = LLM_MODEL):
+    """
+    Instance LLM global per model, dibuat sekali saat pertama kali dibutuhkan (thread-safe)
+    """
+    llm = _llms.get(model_name)
+    if llm is None:
+        with _llm_lock:
+            llm = _llms.get(model_name)
+            if llm is None:
+                llm = _llms[model_name] = get_llm(model_name)
+    return llm
+
+def __getattr__(name: str):
+    # `from app.core.llm import llm` tetap berfungsi, client baru dibuat saat diakses
+    if name == "llm":
+        return get_shared_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
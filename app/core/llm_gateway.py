@@ -0,0 +1,417 @@
+"""
+LLM Gateway module
+Lapisan di depan provider LLM: token bucket sesuai kuota provider,
+batas concurrency adaptif (AIMD), antrian dengan deadline, dan retry
+dengan jittered backoff. Kegagalan dilempar sebagai LLMUnavailableError
+sehingga pemanggil bisa membedakan error dari jawaban (dan tidak meng-cache-nya)
+Satu gateway (kuota + limiter) dipakai semua tier model (intent router)
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional
+from app.core.config import (
+    LLM_MODEL,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_BURST,
+    LLM_CONCURRENCY_INITIAL,
+    LLM_CONCURRENCY_MIN,
+    LLM_CONCURRENCY_MAX,
+    LLM_LATENCY_TARGET,
+    LLM_QUEUE_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE,
+    LLM_BACKOFF_MAX
+)
+from app.core.llm import get_shared_llm
+from app.core.metrics import Counter
+from app.core.tracing import span
+
+GATEWAY_EVENTS = Counter("chatbot_llm_gateway_events_total",
+                         "Event LLM gateway (call, success, retry, rate_limited, queue_timeout, failure)",
+                         ["event"])
+
+class LLMUnavailableError(Exception):
+    """
+    LLM tidak bisa menjawab (kuota habis, antrian penuh, atau provider error)
+    """
+    def __init__(self, reason: str, rate_limited: bool = False, retry_after: Optional[float] = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.rate_limited = rate_limited
+        self.retry_after = retry_after
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        """
+        rate: token per detik (0 = tanpa batas)
+        capacity: jumlah token maksimal (burst)
+        """
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+    
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def try_take(self, now: float) -> float:
+        """
+        Ambil satu token jika ada
+        Return: 0 jika berhasil, atau perkiraan detik sampai token berikutnya tersedia
+        (dipanggil di bawah lock milik gateway)
+        """
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+    
+    def drain(self, now: float) -> None:
+        """
+        Kosongkan bucket (provider sudah menolak dengan 429)
+        """
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+
+class AIMDLimiter:
+    def __init__(self, initial: float, minimum: float, maximum: float, latency_target: float):
+        """
+        Additive increase (+1 per "putaran" sukses), multiplicative decrease
+        saat 429 (x0.5), latency di atas target atau 5xx / timeout (x0.9).
+        Penurunan hanya sekali per jendela latency agar burst 429 tidak meruntuhkan batas
+        """
+        self.limit = float(initial)
+        self.minimum = float(minimum)
+        self.maximum = float(maximum)
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self._last_decrease = 0.0
+    
+    def has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+    
+    def on_success(self, latency: float, now: float) -> None:
+        if latency > self.latency_target:
+            self._decrease(0.9, now, latency)
+        else:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+    
+    def on_overload(self, now: float, window: float) -> None:
+        self._decrease(0.5, now, window)
+    
+    def on_failure(self, now: float, window: float) -> None:
+        self._decrease(0.9, now, window)
+    
+    def _decrease(self, factor: float, now: float, window: float) -> None:
+        if now - self._last_decrease < window:
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * factor)
+
+class _Waiter:
+    """
+    Satu pemanggil di antrian FIFO gateway; dibangunkan saat slot / giliran mungkin tersedia
+    Pemanggil sync menunggu threading.Event, pemanggil async menunggu asyncio.Event di loop-nya
+    (wake() aman dipanggil dari thread mana pun)
+    """
+    __slots__ = ("event", "loop")
+    
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.event = asyncio.Event() if loop is not None else threading.Event()
+    
+    def wake(self) -> None:
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self.event.set)
+
+class LLMGateway:
+    def __init__(self, llm: Any = None,
+                 requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+                 burst: float = LLM_BURST,
+                 queue_timeout: float = LLM_QUEUE_TIMEOUT,
+                 max_retries: int = LLM_MAX_RETRIES,
+                 llm_factory: Callable[..., Any] = get_shared_llm):
+        """
+        llm: objek dengan invoke / ainvoke / astream (ChatGroq atau fake untuk test),
+        jika diberikan dipakai untuk semua tier model
+        llm_factory: dipakai jika llm None, dipanggil (dengan nama model untuk tier lain)
+        saat LLM call pertama per model (lazy)
+        State limiter dijaga satu threading.Lock sehingga sama untuk
+        pemanggil sync (threadpool) maupun async (event loop)
+        """
+        self._llm = llm
+        self._injected = llm is not None
+        self._llm_factory = llm_factory
+        self._models: Dict[str, Any] = {}
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self.limiter = AIMDLimiter(LLM_CONCURRENCY_INITIAL, LLM_CONCURRENCY_MIN,
+                                   LLM_CONCURRENCY_MAX, LLM_LATENCY_TARGET)
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._waiters: Deque[_Waiter] = deque()
+    
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+    
+    @property
+    def llm(self) -> Any:
+        if self._llm is None:
+            self._llm = self._llm_factory()
+        return self._llm
+    
+    def llm_for(self, model: Optional[str]) -> Any:
+        """
+        Instance LLM untuk model tertentu (None / LLM_MODEL = instance default)
+        """
+        if model is None or model == LLM_MODEL or self._injected:
+            return self.llm
+        llm = self._models.get(model)
+        if llm is None:
+            llm = self._models[model] = self._llm_factory(model)
+        return llm
+    
+    def _wake_head(self) -> None:
+        # Dipanggil di bawah lock
+        if self._waiters:
+            self._waiters[0].wake()
+    
+    def _try_admit(self, waiter: _Waiter) -> Optional[float]:
+        """
+        Hanya kepala antrian yang boleh mengambil slot + token (FIFO)
+        Return: 0 jika didapat, detik sampai token berikutnya, atau None (tunggu dibangunkan)
+        """
+        with self._lock:
+            waiter.event.clear()
+            if self._waiters[0] is not waiter or not self.limiter.has_capacity():
+                return None
+            wait = self.bucket.try_take(time.monotonic())
+            if wait == 0.0:
+                self.limiter.in_flight += 1
+                self._waiters.popleft()
+                self._wake_head()
+            return wait
+    
+    def _leave(self, waiter: _Waiter) -> None:
+        with self._lock:
+            if waiter in self._waiters:
+                was_head = self._waiters[0] is waiter
+                self._waiters.remove(waiter)
+                if was_head:
+                    self._wake_head()
+    
+    def _join(self, waiter: _Waiter) -> None:
+        with self._lock:
+            self._waiters.append(waiter)
+    
+    def _release(self, latency: Optional[float], overloaded: bool = False, failed: bool = False) -> None:
+        """
+        latency None = tanpa sinyal ke AIMD (dibatalkan / error dari sisi request)
+        failed = 5xx / timeout / koneksi: turunkan batas, bukan sinyal sukses
+        """
+        with self._lock:
+            self.limiter.in_flight -= 1
+            now = time.monotonic()
+            if overloaded:
+                self.limiter.on_overload(now, max(latency or 0.0, 1.0))
+                self.bucket.drain(now)
+            elif failed:
+                self.limiter.on_failure(now, max(latency or 0.0, 1.0))
+            elif latency is not None:
+                self.limiter.on_success(latency, now)
+            self._wake_head()
+    
+    def _queue_timeout(self) -> LLMUnavailableError:
+        GATEWAY_EVENTS.inc(("queue_timeout",))
+        return LLMUnavailableError("queue_timeout", rate_limited=True, retry_after=self.queue_timeout)
+    
+    def _acquire(self, deadline: float) -> None:
+        waiter = _Waiter()
+        self._join(waiter)
+        try:
+            while True:
+                wait = self._try_admit(waiter)
+                if wait == 0.0:
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or (wait is not None and wait > remaining):
+                    raise self._queue_timeout()
+                waiter.event.wait(remaining if wait is None else wait)
+        finally:
+            self._leave(waiter)
+    
+    async def _aacquire(self, deadline: float) -> None:
+        waiter = _Waiter(asyncio.get_running_loop())
+        self._join(waiter)
+        try:
+            while True:
+                wait = self._try_admit(waiter)
+                if wait == 0.0:
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or (wait is not None and wait > remaining):
+                    raise self._queue_timeout()
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), remaining if wait is None else wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._leave(waiter)
+    
+    def _status_code(self, error: Exception) -> Optional[int]:
+        status = getattr(error, "status_code", None)
+        if status is None:
+            status = getattr(getattr(error, "response", None), "status_code", None)
+        return status if isinstance(status, int) else None
+    
+    def _is_rate_limited(self, error: Exception) -> bool:
+        message = str(error).lower()
+        return self._status_code(error) == 429 or "rate_limit_exceeded" in message or "429" in message
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        status = self._status_code(error)
+        if status is not None:
+            return status == 429 or status >= 500
+        name = type(error).__name__
+        return self._is_rate_limited(error) or "Timeout" in name or "Connection" in name
+    
+    def _retry_after(self, error: Exception) -> Optional[float]:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+    
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """
+        Full jitter: acak di [0, min(max, base * 2^attempt)], minimal Retry-After dari provider
+        """
+        delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+        return max(delay, self._retry_after(error) or 0.0)
+    
+    def _on_error(self, error: Exception, attempt: int, latency: float) -> Optional[float]:
+        """
+        Catat error dan lepas slot
+        Return: jeda sebelum retry, atau None jika tidak perlu retry
+        """
+        rate_limited = self._is_rate_limited(error)
+        if rate_limited or self._is_retryable(error):
+            self._release(latency, overloaded=rate_limited, failed=not rate_limited)
+        else:
+            self._release(None)
+        if rate_limited:
+            GATEWAY_EVENTS.inc(("rate_limited",))
+        if attempt < self.max_retries and self._is_retryable(error):
+            GATEWAY_EVENTS.inc(("retry",))
+            return self._backoff(attempt, error)
+        GATEWAY_EVENTS.inc(("failure",))
+        return None
+    
+    def _unavailable(self, error: Exception) -> LLMUnavailableError:
+        rate_limited = self._is_rate_limited(error)
+        return LLMUnavailableError("rate_limited" if rate_limited else type(error).__name__,
+                                   rate_limited=rate_limited, retry_after=self._retry_after(error))
+    
+    def invoke(self, prompt: str, model: Optional[str] = None) -> Any:
+        GATEWAY_EVENTS.inc(("call",))
+        for attempt in range(self.max_retries + 1):
+            with span("llm_queue"):
+                self._acquire(time.monotonic() + self.queue_timeout)
+            start = time.monotonic()
+            try:
+                response = self.llm_for(model).invoke(prompt)
+            except Exception as e:
+                delay = self._on_error(e, attempt, time.monotonic() - start)
+                if delay is None:
+                    raise self._unavailable(e) from e
+                with span("llm_backoff"):
+                    time.sleep(delay)
+                continue
+            self._release(time.monotonic() - start)
+            GATEWAY_EVENTS.inc(("success",))
+            return response
+    
+    async def ainvoke(self, prompt: str, model: Optional[str] = None) -> Any:
+        GATEWAY_EVENTS.inc(("call",))
+        for attempt in range(self.max_retries + 1):
+            with span("llm_queue"):
+                await self._aacquire(time.monotonic() + self.queue_timeout)
+            start = time.monotonic()
+            try:
+                response = await self.llm_for(model).ainvoke(prompt)
+            except asyncio.CancelledError:
+                self._release(None)
+                raise
+            except Exception as e:
+                delay = self._on_error(e, attempt, time.monotonic() - start)
+                if delay is None:
+                    raise self._unavailable(e) from e
+                with span("llm_backoff"):
+                    await asyncio.sleep(delay)
+                continue
+            self._release(time.monotonic() - start)
+            GATEWAY_EVENTS.inc(("success",))
+            return response
+    
+    async def astream(self, prompt: str, model: Optional[str] = None) -> AsyncIterator[Any]:
+        """
+        Streaming dengan retry hanya sebelum chunk pertama terkirim
+        (setelah itu client sudah menerima teks parsial)
+        Latency untuk AIMD diukur sampai chunk pertama
+        """
+        GATEWAY_EVENTS.inc(("call",))
+        for attempt in range(self.max_retries + 1):
+            with span("llm_queue"):
+                await self._aacquire(time.monotonic() + self.queue_timeout)
+            start = time.monotonic()
+            first_chunk_latency: Optional[float] = None
+            released = False
+            try:
+                async for chunk in self.llm_for(model).astream(prompt):
+                    if first_chunk_latency is None:
+                        first_chunk_latency = time.monotonic() - start
+                    yield chunk
+            except Exception as e:
+                released = True
+                if first_chunk_latency is not None:
+                    self._release(first_chunk_latency, failed=self._is_retryable(e))
+                    GATEWAY_EVENTS.inc(("failure",))
+                    raise self._unavailable(e) from e
+                delay = self._on_error(e, attempt, time.monotonic() - start)
+                if delay is None:
+                    raise self._unavailable(e) from e
+                with span("llm_backoff"):
+                    await asyncio.sleep(delay)
+                continue
+            finally:
+                if not released:
+                    self._release(first_chunk_latency if first_chunk_latency is not None
+                                  else time.monotonic() - start)
+            GATEWAY_EVENTS.inc(("success",))
+            return
+    
+    def stats(self) -> dict:
+        events = GATEWAY_EVENTS.values()
+        with self._lock:
+            self.bucket._refill(time.monotonic())
+            return {
+                "concurrency_limit": round(self.limiter.limit, 2),
+                "in_flight": self.limiter.in_flight,
+                "queued": len(self._waiters),
+                "bucket_tokens": round(self.bucket.tokens, 2) if self.bucket.rate > 0 else None,
+                "requests_per_minute": round(self.bucket.rate * 60, 2),
+                **{event: int(events.get((event,), 0))
+                   for event in ("call", "success", "retry", "rate_limited", "queue_timeout", "failure")}
+            }
+
+# Gateway global di depan instance LLM global (client dibuat saat LLM call pertama)
+llm_gateway = LLMGateway()
@@ -0,0 +1,224 @@
+"""
+Metrics module
+Counter dan histogram dengan agregasi per-thread (tanpa lock di hot path)
+Setiap thread menulis ke shard miliknya sendiri; shard dijumlahkan saat dibaca
+Output bisa dirender dalam format teks Prometheus untuk endpoint /metrics
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+Labels = Tuple[str, ...]
+
+# Bucket default (detik): dari 50µs (direct/cache) sampai 10s (LLM timeout)
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _Metric:
+    """
+    Basis metric: kelola shard per thread
+    """
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._shards_lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+    
+    def _shard(self) -> dict:
+        """
+        Shard milik thread saat ini (dibuat sekali per thread)
+        """
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard: dict = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+    
+    def _snapshots(self) -> List[dict]:
+        """
+        Salinan semua shard (dict.copy atomik di bawah GIL)
+        """
+        with self._shards_lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]
+    
+    def reset(self) -> None:
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.clear()
+    
+    def _format_labels(self, labels: Labels, extra: str = "") -> str:
+        parts = [f'{name}="{value}"' for name, value in zip(self.labelnames, labels)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter(_Metric):
+    kind = "counter"
+    
+    def inc(self, labels: Labels = (), amount: float = 1.0) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+    
+    def values(self) -> Dict[Labels, float]:
+        totals: Dict[Labels, float] = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0.0) + value
+        return totals
+    
+    def get(self, labels: Labels = ()) -> float:
+        return self.values().get(labels, 0.0)
+    
+    def total(self) -> float:
+        return sum(self.values().values())
+    
+    def render(self) -> List[str]:
+        values = self.values()
+        if not values and not self.labelnames:
+            values = {(): 0.0}
+        return [f"{self.name}{self._format_labels(labels)} {value:g}"
+                for labels, value in sorted(values.items())]
+
+class _Timer:
+    """
+    Context manager untuk Histogram.time()
+    """
+    __slots__ = ("histogram", "labels", "start")
+    
+    def __init__(self, histogram: "Histogram", labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+    
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, self.labels)
+
+class Histogram(_Metric):
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional["Registry"] = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+    
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        """
+        Shard value: [count per bucket (non-kumulatif) + bucket +Inf, sum, count]
+        """
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            state = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+    
+    def time(self, labels: Labels = ()) -> _Timer:
+        return _Timer(self, labels)
+    
+    def values(self) -> Dict[Labels, Tuple[List[int], float, int]]:
+        totals: Dict[Labels, Tuple[List[int], float, int]] = {}
+        for shard in self._snapshots():
+            for labels, (counts, value_sum, count) in shard.items():
+                if labels in totals:
+                    prev_counts, prev_sum, prev_count = totals[labels]
+                    totals[labels] = ([a + b for a, b in zip(prev_counts, counts)],
+                                      prev_sum + value_sum, prev_count + count)
+                else:
+                    totals[labels] = (list(counts), value_sum, count)
+        return totals
+    
+    def summary(self, labels: Labels = ()) -> Dict[str, float]:
+        """
+        Ringkasan untuk /stats: jumlah, rata-rata, dan p50/p95/p99 (perkiraan dari bucket)
+        """
+        counts, value_sum, count = self.values().get(labels, ([0] * (len(self.buckets) + 1), 0.0, 0))
+        result = {"count": count, "avg_ms": round(value_sum / count * 1000, 3) if count else 0.0}
+        for quantile in (0.5, 0.95, 0.99):
+            result[f"p{int(quantile * 100)}_ms"] = self._quantile_ms(counts, count, quantile)
+        return result
+    
+    def _quantile_ms(self, counts: List[int], count: int, quantile: float) -> float:
+        if not count:
+            return 0.0
+        target = quantile * count
+        running = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            running += bucket_count
+            if running >= target:
+                return round(bound * 1000, 3) if bound != float("inf") else round(self.buckets[-1] * 1000, 3)
+        return 0.0
+    
+    def render(self) -> List[str]:
+        lines = []
+        for labels, (counts, value_sum, count) in sorted(self.values().items()):
+            running = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                running += bucket_count
+                bucket_labels = self._format_labels(labels, 'le="%g"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {running}")
+            bucket_labels = self._format_labels(labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            lines.append(f"{self.name}_sum{self._format_labels(labels)} {value_sum:g}")
+            lines.append(f"{self.name}_count{self._format_labels(labels)} {count}")
+        return lines
+
+class Gauge:
+    """
+    Gauge yang nilainya dibaca dari callback saat scrape (mis. jumlah entry cache)
+    """
+    kind = "gauge"
+    
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float],
+                 registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        (registry if registry is not None else REGISTRY).register(self)
+    
+    def reset(self) -> None:
+        pass
+    
+    def render(self) -> List[str]:
+        return [f"{self.name} {float(self.callback()):g}"]
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+    
+    def register(self, metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} sudah terdaftar")
+        self._metrics[metric.name] = metric
+    
+    def reset(self) -> None:
+        for metric in self._metrics.values():
+            metric.reset()
+    
+    def render(self) -> str:
+        """
+        Format teks Prometheus (exposition format 0.0.4)
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Registry global yang dirender oleh /metrics
+REGISTRY = Registry()
@@ -0,0 +1,259 @@
+"""
+Rate limit module
+Admission control di depan answer service:
+- Limit per client (IP atau API key) dengan GCRA: setara token bucket tapi cukup
+  satu float per client (theoretical arrival time), client yang bucket-nya penuh dibuang
+- Dua bucket per client: semua request ke /ask*, dan khusus request yang butuh LLM
+  (direct / cache tidak memakan kuota LLM client)
+- Load shedding global: request yang butuh LLM ditolak lebih awal jika antrean
+  LLM gateway sudah dalam atau diperkirakan tidak terlayani sebelum LLM_QUEUE_TIMEOUT
+Penolakan dilempar sebagai OverloadedError → response 429 + Retry-After
+"""
+import hashlib
+import math
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Hashable, Optional
+from app.core.config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_PATHS,
+    RATE_LIMIT_REQUESTS_PER_MINUTE,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_LLM_PER_MINUTE,
+    RATE_LIMIT_LLM_BURST,
+    RATE_LIMIT_MAX_CLIENTS,
+    RATE_LIMIT_API_KEY_HEADER,
+    RATE_LIMIT_TRUST_FORWARDED,
+    ADMISSION_MAX_LLM_QUEUE
+)
+from app.core.metrics import Counter
+
+ADMISSION = Counter("chatbot_admission_total", "Keputusan admission control per hasil", ["outcome"])
+ADMISSION_OUTCOMES = ("llm_admitted", "client_rate_limited", "client_llm_quota", "llm_queue_full")
+
+# Sweep client yang bucket-nya sudah penuh kembali setiap N acquire
+_SWEEP_EVERY = 1024
+
+class OverloadedError(Exception):
+    """
+    Request ditolak admission control; retry_after dalam detik
+    """
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class GCRALimiter:
+    """
+    Generic Cell Rate Algorithm per key
+    Request diterima jika TAT baru - sekarang <= burst * interval
+    Dict diurutkan menurut akses terakhir (pop + insert ulang) sehingga
+    client yang paling lama diam ada di depan untuk sweep dan eviction
+    """
+    def __init__(self, per_minute: float, burst: float, max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self.burst = max(1.0, burst)
+        self.max_clients = max_clients
+        self._tat: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+        self._operations = 0
+        self.evicted = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+    
+    def acquire(self, key: Hashable, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """
+        Return 0 jika diterima, selain itu detik sampai request dengan cost ini akan diterima
+        """
+        if not self.interval:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            previous = self._tat.pop(key, now)
+            new_tat = max(previous, now) + self.interval * cost
+            excess = new_tat - now - self.burst * self.interval
+            if excess > 0:
+                self._tat[key] = previous
+                return excess
+            self._tat[key] = new_tat
+            
+            self._operations += 1
+            if self._operations % _SWEEP_EVERY == 0 or len(self._tat) > self.max_clients:
+                self._sweep(now)
+            return 0.0
+    
+    def _sweep(self, now: float) -> None:
+        """
+        Buang client yang bucket-nya sudah penuh (TAT lewat); jika masih di atas
+        batas, buang client yang paling lama tidak mengirim request
+        """
+        for key in list(self._tat):
+            if self._tat[key] > now:
+                break
+            del self._tat[key]
+        while len(self._tat) > self.max_clients:
+            del self._tat[next(iter(self._tat))]
+            self.evicted += 1
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._tat.clear()
+    
+    def __len__(self) -> int:
+        return len(self._tat)
+
+# Identitas client untuk request yang sedang diproses (di-set middleware)
+_current_client: ContextVar[Optional[str]] = ContextVar("chatbot_client", default=None)
+
+def current_client() -> Optional[str]:
+    return _current_client.get()
+
+class AdmissionController:
+    def __init__(self, gateway: Any = None):
+        """
+        gateway: LLM gateway yang antreannya dipakai sebagai sinyal load shedding
+        (default gateway global, di-resolve saat pertama dipakai)
+        """
+        self.enabled = RATE_LIMIT_ENABLED
+        self.requests = GCRALimiter(RATE_LIMIT_REQUESTS_PER_MINUTE, RATE_LIMIT_BURST)
+        self.llm_requests = GCRALimiter(RATE_LIMIT_LLM_PER_MINUTE, RATE_LIMIT_LLM_BURST)
+        self.max_llm_queue = ADMISSION_MAX_LLM_QUEUE
+        self._gateway = gateway
+    
+    @property
+    def gateway(self) -> Any:
+        if self._gateway is None:
+            from app.core.llm_gateway import llm_gateway
+            self._gateway = llm_gateway
+        return self._gateway
+    
+    def _reject(self, reason: str, retry_after: float) -> OverloadedError:
+        ADMISSION.inc((reason,))
+        return OverloadedError(reason, retry_after)
+    
+    def admit_request(self, client: str) -> None:
+        """
+        Bucket request umum per client (dipanggil middleware untuk path RATE_LIMIT_PATHS)
+        """
+        wait = self.requests.acquire(client)
+        if wait:
+            raise self._reject("client_rate_limited", wait)
+    
+    def admit_llm(self, cost: int = 1, gateway: Any = None) -> None:
+        """
+        Dipanggil sebelum pekerjaan yang butuh LLM call baru
+        Tanpa client (pemanggilan in-process, mis. script prerender) selalu diterima
+        """
+        client = _current_client.get()
+        if client is None or not self.enabled:
+            return
+        
+        gateway = gateway or self.gateway
+        queued = gateway.queued
+        if queued > 0:
+            wait = self._estimated_wait(gateway, queued)
+            if queued >= self.max_llm_queue or wait > gateway.queue_timeout:
+                raise self._reject("llm_queue_full", wait)
+        
+        # Batch besar memakan paling banyak satu burst penuh (tidak ditolak selamanya)
+        wait = self.llm_requests.acquire(client, min(cost, self.llm_requests.burst))
+        if wait:
+            raise self._reject("client_llm_quota", wait)
+        ADMISSION.inc(("llm_admitted",))
+    
+    def _estimated_wait(self, gateway: Any, queued: int) -> float:
+        """
+        Perkiraan waktu tunggu request baru di antrean gateway (dasar Retry-After)
+        Token bucket dibaca tanpa refill (sedikit pesimis, tanpa lock)
+        """
+        rate = gateway.bucket.rate
+        if rate <= 0:
+            return min(gateway.queue_timeout, 1.0)
+        return max(0.0, queued + 1 - gateway.bucket.tokens) / rate
+    
+    def stats(self) -> Dict[str, Any]:
+        outcomes = ADMISSION.values()
+        return {
+            "enabled": self.enabled,
+            "paths": list(RATE_LIMIT_PATHS),
+            "requests_per_minute": RATE_LIMIT_REQUESTS_PER_MINUTE,
+            "burst": RATE_LIMIT_BURST,
+            "llm_per_minute": RATE_LIMIT_LLM_PER_MINUTE,
+            "llm_burst": RATE_LIMIT_LLM_BURST,
+            "max_llm_queue": self.max_llm_queue,
+            "tracked_clients": len(self.requests),
+            "tracked_llm_clients": len(self.llm_requests),
+            "evicted_clients": self.requests.evicted + self.llm_requests.evicted,
+            **{outcome: int(outcomes.get((outcome,), 0)) for outcome in ADMISSION_OUTCOMES}
+        }
+    
+    def reset_stats(self) -> None:
+        ADMISSION.reset()
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+class RateLimitMiddleware:
+    """
+    Middleware ASGI: tentukan identitas client, terapkan bucket request umum
+    Identitas: hash API key (header RATE_LIMIT_API_KEY_HEADER) jika ada, selain itu IP
+    (X-Forwarded-For hanya dipercaya jika RATE_LIMIT_TRUST_FORWARDED)
+    """
+    def __init__(self, app: Any, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission
+        self.api_key_header = RATE_LIMIT_API_KEY_HEADER.lower().encode("latin-1")
+    
+    def _client_key(self, scope: dict) -> str:
+        forwarded = None
+        for name, value in scope["headers"]:
+            if name == self.api_key_header and value:
+                return "key:" + hashlib.blake2b(value, digest_size=8).hexdigest()
+            if name == b"x-forwarded-for" and RATE_LIMIT_TRUST_FORWARDED:
+                forwarded = value.decode("latin-1").split(",")[0].strip()
+        if forwarded:
+            return "ip:" + forwarded
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+    
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if (scope["type"] != "http" or not self.controller.enabled
+                or not scope["path"].startswith(RATE_LIMIT_PATHS)):
+            await self.app(scope, receive, send)
+            return
+        
+        client = self._client_key(scope)
+        try:
+            self.controller.admit_request(client)
+        except OverloadedError as e:
+            await send_overloaded(send, e)
+            return
+        
+        token = _current_client.set(client)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_client.reset(token)
+
+async def send_overloaded(send: Any, error: OverloadedError) -> None:
+    """
+    Response 429 langsung dari middleware (sebelum routing)
+    """
+    body = ('{"detail":"Terlalu banyak request, silakan coba lagi nanti","reason":"%s","retry_after":%.2f}'
+            % (error.reason, error.retry_after)).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", retry_after_header(error.retry_after).encode())
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+# Global admission controller instance
+admission = AdmissionController()
@@ -0,0 +1,136 @@
+"""
+Single-flight module
+Menggabungkan (coalesce) pemanggilan identik yang sedang berjalan
+Pemanggil pertama mengeksekusi fungsi, duplikat menunggu hasil yang sama
+Versi async menjalankan fungsi sebagai task tersendiri: client pertama yang disconnect
+tidak membatalkan pekerjaan selama masih ada duplikat yang menunggu
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+class _Call:
+    """
+    Satu pemanggilan yang sedang berjalan (versi sync)
+    """
+    __slots__ = ("event", "result", "error")
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+class _Flight:
+    """
+    Satu pemanggilan async yang sedang berjalan: task bersama + jumlah pemanggil yang menunggu
+    """
+    __slots__ = ("task", "waiters")
+    
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    def __init__(self):
+        """
+        _calls: pemanggilan sync yang sedang berjalan per key
+        _flights: pemanggilan async yang sedang berjalan per key
+        """
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Jalankan fn() sekali untuk setiap key yang sedang berjalan
+        Return: (hasil, shared) - shared True jika hasil milik pemanggil lain
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+        
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        
+        return call.result, False
+    
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Versi async dari do(): semua pemanggil (termasuk yang pertama) meng-await task bersama
+        lewat shield, sehingga pembatalan satu pemanggil tidak menjalar ke yang lain
+        Task baru dibatalkan jika semua pemanggilnya sudah pergi
+        """
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda task: self._finish(key, flight))
+            self._flights[key] = flight
+            self.leaders += 1
+        
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                # Pemanggil terakhir pergi: hentikan pekerjaan, pemanggil baru memulai ulang
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+    
+    def _finish(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Tandai exception sudah diambil agar tidak ada warning saat tidak ada yang menunggu
+        if not flight.task.cancelled():
+            flight.task.exception()
+    
+    def in_flight(self, key: Hashable) -> bool:
+        """
+        True jika key sedang dieksekusi (pemanggil baru akan menumpang hasilnya)
+        """
+        return key in self._flights or key in self._calls
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Mengembalikan statistik coalescing
+        """
+        return {
+            "in_flight": len(self._calls) + len(self._flights),
+            "leader_calls": self.leaders,
+            "coalesced_calls": self.coalesced
+        }
+    
+    def reset_stats(self) -> None:
+        """
+        Reset counter statistik
+        """
+        self.leaders = 0
+        self.coalesced = 0
@@ -0,0 +1,76 @@
+"""
+Text utilities
+Tokenisasi dan normalisasi pertanyaan berbahasa Indonesia
+Dipakai bersama oleh cache, retrieval, dan direct answer
+"""
+import re
+from functools import lru_cache
+from typing import FrozenSet, List, Set
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Stopword Indonesian + sapaan informal yang tidak mengubah maksud pertanyaan
+STOPWORDS: Set[str] = {
+    "yang", "di", "ke", "dari", "dan", "atau", "itu", "ini", "adalah", "ada",
+    "apa", "apakah", "saja", "aja", "dong", "sih", "kah", "ya", "yah", "deh",
+    "tuh", "kan", "kak", "min", "admin", "mas", "mbak", "pak", "bu", "tolong",
+    "mohon", "bisa", "tentang", "untuk", "dengan", "pada", "dalam", "oleh",
+    "sebutkan", "jelaskan", "kasih", "tahu", "tau", "info", "informasi",
+    "mau", "ingin", "tanya", "saya", "aku", "gw", "gue", "nya"
+}
+
+# Token nama sekolah: semua pertanyaan memang tentang sekolah ini
+SCHOOL_TOKENS: Set[str] = {"smkn", "smk", "negeri", "4", "bojonegoro", "bjn"}
+
+def tokenize(text: str) -> List[str]:
+    """
+    Pecah teks menjadi token kata (lowercase)
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+def stemmed_tokens(text: str) -> List[str]:
+    """
+    Token kata dengan stemming ringan, urutan dan duplikat dipertahankan
+    """
+    return [stem(token) for token in tokenize(text)]
+
+def stem(token: str) -> str:
+    """
+    Stemming ringan: buang akhiran -nya ("sekolahnya" -> "sekolah")
+    """
+    if len(token) > 5 and token.endswith("nya"):
+        return token[:-3]
+    return token
+
+def content_tokens(text: str) -> List[str]:
+    """
+    Token bermakna: tanpa stopword, tanpa nama sekolah, akhiran -nya dibuang
+    Urutan dipertahankan, duplikat dibuang
+    """
+    seen = set()
+    result = []
+    for token in tokenize(text):
+        token = stem(token)
+        if token in STOPWORDS or token in SCHOOL_TOKENS or token in seen:
+            continue
+        seen.add(token)
+        result.append(token)
+    return result
+
+def normalize_question(text: str) -> str:
+    """
+    Bentuk kanonik pertanyaan: token bermakna diurutkan
+    "jurusan apa saja?" dan "apa saja jurusan di smkn 4" -> "jurusan"
+    """
+    return " ".join(sorted(content_tokens(text)))
+
+@lru_cache(maxsize=65536)
+def char_ngrams(token: str, n: int = 3) -> FrozenSet[str]:
+    """
+    Character n-gram dari satu token (dengan padding spasi)
+    Di-cache karena kosakata pertanyaan sangat berulang
+    """
+    padded = f" {token} "
+    if len(padded) <= n:
+        return frozenset((padded,))
+    return frozenset(padded[i:i + n] for i in range(len(padded) - n + 1))
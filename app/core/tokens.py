@@ -0,0 +1,108 @@
+"""
+Token counting module
+Menghitung token prompt/completion secara offline untuk accounting dan budget context
+Memakai tiktoken jika terpasang (encoding cl100k_base, dekat dengan tokenizer Llama 3),
+jika tidak memakai estimasi heuristik per kata
+Encoding di-load saat startup (main.py), bukan di request pertama: tiktoken mengunduh file BPE
+jika cache-nya kosong, sehingga load dibatasi TOKENIZER_LOAD_TIMEOUT dan gagal / offline = heuristik
+(Dockerfile mengisi cache saat build lewat TIKTOKEN_CACHE_DIR)
+"""
+import math
+import re
+import threading
+from functools import lru_cache
+from typing import Optional
+from app.core.config import TOKENIZER_LOAD_TIMEOUT
+
+# Potongan teks untuk estimasi: kata, angka, atau satu tanda baca
+_PIECE_PATTERN = re.compile(r"\d+|[^\W\d_]+|[^\w\s]|_")
+_WORD_PATTERN = re.compile(r"\S+\s*")
+
+_encoding = None
+_encoding_loaded = False
+_load_lock = threading.Lock()
+
+def load_encoding(timeout: float = TOKENIZER_LOAD_TIMEOUT) -> Optional[object]:
+    """
+    Load encoding tiktoken sekali (dipanggil saat startup)
+    None jika paket / file BPE tidak tersedia atau load melewati timeout (mis. unduhan di container offline);
+    hasilnya tetap untuk seluruh proses agar hitungan token konsisten
+    """
+    global _encoding, _encoding_loaded
+    with _load_lock:
+        if _encoding_loaded:
+            return _encoding
+        result = {}
+        
+        def load() -> None:
+            try:
+                import tiktoken
+                result["encoding"] = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                result["error"] = e
+        
+        # Thread daemon: unduhan yang macet tidak menahan startup lebih dari timeout
+        loader = threading.Thread(target=load, name="tokenizer-load", daemon=True)
+        loader.start()
+        loader.join(timeout)
+        _encoding = result.get("encoding")
+        _encoding_loaded = True
+        if _encoding is None and not isinstance(result.get("error"), ImportError):
+            reason = result.get("error") or f"timeout {timeout:g}s"
+            print(f"Warning: encoding tiktoken gagal di-load ({reason}), token dihitung heuristik")
+        return _encoding
+
+def _get_encoding():
+    if not _encoding_loaded:
+        return load_encoding()
+    return _encoding
+
+def tokenizer_name() -> str:
+    return "tiktoken:cl100k_base" if _get_encoding() is not None else "heuristic"
+
+def _estimate_tokens(text: str) -> int:
+    """
+    Estimasi tanpa tokenizer: kata ~4 karakter per token, angka 3 digit per token,
+    tanda baca 1 token
+    """
+    total = 0
+    for piece in _PIECE_PATTERN.findall(text):
+        if piece.isdigit():
+            total += math.ceil(len(piece) / 3)
+        elif piece.isalpha():
+            total += math.ceil(len(piece) / 4)
+        else:
+            total += 1
+    return total
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """
+    Jumlah token teks (di-cache: system prompt dan passage dihitung berulang kali)
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return _estimate_tokens(text)
+
+def truncate_to_tokens(text: str, budget: int, suffix: str = "...") -> Optional[str]:
+    """
+    Potong teks di batas kata agar muat dalam budget token (termasuk suffix)
+    Return None jika bahkan satu kata pun tidak muat
+    """
+    if count_tokens(text) <= budget:
+        return text
+    budget -= count_tokens(suffix)
+    used = 0
+    end = 0
+    for match in _WORD_PATTERN.finditer(text):
+        cost = count_tokens(match.group().strip())
+        if used + cost > budget:
+            break
+        used += cost
+        end = match.end()
+    if end == 0:
+        return None
+    return text[:end].rstrip(" ,;|") + suffix
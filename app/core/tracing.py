@@ -0,0 +1,275 @@
+"""
+Tracing module
+Tracing per-request (opt-in lewat header debug) dan sampling profiler untuk jalur panas
+- Trace disimpan di contextvar: ikut ke task asyncio dan threadpool tanpa diteruskan manual
+- span() tanpa trace aktif hanya satu ContextVar.get lalu no-op (overhead nyaris nol)
+- SamplingProfiler: thread yang membaca stack semua thread secara berkala,
+  output format folded (flamegraph.pl / speedscope / inferno)
+"""
+import os
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import TRACE_ENABLED, TRACE_HEADER, REQUEST_ID_HEADER
+
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+class Trace:
+    """
+    Kumpulan span milik satu request; offset relatif terhadap awal request
+    """
+    __slots__ = ("request_id", "start", "spans")
+    
+    def __init__(self, request_id: str, start: Optional[float] = None):
+        self.request_id = request_id
+        self.start = time.perf_counter() if start is None else start
+        self.spans: List[Tuple[str, float, float]] = []
+    
+    def add(self, name: str, start: float, end: float) -> None:
+        # list.append atomik di bawah GIL, aman dari thread lain milik request yang sama
+        self.spans.append((name, start, end))
+    
+    def timings(self) -> Dict[str, Any]:
+        """
+        Breakdown untuk metadata.timings: span berurutan + total per nama span
+        """
+        now = time.perf_counter()
+        spans = sorted(self.spans, key=lambda span: span[1])
+        stages: Dict[str, float] = {}
+        for name, start, end in spans:
+            stages[name] = stages.get(name, 0.0) + (end - start) * 1000
+        return {
+            "request_id": self.request_id,
+            "total_ms": round((now - self.start) * 1000, 3),
+            "stages": {name: round(value, 3) for name, value in stages.items()},
+            "spans": [
+                {
+                    "name": name,
+                    "start_ms": round((start - self.start) * 1000, 3),
+                    "duration_ms": round((end - start) * 1000, 3)
+                }
+                for name, start, end in spans
+            ]
+        }
+    
+    def server_timing(self) -> str:
+        """
+        Nilai header Server-Timing (tampil di tab Network browser devtools)
+        """
+        stages: Dict[str, float] = {}
+        for name, start, end in self.spans:
+            stages[name] = stages.get(name, 0.0) + (end - start) * 1000
+        return ", ".join(f"{name};dur={value:.3f}" for name, value in stages.items())
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("chatbot_trace", default=None)
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+def start_trace(request_id: str, start: Optional[float] = None) -> Token:
+    return _current_trace.set(Trace(request_id, start))
+
+def end_trace(token: Token) -> None:
+    _current_trace.reset(token)
+
+class _Span:
+    __slots__ = ("trace", "name", "start")
+    
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+    
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.trace.add(self.name, self.start, time.perf_counter())
+
+class _NullSpan:
+    """
+    Span no-op saat request tidak di-trace (satu instance dipakai bersama)
+    """
+    __slots__ = ()
+    
+    def __enter__(self) -> "_NullSpan":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+_NULL_SPAN = _NullSpan()
+
+def span(name: str):
+    """
+    Context manager pengukur satu langkah; no-op jika tidak ada trace aktif
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return _NULL_SPAN
+    return _Span(trace, name)
+
+def mark_since_start(name: str) -> None:
+    """
+    Span dari awal request sampai sekarang (mis. antre event loop / parsing body sebelum handler jalan)
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, trace.start, time.perf_counter())
+
+def attach_timings(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Tambahkan metadata.timings jika request di-trace
+    Result disalin karena bisa dipakai bersama (single-flight) oleh request lain
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return result
+    timings = {**result["metadata"].get("timings", {}), **trace.timings()}
+    return {**result, "metadata": {**result["metadata"], "timings": timings}}
+
+def new_request_id() -> str:
+    return os.urandom(8).hex()
+
+class TracingMiddleware:
+    """
+    Middleware ASGI: request ID di setiap response, trace hanya jika header debug dikirim
+    Ditulis sebagai ASGI murni (bukan BaseHTTPMiddleware) agar tidak menambah task per request
+    dan tidak mem-buffer response streaming
+    """
+    def __init__(self, app: Any):
+        self.app = app
+        self.trace_header = TRACE_HEADER.lower().encode("latin-1")
+        self.request_id_header = REQUEST_ID_HEADER.lower().encode("latin-1")
+    
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        request_id = None
+        traced = False
+        for name, value in scope["headers"]:
+            if name == self.request_id_header:
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID_PATTERN.match(candidate):
+                    request_id = candidate
+            elif name == self.trace_header and TRACE_ENABLED:
+                traced = value not in (b"", b"0", b"false")
+        request_id = request_id or new_request_id()
+        token = start_trace(request_id, start) if traced else None
+        
+        async def send_with_headers(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((self.request_id_header, request_id.encode("latin-1")))
+                if token is not None:
+                    trace = _current_trace.get()
+                    if trace is not None and trace.spans:
+                        headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            if token is not None:
+                end_trace(token)
+
+class SamplingProfiler:
+    """
+    Sampling profiler berbasis sys._current_frames()
+    Tidak memasang hook per fungsi (beda dengan cProfile), jadi overhead hanya
+    sebanding dengan frekuensi sampling; mati total saat tidak berjalan
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stacks: Dict[str, int] = {}
+        self.interval = 0.005
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self, interval: float = 0.005, duration: Optional[float] = None) -> bool:
+        """
+        Mulai sampling (hasil sebelumnya dibuang); return False jika sudah berjalan
+        duration: berhenti otomatis setelah N detik
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self._stacks = {}
+            self.samples = 0
+            self.interval = max(0.001, interval)
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(duration,),
+                                            name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+    
+    def stop(self) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+    
+    def _run(self, duration: Optional[float]) -> None:
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + duration if duration else None
+        while not self._stop.wait(self.interval):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                key = self._fold(frame)
+                self._stacks[key] = self._stacks.get(key, 0) + 1
+            self.samples += 1
+        self.stopped_at = time.time()
+    
+    @staticmethod
+    def _fold(frame: Any) -> str:
+        """
+        Stack dari root ke leaf, dipisah ';' (format folded)
+        """
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+    
+    def folded(self, prefix: Optional[str] = None) -> str:
+        """
+        Satu baris per stack unik: "frame;frame;frame count"
+        prefix: hanya stack yang melewati modul dengan prefix tersebut (mis. "app.")
+        """
+        stacks = dict(self._stacks)
+        lines = [f"{stack} {count}" for stack, count in sorted(stacks.items())
+                 if prefix is None or f";{prefix}" in f";{stack}"]
+        return "\n".join(lines) + ("\n" if lines else "")
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "interval_ms": round(self.interval * 1000, 3),
+            "samples": self.samples,
+            "unique_stacks": len(self._stacks),
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at
+        }
+
+# Global profiler instance
+profiler = SamplingProfiler()
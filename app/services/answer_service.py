@@ -1,103 +1,680 @@
 """
 Answer Service
 Orchestrator utama yang menggabungkan cache, retrieval, dan LLM
-Menggunakan hybrid approach: direct answer → cache → LLM
+Menggunakan hybrid approach: direct answer → structured query → cache → intent router → LLM
 """
-from typing import Dict, Any
-from app.core.llm import llm
-from app.core.config import SYSTEM_PROMPT
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Any, Optional, AsyncIterator, List, Tuple
+from app.core.llm_gateway import llm_gateway, LLMUnavailableError
+from app.core.config import (
+    SYSTEM_PROMPT_TEMPLATE,
+    BATCH_LLM_CONCURRENCY,
+    MAX_CONTEXT_TOKENS,
+    ANSWER_TABLE_ENABLED,
+    NORMALIZER_ENABLED,
+    NORMALIZER_CONVERSION_BACKLOG,
+    INTENT_ROUTER_ENABLED
+)
+from app.core.metrics import Counter, Histogram
+from app.core.rate_limit import admission
+from app.core.singleflight import SingleFlight
+from app.core.tokens import count_tokens, tokenizer_name
+from app.core.tracing import span, mark_since_start, attach_timings, current_trace
+from app.services.answer_table import answer_table
 from app.services.cache_service import cache_service
+from app.services.intent_router import IntentRouter, Route
+from app.services.normalizer import QuestionNormalizer
 from app.services.retrieval_service import retrieval_service
+from app.services.session_service import session_service
 
-class AnswerService:
+RATE_LIMIT_MESSAGE = "Maaf, batas penggunaan API tercapai. Silakan coba lagi nanti."
+ERROR_MESSAGE = "Maaf, terjadi kesalahan saat memproses pertanyaan."
+OUT_OF_SCOPE_MESSAGE = "Maaf, pertanyaan Anda di luar cakupan informasi yang saya miliki tentang {school}. Silakan tanyakan tentang profil sekolah, jurusan, fasilitas, atau hal terkait SMK."
+
+# Metrics (agregasi per-thread, aman dipanggil dari threadpool maupun event loop)
+QUESTIONS = Counter("chatbot_questions_total", "Total pertanyaan yang diterima")
+ANSWERS = Counter("chatbot_answers_total", "Jawaban per source", ["source"])
+LLM_CALLS = Counter("chatbot_llm_calls_total", "Panggilan LLM per jenis prompt", ["kind"])
+COALESCED = Counter("chatbot_coalesced_total", "Request yang menumpang hasil LLM call lain")
+STREAMED = Counter("chatbot_streamed_answers_total", "Jawaban LLM yang dikirim lewat streaming")
+STAGE_SECONDS = Histogram("chatbot_stage_seconds", "Latency per tahap pipeline", ["stage"])
+REQUEST_SECONDS = Histogram("chatbot_request_seconds", "Latency end-to-end per source", ["source"])
+LLM_TOKENS = Counter("chatbot_llm_tokens_total", "Token LLM (hitungan offline) per arah dan jenis prompt",
+                     ["direction", "kind"])
+LLM_COMPLETIONS = Counter("chatbot_llm_completions_total", "Jawaban LLM yang selesai dan dihitung tokennya", ["kind"])
+TOKENS_SAVED = Counter("chatbot_tokens_saved_total", "Estimasi token yang dihemat karena LLM tidak dipanggil",
+                       ["source"])
+STREAM_TTFT_SECONDS = Histogram("chatbot_stream_ttft_seconds", "Time-to-first-token endpoint streaming")
+
+PIPELINE_STAGES = ("normalize", "direct_check", "structured", "answer_table", "cache_lookup", "route", "retrieval",
+                   "format_context", "llm")
+ANSWER_SOURCES = ("direct", "structured", "prerendered", "cache", "greeting", "off_topic", "llm", "fallback")
+
+# Rasio awal token per karakter jawaban sebelum ada completion LLM yang terukur (~4 karakter per token)
+DEFAULT_TOKENS_PER_CHAR = 0.25
+
+class _TokenTotals:
+    """
+    Jumlah berjalan token LLM untuk estimasi tokens_saved di setiap jawaban tanpa LLM
+    (membaca semua shard LLM_TOKENS per jawaban terlalu mahal)
+    snapshot: (token prompt, token completion, karakter completion, jumlah completion),
+    diganti utuh saat update sehingga pembaca tidak perlu lock
+    """
     def __init__(self):
+        self._lock = threading.Lock()
+        self.snapshot: Tuple[float, float, int, int] = (0.0, 0.0, 0, 0)
+    
+    def add(self, prompt: int, completion: int, completion_chars: int) -> None:
+        with self._lock:
+            prompts, completions, chars, count = self.snapshot
+            self.snapshot = (prompts + prompt, completions + completion, chars + completion_chars, count + 1)
+    
+    def reset(self) -> None:
+        with self._lock:
+            self.snapshot = (0.0, 0.0, 0, 0)
+
+LLM_TOKEN_TOTALS = _TokenTotals()
+
+class AnswerService:
+    def __init__(self, retrieval=retrieval_service, cache=cache_service, table=answer_table,
+                 namespace: Optional[str] = None):
         """
         Initialize dengan semua services yang dibutuhkan
+        Default: service global (deployment satu sekolah); tenant memberi service miliknya
+        namespace: prefix session id agar session antar tenant tidak tercampur
         """
-        self.llm = llm
-        self.cache = cache_service
-        self.retrieval = retrieval_service
-        
-        # Tracking untuk monitoring
-        self.stats = {
-            "total_questions": 0,
-            "direct_answers": 0,
-            "cache_hits": 0,
-            "llm_calls": 0,
-            "no_context_found": 0
-        }
+        self.llm = llm_gateway
+        self.cache = cache
+        self.retrieval = retrieval
+        self.namespace = namespace
+        
+        # Saat data sekolah di-reload, buang cache yang berasal dari section yang berubah
+        self.retrieval.add_reload_listener(self.cache.invalidate_sections)
+        
+        # Jawaban prerender hanya berlaku untuk versi data yang sama dengan saat build
+        self.answer_table = table
+        if ANSWER_TABLE_ENABLED:
+            self.answer_table.load(self.retrieval.data_hash)
+            self.retrieval.add_reload_listener(
+                lambda sections: self.answer_table.check_data_hash(self.retrieval.data_hash)
+            )
+        
+        # Coalescing pertanyaan identik yang sedang diproses LLM
+        self.single_flight = SingleFlight()
+        
+        # Slang / typo dibetulkan sebelum direct answer dan cache (kosakata data milik retrieval ini)
+        self.normalizer = QuestionNormalizer(self.retrieval)
+        # (source, pertanyaan asli, pertanyaan normalisasi): jalurnya dicek saat statistik dibaca
+        self._pending_conversions: Deque[Tuple[str, str, str]] = deque(maxlen=NORMALIZER_CONVERSION_BACKLOG)
+        
+        # Intent lokal untuk pertanyaan yang akan ke LLM: sapaan / di luar topik tanpa LLM, tier model per intent
+        self.router = IntentRouter(self.retrieval)
+        
+        # Riwayat ringkas per session untuk pertanyaan lanjutan
+        self.sessions = session_service
+        
+        # Kuota LLM per client + load shedding saat antrean LLM dalam (raise OverloadedError)
+        self.admission = admission
     
-    def get_answer(self, question: str) -> Dict[str, Any]:
+    def get_answer(self, question: str, session_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Main method untuk mendapatkan jawaban
-        Flow: Direct Answer → Cache → LLM → Fallback
+        Flow: Direct Answer → Structured Query → Cache → Intent Router → LLM → Fallback
+        session_id: pertanyaan lanjutan dilengkapi topik turn sebelumnya
         
         Return: {
             "jawaban": str,
-            "source": "direct" | "cache" | "llm" | "fallback",
+            "source": "direct" | "structured" | "prerendered" | "cache" | "greeting" | "off_topic" | "llm" | "fallback",
             "metadata": {...}
         }
         """
-        self.stats["total_questions"] += 1
+        start = time.perf_counter()
+        mark_since_start("dispatch")
+        asked = question
+        question, normalized = self._normalize(question)
+        question, session = self._resolve_session(question, session_id)
+        quick_result = self._get_quick_answer(question)
+        route = None
+        if not quick_result:
+            route, quick_result = self._route(question)
+        if quick_result:
+            result = self._record(quick_result, start, normalized)
+            return attach_timings(self._with_session(result, asked, session))
+        
+        # Pertanyaan identik yang sedang diproses cukup menunggu satu LLM call
+        key = self.cache._generate_key(question)
+        self._admit_llm(key)
+        with span("single_flight"):
+            result, shared = self.single_flight.do(key, lambda: self._answer_with_llm(question, route))
+        result = self._record(self._mark_coalesced(result) if shared else result, start, normalized)
+        return attach_timings(self._with_session(result, asked, session))
+    
+    async def aget_answer(self, question: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Versi async dari get_answer
+        Direct answer dan cache dijawab langsung di event loop (murah),
+        sedangkan LLM dipanggil dengan ainvoke sehingga tidak memakan thread worker
+        """
+        start = time.perf_counter()
+        mark_since_start("dispatch")
+        asked = question
+        question, normalized = self._normalize(question)
+        question, session = self._resolve_session(question, session_id)
+        quick_result = await self._aget_quick_answer(question)
+        route = None
+        if not quick_result:
+            route, quick_result = self._route(question)
+        if quick_result:
+            result = self._record(quick_result, start, normalized)
+            return attach_timings(self._with_session(result, asked, session))
+        
+        key = self.cache._generate_key(question)
+        self._admit_llm(key)
+        with span("single_flight"):
+            result, shared = await self.single_flight.ado(key, lambda: self._aanswer_with_llm(question, route))
+        result = self._record(self._mark_coalesced(result) if shared else result, start, normalized)
+        return attach_timings(self._with_session(result, asked, session))
+    
+    async def aget_answers_batch(self, questions: List[str],
+                                 concurrency: int = BATCH_LLM_CONCURRENCY) -> Dict[str, Any]:
+        """
+        Jawab banyak pertanyaan sekaligus, hasil urut sesuai input
+        1. Direct/cache (dan intent router) untuk semua item dalam satu lintasan
+        2. Sisa item dikelompokkan per cache key (duplikat hanya satu LLM call)
+        3. LLM call berjalan paralel dibatasi `concurrency`
+        """
+        batch_start = time.perf_counter()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(questions)
+        pending: Dict[str, List[int]] = {}
+        routes: Dict[str, Optional[Route]] = {}
+        normalized_items: List[Tuple[str, Optional[Dict[str, Any]]]] = []
+        
+        # STEP 1-2: normalisasi + direct answer + cache + intent router
+        for index, question in enumerate(questions):
+            item_start = time.perf_counter()
+            question, normalized = self._normalize(question)
+            normalized_items.append((question, normalized))
+            quick_result = await self._aget_quick_answer(question)
+            route = None
+            if not quick_result:
+                route, quick_result = self._route(question)
+            if quick_result:
+                result = self._record(quick_result, item_start, normalized)
+                results[index] = {**result, "timing_ms": round((time.perf_counter() - item_start) * 1000, 3)}
+            else:
+                key = self.cache._generate_key(question)
+                pending.setdefault(key, []).append(index)
+                routes[key] = route
+        
+        # STEP 3-4: satu LLM call per key unik, paralel terbatas
+        new_calls = sum(1 for key in pending if not self.single_flight.in_flight(key))
+        if new_calls:
+            self.admission.admit_llm(new_calls, gateway=self.llm)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def answer_group(key: str, indices: List[int]) -> None:
+            question = normalized_items[indices[0]][0]
+            route = routes[key]
+            async with semaphore:
+                item_start = time.perf_counter()
+                base, shared = await self.single_flight.ado(key, lambda: self._aanswer_with_llm(question, route))
+                timing_ms = round((time.perf_counter() - item_start) * 1000, 3)
+            # Setiap item dibentuk dari hasil bersama, dengan info normalisasi miliknya sendiri
+            for position, index in enumerate(indices):
+                item = self._mark_coalesced(base) if shared or position > 0 else base
+                item = self._record(item, item_start, normalized_items[index][1])
+                results[index] = {**item, "timing_ms": timing_ms}
+        
+        await asyncio.gather(*(answer_group(key, indices) for key, indices in pending.items()))
+        
+        return {
+            "results": results,
+            "metadata": {
+                "total": len(questions),
+                "llm_groups": len(pending),
+                "duration_ms": round((time.perf_counter() - batch_start) * 1000, 3)
+            }
+        }
+    
+    async def astream_answer(self, question: str,
+                             session_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Versi streaming dari aget_answer
+        Yield event: {"event": "answer" | "token" | "done" | "error", "data": ...}
+        - direct/cache: satu event "answer" berisi response lengkap
+        - LLM: event "token" per potongan teks, lalu "done" berisi response lengkap
+        Jawaban lengkap disimpan ke cache setelah stream selesai
+        """
+        start = time.perf_counter()
+        mark_since_start("dispatch")
+        asked = question
+        question, normalized = self._normalize(question)
+        question, session = self._resolve_session(question, session_id)
+        quick_result = await self._aget_quick_answer(question)
+        route = None
+        if not quick_result:
+            route, quick_result = self._route(question)
+        if quick_result:
+            result = self._with_session(self._record(quick_result, start, normalized), asked, session)
+            yield {"event": "answer", "data": attach_timings(result)}
+            return
+        
+        self._admit_llm(self.cache._generate_key(question))
+        with STAGE_SECONDS.time(("retrieval",)), span("retrieval"):
+            retrieved_data = self.retrieval.retrieve_relevant_data(question)
+        if not retrieved_data:
+            LLM_CALLS.inc(("general",))
+            context = ""
+            prompt = self._build_general_prompt(question)
+        else:
+            with STAGE_SECONDS.time(("format_context",)), span("format_context"):
+                context = self.retrieval.format_context(retrieved_data)
+            prompt = self._build_prompt(question, context)
+            LLM_CALLS.inc(("context",))
+        
+        chunks = []
+        first_token_at: Optional[float] = None
+        llm_start = time.perf_counter()
+        try:
+            async for chunk in self.llm.astream(prompt, model=route.model if route else None):
+                if not chunk.content:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                chunks.append(chunk.content)
+                yield {"event": "token", "data": {"text": chunk.content}}
+        except LLMUnavailableError as e:
+            # Jawaban parsial / error tidak disimpan ke cache
+            fallback = self._fallback_answer(e, retrieved_data)
+            fallback = self._record(fallback, start, normalized)
+            fallback = attach_timings(self._with_session(fallback, asked, session))
+            yield {"event": "error", "data": {**fallback, "partial": bool(chunks)}}
+            return
+        
+        end = time.perf_counter()
+        ttft = (first_token_at or end) - start
+        STAGE_SECONDS.observe(end - llm_start, ("llm",))
+        trace = current_trace()
+        if trace is not None:
+            trace.add("llm", llm_start, end)
+        STREAM_TTFT_SECONDS.observe(ttft)
+        STREAMED.inc()
+        
+        result = await self._afinish_llm_answer(question, "".join(chunks).strip(), retrieved_data, context,
+                                                route)
+        result["metadata"]["timings"] = {
+            "ttft_ms": round(ttft * 1000, 1),
+            "total_ms": round((end - start) * 1000, 1)
+        }
+        result = self._with_session(self._record(result, start, normalized), asked, session)
+        yield {"event": "done", "data": attach_timings(result)}
+    
+    def _answer_with_llm(self, question: str, route: Optional[Route] = None) -> Dict[str, Any]:
+        """
+        Retrieval + LLM call + simpan ke cache (dijalankan sekali per key)
+        route: hasil intent router (model LLM sesuai intent), None = model default
+        """
+        model = route.model if route else None
+        # STEP 3: Retrieve relevant data
+        with STAGE_SECONDS.time(("retrieval",)), span("retrieval"):
+            retrieved_data = self.retrieval.retrieve_relevant_data(question)
+        
+        # STEP 4: Panggil LLM dengan atau tanpa context
+        try:
+            if not retrieved_data:
+                # Tidak ada context spesifik, tapi coba jawab dengan pengetahuan umum
+                LLM_CALLS.inc(("general",))
+                with STAGE_SECONDS.time(("llm",)), span("llm"):
+                    answer = self._call_llm_general(question, model)
+                context = ""
+            else:
+                # Ada context relevan
+                with STAGE_SECONDS.time(("format_context",)), span("format_context"):
+                    context = self.retrieval.format_context(retrieved_data)
+                LLM_CALLS.inc(("context",))
+                with STAGE_SECONDS.time(("llm",)), span("llm"):
+                    answer = self._call_llm(question, context, model)
+        except LLMUnavailableError as e:
+            return self._fallback_answer(e, retrieved_data)
+        
+        return self._finish_llm_answer(question, answer, retrieved_data, context, route)
+    
+    async def _aanswer_with_llm(self, question: str, route: Optional[Route] = None) -> Dict[str, Any]:
+        """
+        Versi async dari _answer_with_llm
+        """
+        model = route.model if route else None
+        # STEP 3: Retrieve relevant data
+        with STAGE_SECONDS.time(("retrieval",)), span("retrieval"):
+            retrieved_data = self.retrieval.retrieve_relevant_data(question)
+        
+        # STEP 4: Panggil LLM (non-blocking) dengan atau tanpa context
+        try:
+            if not retrieved_data:
+                LLM_CALLS.inc(("general",))
+                with STAGE_SECONDS.time(("llm",)), span("llm"):
+                    answer = await self._acall_llm_general(question, model)
+                context = ""
+            else:
+                with STAGE_SECONDS.time(("format_context",)), span("format_context"):
+                    context = self.retrieval.format_context(retrieved_data)
+                LLM_CALLS.inc(("context",))
+                with STAGE_SECONDS.time(("llm",)), span("llm"):
+                    answer = await self._acall_llm(question, context, model)
+        except LLMUnavailableError as e:
+            return self._fallback_answer(e, retrieved_data)
+        
+        return await self._afinish_llm_answer(question, answer, retrieved_data, context, route)
+    
+    def _normalize(self, question: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Tulis ulang slang / typo sebelum direct answer, cache, dan session
+        Return: (pertanyaan efektif, info koreksi untuk metadata atau None jika tidak ada yang diubah)
+        """
+        if not NORMALIZER_ENABLED:
+            return question, None
+        with STAGE_SECONDS.time(("normalize",)), span("normalize"):
+            normalized, corrections = self.normalizer.normalize(question)
+        if not corrections:
+            return question, None
+        return normalized, {"original": question, "question": normalized, "corrections": corrections}
+    
+    def _route(self, question: str) -> Tuple[Optional[Route], Optional[Dict[str, Any]]]:
+        """
+        Intent router untuk pertanyaan yang lolos direct / structured / cache
+        Return: (route atau None jika router nonaktif, jawaban tanpa LLM untuk sapaan / di luar topik)
+        """
+        if not INTENT_ROUTER_ENABLED:
+            return None, None
+        with STAGE_SECONDS.time(("route",)), span("route"):
+            route = self.router.route(question)
+        if route is None or route.action == "llm":
+            return route, None
+        
+        if route.action == "greeting":
+            source, answer = "greeting", self.router.greeting_answer(question)
+        else:
+            source, answer = "off_topic", OUT_OF_SCOPE_MESSAGE.format(school=self.retrieval.school_name)
+        return route, {
+            "jawaban": answer,
+            "source": source,
+            "metadata": {
+                "llm_used": False,
+                "intent": route.metadata(),
+                "tokens_saved": self._record_saved_tokens(source, answer)
+            }
+        }
+    
+    def _resolve_session(self, question: str,
+                         session_id: Optional[str]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Lengkapi pertanyaan lanjutan dengan topik session (tanpa session: pertanyaan apa adanya)
+        """
+        if not session_id:
+            return question, None
+        with span("session"):
+            effective, session = self.sessions.resolve(self.session_key(session_id), question)
+        return effective, {**session, "id": session_id}
+    
+    def _with_session(self, result: Dict[str, Any], asked: str,
+                      session: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Catat turn ke riwayat session dan tambahkan metadata.session (result disalin)
+        """
+        if session is None:
+            return result
+        self.sessions.record(self.session_key(session["id"]), asked, session["topic"], result["source"])
+        return {**result, "metadata": {**result["metadata"], "session": session}}
+    
+    def session_key(self, session_id: str) -> str:
+        return f"{self.namespace}/{session_id}" if self.namespace else session_id
+    
+    @property
+    def system_prompt(self) -> str:
+        return SYSTEM_PROMPT_TEMPLATE.format(school=self.retrieval.school_name)
+    
+    def _admit_llm(self, key: str) -> None:
+        """
+        Admission control sebelum LLM call baru; request yang akan menumpang
+        LLM call yang sedang berjalan tidak memakan kuota
+        """
+        if not self.single_flight.in_flight(key):
+            with span("admission"):
+                self.admission.admit_llm(gateway=self.llm)
+    
+    def _mark_coalesced(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Salin hasil milik request lain dan tandai sebagai hasil coalescing
+        """
+        COALESCED.inc()
+        tokens = result["metadata"].get("tokens")
+        if tokens:
+            TOKENS_SAVED.inc(("coalesced",), tokens["prompt"] + tokens["completion"])
+        return {
+            **result,
+            "metadata": {**result["metadata"], "coalesced": True}
+        }
+    
+    def _get_quick_answer(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Tahap murah tanpa LLM: direct answer lalu cache
+        Return None jika pertanyaan harus diteruskan ke LLM
+        """
+        local_result = self._get_local_answer(question)
+        if local_result:
+            return local_result
+        
+        # STEP 2: Check cache
+        with STAGE_SECONDS.time(("cache_lookup",)), span("cache_lookup"):
+            cached_answer = self.cache.get(question)
+        return self._cache_result(cached_answer)
+    
+    async def _aget_quick_answer(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Versi async dari _get_quick_answer: cache sqlite/redis dibaca tanpa menahan event loop
+        """
+        local_result = self._get_local_answer(question)
+        if local_result:
+            return local_result
+        
+        with STAGE_SECONDS.time(("cache_lookup",)), span("cache_lookup"):
+            cached_answer = await self.cache.aget(question)
+        return self._cache_result(cached_answer)
+    
+    def _get_local_answer(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Direct answer, structured query, dan jawaban prerender (semua di memori proses)
+        """
+        QUESTIONS.inc()
         
         # STEP 1: Coba direct answer (tanpa LLM)
-        direct_answer = self.retrieval.get_direct_answer(question)
+        with STAGE_SECONDS.time(("direct_check",)), span("direct_check"):
+            direct_answer = self.retrieval.get_direct_answer(question)
         if direct_answer:
-            self.stats["direct_answers"] += 1
             return {
                 "jawaban": direct_answer,
                 "source": "direct",
                 "metadata": {
                     "llm_used": False,
-                    "tokens_saved": "~500"  # Estimasi token yang dihemat
+                    "tokens_saved": self._record_saved_tokens("direct", direct_answer)
                 }
             }
         
-        # STEP 2: Check cache
-        cached_answer = self.cache.get(question)
+        # STEP 1b: Query lookup / agregat atas data terstruktur (jabatan, prestasi, kelas jurusan)
+        with STAGE_SECONDS.time(("structured",)), span("structured"):
+            structured = self.retrieval.get_structured_answer(question)
+        if structured:
+            query, answer = structured
+            return {
+                "jawaban": answer,
+                "source": "structured",
+                "metadata": {
+                    "llm_used": False,
+                    "query": query,
+                    "tokens_saved": self._record_saved_tokens("structured", answer)
+                }
+            }
+        
+        # STEP 1c: Jawaban prerender (artifact build-time, memory-mapped)
+        with STAGE_SECONDS.time(("answer_table",)), span("answer_table"):
+            prerendered = self.answer_table.lookup(question)
+        if prerendered:
+            return {
+                "jawaban": prerendered,
+                "source": "prerendered",
+                "metadata": {
+                    "llm_used": False,
+                    "tokens_saved": self._record_saved_tokens("prerendered", prerendered)
+                }
+            }
+        return None
+    
+    def _cache_result(self, cached_answer: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Response untuk jawaban dari cache (None jika cache miss)
+        """
         if cached_answer:
-            self.stats["cache_hits"] += 1
             return {
                 "jawaban": cached_answer,
                 "source": "cache",
                 "metadata": {
                     "llm_used": False,
-                    "tokens_saved": "~300"
+                    "tokens_saved": self._record_saved_tokens("cache", cached_answer)
                 }
             }
-        
-        # STEP 3: Retrieve relevant data
-        retrieved_data = self.retrieval.retrieve_relevant_data(question)
-        
-        # STEP 4: Panggil LLM dengan atau tanpa context
-        if not retrieved_data:
-            # Tidak ada context spesifik, tapi coba jawab dengan pengetahuan umum
-            self.stats["no_context_found"] += 1
-            answer = self._call_llm_general(question)
+        return None
+    
+    def _record_saved_tokens(self, source: str, answer: str) -> int:
+        """
+        Estimasi token yang dihemat: rata-rata prompt LLM yang terukur
+        (atau perkiraan dari system prompt + budget context jika belum ada) + token jawaban
+        Token jawaban = panjang jawaban x rasio token/karakter completion LLM (O(1), tanpa tokenizer)
+        """
+        prompts, completion_tokens, completion_chars, completions = LLM_TOKEN_TOTALS.snapshot
+        if completions:
+            avg_prompt = prompts / completions
         else:
-            # Ada context relevan
-            context = self.retrieval.format_context(retrieved_data)
-            answer = self._call_llm(question, context)
-            self.stats["llm_calls"] += 1
-        
-        # Cache hasil
-        self.cache.set(question, answer)
+            avg_prompt = count_tokens(self.system_prompt) + MAX_CONTEXT_TOKENS
+        tokens_per_char = completion_tokens / completion_chars if completion_chars else DEFAULT_TOKENS_PER_CHAR
+        saved = int(round(avg_prompt + len(answer) * tokens_per_char))
+        TOKENS_SAVED.inc((source,), saved)
+        return saved
+    
+    def _record(self, result: Dict[str, Any], start: float,
+                normalized: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Catat jawaban per source beserta latency end-to-end
+        normalized: info dari _normalize, ditambahkan ke metadata.normalized (result disalin)
+        """
+        source = result["source"]
+        ANSWERS.inc((source,))
+        REQUEST_SECONDS.observe(time.perf_counter() - start, (source,))
+        if normalized is None:
+            return result
+        self._record_conversion(source, normalized)
+        info = {"question": normalized["question"], "corrections": normalized["corrections"]}
+        return {**result, "metadata": {**result["metadata"], "normalized": info}}
+    
+    def _record_conversion(self, source: str, normalized: Dict[str, Any]) -> None:
+        """
+        Catat pertanyaan ternormalisasi untuk dicek di check_conversions (bukan di jalur request)
+        Backlog terbatas: jika statistik lama tidak dibaca, yang tertua dibuang
+        """
+        if source in ("direct", "structured", "prerendered", "cache", "llm"):
+            self._pending_conversions.append((source, normalized["original"], normalized["question"]))
+    
+    def check_conversions(self) -> None:
+        """
+        Hitung pertanyaan yang jalurnya berubah karena normalisasi: pertanyaan asli tidak akan
+        kena direct / prerender / cache (LLM call dihindari), atau tanpa keyword sama sekali
+        sedangkan versi normalisasinya mendapat context retrieval
+        Pengecekan ulang tanpa menyentuh statistik hit; dipanggil saat statistik dibaca
+        """
+        while True:
+            try:
+                source, original, question = self._pending_conversions.popleft()
+            except IndexError:
+                return
+            if source == "direct":
+                converted = self.retrieval.get_direct_answer(original, count=False) is None
+            elif source == "structured":
+                converted = self.retrieval.get_structured_answer(original, count=False) is None
+            elif source == "prerendered":
+                converted = not self.answer_table.contains(original)
+            elif source == "cache":
+                key = self.cache._generate_key(original)
+                converted = (key != self.cache._generate_key(question)
+                             and self.cache.backend.get(key) is None)
+            else:
+                source = "retrieval"
+                keyword_index = self.retrieval.keyword_index
+                converted = (bool(keyword_index.find_all(question))
+                             and not keyword_index.find_all(original))
+            if converted:
+                self.normalizer.record_conversion(source)
+    
+    def _finish_llm_answer(self, question: str, answer: str, retrieved_data: Optional[Dict[str, Any]],
+                           context: str, route: Optional[Route] = None) -> Dict[str, Any]:
+        """
+        Simpan jawaban LLM ke cache dan bentuk response
+        """
+        with span("cache_store"):
+            self.cache.set(question, answer, self._answer_sections(retrieved_data))
+        return self._llm_result(question, answer, retrieved_data, context, route)
+    
+    async def _afinish_llm_answer(self, question: str, answer: str, retrieved_data: Optional[Dict[str, Any]],
+                                  context: str, route: Optional[Route] = None) -> Dict[str, Any]:
+        """
+        Versi async dari _finish_llm_answer (cache sqlite/redis ditulis di thread)
+        """
+        with span("cache_store"):
+            await self.cache.aset(question, answer, self._answer_sections(retrieved_data))
+        return self._llm_result(question, answer, retrieved_data, context, route)
+    
+    def _answer_sections(self, retrieved_data: Optional[Dict[str, Any]]) -> List[str]:
+        """
+        Section data yang menjadi context jawaban (cache ditandai agar bisa di-invalidate saat reload)
+        """
+        if not retrieved_data:
+            return []
+        return sorted({str(passage["path"][0]) for passage in retrieved_data.get("passages", [])})
+    
+    def _llm_result(self, question: str, answer: str, retrieved_data: Optional[Dict[str, Any]],
+                    context: str, route: Optional[Route] = None) -> Dict[str, Any]:
+        """
+        Accounting token dan response untuk jawaban LLM
+        """
+        # Accounting token: prompt dibangun ulang (deterministik) agar sama untuk semua jalur
+        kind = "context" if retrieved_data else "general"
+        prompt = self._build_prompt(question, context) if retrieved_data else self._build_general_prompt(question)
+        tokens = {
+            "prompt": count_tokens(prompt),
+            "context": count_tokens(context),
+            "completion": count_tokens(answer)
+        }
+        LLM_TOKENS.inc(("prompt", kind), tokens["prompt"])
+        LLM_TOKENS.inc(("completion", kind), tokens["completion"])
+        LLM_COMPLETIONS.inc((kind,))
+        LLM_TOKEN_TOTALS.add(tokens["prompt"], tokens["completion"], len(answer))
         
-        return {
-            "jawaban": answer,
-            "source": "llm",
-            "metadata": {
-                "llm_used": True,
-                "context_available": retrieved_data is not None,
-                "context_length": len(self.retrieval.format_context(retrieved_data)) if retrieved_data else 0
-            }
+        metadata = {
+            "llm_used": True,
+            "context_available": retrieved_data is not None,
+            "context_length": len(context),
+            "tokens": tokens
         }
+        if route is not None:
+            metadata["intent"] = route.metadata()
+        return {"jawaban": answer, "source": "llm", "metadata": metadata}
     
-    def _call_llm(self, question: str, context: str) -> str:
+    def _build_prompt(self, question: str, context: str) -> str:
         """
-        Memanggil LLM dengan context dari data sekolah
+        Prompt dengan context dari data sekolah
         """
-        prompt = f"""{SYSTEM_PROMPT}
+        return f"""{self.system_prompt}
 
 Data sekolah:
 {context}
@@ -105,68 +682,155 @@ Data sekolah:
 Pertanyaan: {question}
 
 Jawab dengan gaya natural dan informatif:"""
-        
-        try:
-            response = self.llm.invoke(prompt)
-            return response.content.strip()
-        except Exception as e:
-            error_message = str(e)
-            
-            if "rate_limit_exceeded" in error_message.lower() or "429" in error_message:
-                return "Maaf, batas penggunaan API tercapai. Silakan coba lagi nanti."
-            
-            return "Maaf, terjadi kesalahan saat memproses pertanyaan."
-    
-    def _call_llm_general(self, question: str) -> str:
+
+    def _build_general_prompt(self, question: str) -> str:
         """
-        Memanggil LLM tanpa context spesifik
-        Untuk pertanyaan yang tidak ada di data tapi masih relevan dengan sekolah
+        Prompt tanpa context spesifik
         """
-        prompt = f"""{SYSTEM_PROMPT}
+        return f"""{self.system_prompt}
 
 Pertanyaan: {question}
 
-Catatan: Jika pertanyaan tentang SMKN 4 Bojonegoro tapi tidak ada data spesifik, jawab dengan pengetahuan umum tentang SMK atau topik terkait. Jika benar-benar tidak relevan dengan sekolah, beritahu dengan sopan dan sarankan topik yang bisa ditanyakan.
+Catatan: Jika pertanyaan tentang {self.retrieval.school_name} tapi tidak ada data spesifik, jawab dengan pengetahuan umum tentang SMK atau topik terkait. Jika benar-benar tidak relevan dengan sekolah, beritahu dengan sopan dan sarankan topik yang bisa ditanyakan.
 
 Jawab:"""
-        
-        try:
-            response = self.llm.invoke(prompt)
-            return response.content.strip()
-        except Exception as e:
-            error_message = str(e)
-            
-            if "rate_limit_exceeded" in error_message.lower() or "429" in error_message:
-                return "Maaf, batas penggunaan API tercapai. Silakan coba lagi nanti."
-            
-            return "Maaf, pertanyaan Anda di luar cakupan informasi yang saya miliki tentang SMKN 4 Bojonegoro. Silakan tanyakan tentang profil sekolah, jurusan, fasilitas, atau hal terkait SMK."
+
+    def _call_llm(self, question: str, context: str, model: Optional[str] = None) -> str:
+        """
+        Memanggil LLM dengan context dari data sekolah (model: tier dari intent router, None = default)
+        Raise LLMUnavailableError jika gateway menyerah (kuota / error provider)
+        """
+        response = self.llm.invoke(self._build_prompt(question, context), model=model)
+        return response.content.strip()
     
+    def _call_llm_general(self, question: str, model: Optional[str] = None) -> str:
+        """
+        Memanggil LLM tanpa context spesifik
+        Untuk pertanyaan yang tidak ada di data tapi masih relevan dengan sekolah
+        """
+        response = self.llm.invoke(self._build_general_prompt(question), model=model)
+        return response.content.strip()
+    
+    async def _acall_llm(self, question: str, context: str, model: Optional[str] = None) -> str:
+        """
+        Versi async dari _call_llm (menggunakan ainvoke)
+        """
+        response = await self.llm.ainvoke(self._build_prompt(question, context), model=model)
+        return response.content.strip()
+    
+    async def _acall_llm_general(self, question: str, model: Optional[str] = None) -> str:
+        """
+        Versi async dari _call_llm_general (menggunakan ainvoke)
+        """
+        response = await self.llm.ainvoke(self._build_general_prompt(question), model=model)
+        return response.content.strip()
+    
+    def _fallback_answer(self, error: LLMUnavailableError,
+                         retrieved_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Response saat LLM tidak tersedia - sengaja TIDAK disimpan ke cache
+        """
+        if error.rate_limited:
+            message = RATE_LIMIT_MESSAGE
+        else:
+            message = (ERROR_MESSAGE if retrieved_data
+                       else OUT_OF_SCOPE_MESSAGE.format(school=self.retrieval.school_name))
+        
+        metadata = {"llm_used": False, "error": error.reason}
+        if error.retry_after is not None:
+            metadata["retry_after"] = error.retry_after
+        return {"jawaban": message, "source": "fallback", "metadata": metadata}
     
     def get_stats(self) -> Dict[str, Any]:
         """
         Mengembalikan statistik penggunaan
-        Berguna untuk monitoring efisiensi
+        Berguna untuk monitoring efisiensi (semua nilai numerik, persentase 0-100)
         """
-        total = self.stats["total_questions"]
+        self.check_conversions()
+        total = QUESTIONS.total()
+        stats = {
+            "total_questions": int(total),
+            "direct_answers": int(ANSWERS.get(("direct",))),
+            "structured_answers": int(ANSWERS.get(("structured",))),
+            "prerendered_answers": int(ANSWERS.get(("prerendered",))),
+            "cache_hits": int(ANSWERS.get(("cache",))),
+            "greeting_answers": int(ANSWERS.get(("greeting",))),
+            "off_topic_answers": int(ANSWERS.get(("off_topic",))),
+            "llm_calls": int(LLM_CALLS.get(("context",))),
+            "no_context_found": int(LLM_CALLS.get(("general",))),
+            "coalesced_requests": int(COALESCED.total()),
+            "streamed_answers": int(STREAMED.total()),
+            "fallback_answers": int(ANSWERS.get(("fallback",))),
+            "single_flight": self.single_flight.stats(),
+            "sessions": self.sessions.stats(),
+            "normalizer": self.normalizer.stats(),
+            "intent_router": self.router.stats(),
+            "llm_gateway": self.llm.stats(),
+            "tokens": self._token_stats(),
+            "latency": {
+                "stages": {stage: STAGE_SECONDS.summary((stage,)) for stage in PIPELINE_STAGES},
+                "sources": {source: REQUEST_SECONDS.summary((source,)) for source in ANSWER_SOURCES},
+                "stream_ttft": STREAM_TTFT_SECONDS.summary()
+            }
+        }
         if total == 0:
-            return self.stats
+            return stats
+        
+        def rate(value: int) -> float:
+            return round(value / total * 100, 1)
         
+        stats["efficiency"] = {
+            "direct_answer_rate": rate(stats["direct_answers"]),
+            "structured_answer_rate": rate(stats["structured_answers"]),
+            "cache_hit_rate": rate(stats["cache_hits"]),
+            "llm_usage_rate": rate(stats["llm_calls"]),
+            "coalesced_rate": rate(stats["coalesced_requests"]),
+            "prerendered_rate": rate(stats["prerendered_answers"]),
+            "routed_rate": rate(stats["greeting_answers"] + stats["off_topic_answers"]),
+            "token_saving_rate": rate(stats["direct_answers"] + stats["structured_answers"]
+                                      + stats["prerendered_answers"] + stats["cache_hits"]
+                                      + stats["greeting_answers"] + stats["off_topic_answers"]
+                                      + stats["coalesced_requests"])
+        }
+        return stats
+    
+    def _token_stats(self) -> Dict[str, Any]:
+        """
+        Ringkasan token: total dan rata-rata per panggilan LLM, serta token yang dihemat
+        """
+        totals = {"prompt": 0.0, "completion": 0.0}
+        for (direction, _), value in LLM_TOKENS.values().items():
+            totals[direction] += value
+        completions = LLM_COMPLETIONS.total()
+        saved = TOKENS_SAVED.values()
         return {
-            **self.stats,
-            "efficiency": {
-                "direct_answer_rate": f"{(self.stats['direct_answers'] / total) * 100:.1f}%",
-                "cache_hit_rate": f"{(self.stats['cache_hits'] / total) * 100:.1f}%",
-                "llm_usage_rate": f"{(self.stats['llm_calls'] / total) * 100:.1f}%",
-                "token_saving_rate": f"{((self.stats['direct_answers'] + self.stats['cache_hits']) / total) * 100:.1f}%"
-            }
+            "tokenizer": tokenizer_name(),
+            # Tanpa tiktoken semua hitungan di bawah adalah estimasi heuristik
+            "estimated": tokenizer_name() == "heuristic",
+            "llm_completions": int(completions),
+            "prompt_total": int(totals["prompt"]),
+            "completion_total": int(totals["completion"]),
+            "avg_prompt": round(totals["prompt"] / completions, 1) if completions else 0.0,
+            "avg_completion": round(totals["completion"] / completions, 1) if completions else 0.0,
+            "saved_total": int(sum(saved.values())),
+            "saved_by_source": {source: int(value) for (source,), value in saved.items()},
+            "system_prompt": count_tokens(self.system_prompt),
+            "context_budget": MAX_CONTEXT_TOKENS
         }
     
     def reset_stats(self) -> None:
         """
         Reset statistik
         """
-        for key in self.stats:
-            self.stats[key] = 0
+        for metric in (QUESTIONS, ANSWERS, LLM_CALLS, COALESCED, STREAMED, LLM_TOKENS,
+                       LLM_COMPLETIONS, LLM_TOKEN_TOTALS, TOKENS_SAVED, STAGE_SECONDS, REQUEST_SECONDS, STREAM_TTFT_SECONDS):
+            metric.reset()
+        self.single_flight.reset_stats()
+        self.sessions.reset_stats()
+        self.normalizer.reset_stats()
+        self._pending_conversions.clear()
+        self.router.reset_stats()
+        self.admission.reset_stats()
 
 # Global answer service instance
 answer_service = AnswerService()
@@ -0,0 +1,194 @@
+"""
+Answer Table
+Tabel jawaban yang di-prerender saat build (scripts/prerender_answers.py)
+File di-memory-map saat startup: lookup = binary search di index, tanpa parse / load ke heap
+
+Format file (little-endian):
+    header  : magic(8) | versi(u32) | jumlah(u32) | data_hash(16) | dibuat(f64)
+    index   : jumlah x (hash_key u64 | offset u32 | panjang u32), urut berdasarkan hash_key
+    record  : key_utf8 \\0 jawaban_utf8
+Key = normalize_question(pertanyaan); artifact hanya dipakai jika data_hash sama dengan data aktif
+"""
+import hashlib
+import mmap
+import os
+import struct
+import time
+from typing import Any, Dict, Optional
+from app.core.config import ANSWER_TABLE_PATH
+from app.core.text import normalize_question
+
+MAGIC = b"SMK4ANST"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sII16sd")
+_ENTRY = struct.Struct("<QII")
+
+def key_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+def write_answer_table(path: str, answers: Dict[str, str], data_hash: str) -> int:
+    """
+    Tulis artifact secara atomik (file sementara lalu os.replace)
+    answers: {pertanyaan atau key ter-normalisasi: jawaban}
+    Return: ukuran file dalam byte
+    """
+    records = {}
+    for question, answer in answers.items():
+        key = normalize_question(question)
+        if key:
+            records[key] = answer
+    
+    entries = sorted((key_hash(key), key) for key in records)
+    offset = _HEADER.size + _ENTRY.size * len(entries)
+    index = bytearray()
+    blob = bytearray()
+    for hashed, key in entries:
+        record = key.encode("utf-8") + b"\0" + records[key].encode("utf-8")
+        index += _ENTRY.pack(hashed, offset + len(blob), len(record))
+        blob += record
+    
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(entries),
+                          data_hash.encode("ascii")[:16].ljust(16, b"\0"), time.time())
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(index)
+        f.write(blob)
+    os.replace(tmp_path, path)
+    return len(header) + len(index) + len(blob)
+
+class AnswerTable:
+    def __init__(self, path: str):
+        """
+        Belum aktif sampai load() berhasil dengan data_hash yang cocok
+        """
+        self.path = path
+        self.count = 0
+        self.data_hash: Optional[str] = None
+        self.created_at: Optional[float] = None
+        self.active = False
+        self.reason = "belum dimuat"
+        self.hits = 0
+        self.misses = 0
+        self._mmap: Optional[mmap.mmap] = None
+    
+    def load(self, expected_hash: str) -> bool:
+        """
+        Memory-map artifact; gagal (file tidak ada / versi beda / data beda) -> tabel nonaktif
+        """
+        self.close()
+        try:
+            with open(self.path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.reason = "artifact tidak ditemukan"
+            return False
+        
+        if len(mapped) < _HEADER.size:
+            mapped.close()
+            self.reason = "artifact rusak"
+            return False
+        magic, version, count, data_hash, created_at = _HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            mapped.close()
+            self.reason = f"format artifact tidak dikenal (versi {version})"
+            return False
+        
+        self.data_hash = data_hash.rstrip(b"\0").decode("ascii")
+        self.created_at = created_at
+        self.count = count
+        self._mmap = mapped
+        self.check_data_hash(expected_hash)
+        return self.active
+    
+    def check_data_hash(self, expected_hash: str) -> int:
+        """
+        Aktifkan tabel hanya jika dibangun dari data yang sama (dipanggil juga setelah reload)
+        Return: jumlah jawaban yang dinonaktifkan
+        """
+        if self._mmap is None:
+            return 0
+        if self.data_hash == expected_hash:
+            self.active = True
+            self.reason = "aktif"
+            return 0
+        
+        was_active = self.active
+        self.active = False
+        self.reason = f"data berubah (artifact {self.data_hash}, data {expected_hash})"
+        if not was_active:
+            print(f"Warning: answer table {self.path} tidak dipakai: {self.reason}")
+        return self.count if was_active else 0
+    
+    def lookup(self, question: str) -> Optional[str]:
+        """
+        Cari jawaban untuk pertanyaan (key ter-normalisasi), None jika tidak ada
+        """
+        if not self.active:
+            return None
+        key = normalize_question(question)
+        if not key:
+            return None
+        
+        answer = self._find(key)
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+    
+    def contains(self, question: str) -> bool:
+        """
+        Cek keberadaan jawaban tanpa mengubah statistik hit/miss
+        """
+        key = normalize_question(question) if self.active else ""
+        return bool(key) and self._find(key) is not None
+    
+    def _find(self, key: str) -> Optional[str]:
+        mapped = self._mmap
+        target = key_hash(key)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            hashed = _ENTRY.unpack_from(mapped, _HEADER.size + middle * _ENTRY.size)[0]
+            if hashed < target:
+                low = middle + 1
+            else:
+                high = middle
+        
+        encoded_key = key.encode("utf-8") + b"\0"
+        while low < self.count:
+            hashed, offset, length = _ENTRY.unpack_from(mapped, _HEADER.size + low * _ENTRY.size)
+            if hashed != target:
+                break
+            record = mapped[offset:offset + length]
+            if record.startswith(encoded_key):
+                return record[len(encoded_key):].decode("utf-8")
+            low += 1
+        return None
+    
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self.active = False
+        self.count = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "active": self.active,
+            "status": self.reason,
+            "entries": self.count,
+            "data_hash": self.data_hash,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+# Global answer table instance (dimuat oleh AnswerService dengan hash data aktif)
+answer_table = AnswerTable(ANSWER_TABLE_PATH)
@@ -0,0 +1,83 @@
+"""
+BM25 Index
+Inverted index dengan skor BM25 untuk meranking passage data sekolah
+Semua statistik (idf, panjang dokumen) dihitung sekali saat build
+Postings disimpan sebagai array datar (CSR, bukan list tuple per token) dan token di-intern,
+sehingga ratusan indeks tenant dalam satu proses tetap hemat memori
+"""
+import heapq
+import math
+import sys
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+class BM25Index:
+    def __init__(self, documents: Sequence[Sequence[str]], k1: float = 1.5, b: float = 0.75):
+        """
+        documents: list token per dokumen (index dokumen = posisi di list)
+        Layout CSR: _slots token -> slot; posting slot ada di _doc_ids/_weights[_starts[slot]:_starts[slot + 1]]
+        _weights: bobot tf BM25 yang sudah dinormalisasi panjang, _idf: idf per slot
+        """
+        self.k1 = k1
+        self.b = b
+        self.num_documents = len(documents)
+        avg_length = (sum(len(doc) for doc in documents) / self.num_documents) if documents else 0.0
+        
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        for doc_id, tokens in enumerate(documents):
+            length_norm = k1 * (1 - b + b * len(tokens) / avg_length) if avg_length else k1
+            for token, tf in Counter(tokens).items():
+                weight = tf * (k1 + 1) / (tf + length_norm)
+                postings.setdefault(token, []).append((doc_id, weight))
+        
+        self._slots: Dict[str, int] = {}
+        self._starts = array("i", [0])
+        self._doc_ids = array("i")
+        self._weights = array("d")
+        self._idf = array("d")
+        for token, docs in postings.items():
+            self._slots[sys.intern(token)] = len(self._idf)
+            self._idf.append(math.log(1 + (self.num_documents - len(docs) + 0.5) / (len(docs) + 0.5)))
+            for doc_id, weight in docs:
+                self._doc_ids.append(doc_id)
+                self._weights.append(weight)
+            self._starts.append(len(self._doc_ids))
+    
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """
+        Unpickle (snapshot): token di-intern ulang agar dipakai bersama antar indeks tenant
+        """
+        state["_slots"] = {sys.intern(token): slot for token, slot in state["_slots"].items()}
+        self.__dict__.update(state)
+    
+    def search(self, query_tokens: Iterable[str], top_k: int) -> List[Tuple[float, int]]:
+        """
+        Ranking dokumen untuk query
+        Return: [(skor, doc_id), ...] urut skor tertinggi, hanya dokumen dengan skor > 0
+        """
+        scores: Dict[int, float] = {}
+        doc_ids, weights, starts = self._doc_ids, self._weights, self._starts
+        for token in set(query_tokens):
+            slot = self._slots.get(token)
+            if slot is None:
+                continue
+            idf = self._idf[slot]
+            for position in range(starts[slot], starts[slot + 1]):
+                doc_id = doc_ids[position]
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * weights[position]
+        
+        if not scores:
+            return []
+        # Skor sama: dokumen yang lebih awal (urutan di JSON) didahulukan
+        top = heapq.nlargest(top_k, ((score, -doc_id) for doc_id, score in scores.items()))
+        return [(score, -neg_doc_id) for score, neg_doc_id in top]
+    
+    def vocabulary(self) -> Iterable[str]:
+        return self._slots.keys()
+    
+    def __contains__(self, token: str) -> bool:
+        return token in self._slots
+    
+    def __len__(self) -> int:
+        return self.num_documents
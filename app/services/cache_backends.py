@@ -0,0 +1,698 @@
+"""
+Cache Backends
+Storage yang bisa diganti di belakang CacheService
+- memory: LRU dalam proses (default, paling cepat)
+- sqlite: file SQLite mode WAL, dipakai bersama oleh beberapa worker dan tahan restart
+- redis: server Redis (opsional, butuh package redis)
+NamespacedBackend membagi satu backend untuk banyak tenant (prefix key per tenant)
+"""
+import heapq
+import os
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from app.core.config import (
+    CACHE_TTL,
+    CACHE_MAX_ENTRIES,
+    CACHE_MAX_BYTES,
+    CACHE_SWEEP_INTERVAL,
+    CACHE_SQLITE_PATH,
+    CACHE_REDIS_URL
+)
+from app.core.fast_json import preencode
+
+# Perkiraan overhead per entry (dict entry, key hash, timestamp, node LRU)
+ENTRY_OVERHEAD = 240
+
+class CacheBackend(ABC):
+    """
+    Kontrak backend: simpan jawaban per key dengan TTL
+    on_remove dipanggil dengan key yang dibuang backend (eviction/expired)
+    """
+    name = "base"
+    # True jika operasi melakukan I/O file / jaringan (dipanggil lewat thread dari event loop)
+    blocking = True
+    
+    def __init__(self, ttl: int = CACHE_TTL):
+        self.ttl = ttl
+        self.on_remove: Optional[Callable[[str], None]] = None
+    
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """
+        Return value jika ada dan belum expired, None jika tidak
+        """
+    
+    @abstractmethod
+    def set(self, key: str, question: str, value: str, sections: Iterable[str] = ()) -> None:
+        """
+        Simpan value beserta pertanyaan asli (untuk warm-up semantic index)
+        sections: section data sumber jawaban (untuk invalidasi saat data berubah)
+        """
+    
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """
+        Hapus satu key
+        """
+    
+    @abstractmethod
+    def invalidate_sections(self, sections: Iterable[str]) -> int:
+        """
+        Hapus entry yang jawabannya berasal dari salah satu section, return jumlahnya
+        """
+    
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Hapus semua entry
+        """
+    
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+    
+    @abstractmethod
+    def hottest(self, limit: int) -> List[Tuple[str, str]]:
+        """
+        Entry paling sering diakses: [(key, pertanyaan), ...]
+        """
+    
+    def sweep(self) -> int:
+        """
+        Buang entry expired, return jumlah yang dibuang
+        """
+        return 0
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+    
+    def _notify_remove(self, key: str) -> None:
+        if self.on_remove is not None:
+            self.on_remove(key)
+
+class MemoryBackend(CacheBackend):
+    name = "memory"
+    blocking = False
+    
+    def __init__(self, ttl: int = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES,
+                 max_bytes: int = CACHE_MAX_BYTES):
+        """
+        entries: {key: {"question", "value", "timestamp", "size", "hits", "sections"}}
+                 urut dari yang paling lama tidak diakses (LRU) ke yang terbaru
+        _expiry_order: key urut waktu penulisan; karena TTL tetap, ini juga urutan expired
+        _section_keys: section -> key yang jawabannya berasal dari section tersebut
+        value disimpan pre-encoded (ikut membawa bentuk JSON-nya) agar cache hit langsung siap kirim
+        """
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._expiry_order: "OrderedDict[str, float]" = OrderedDict()
+        self._section_keys: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._ops_since_sweep = 0
+        
+        self.bytes_used = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            self._maybe_sweep()
+            
+            cached_item = self.entries.get(key)
+            if cached_item is None:
+                return None
+            
+            # Check apakah cache sudah expired
+            if time.time() - cached_item["timestamp"] > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                return None
+            
+            # Tandai sebagai baru diakses (O(1))
+            self.entries.move_to_end(key)
+            cached_item["hits"] += 1
+            return cached_item["value"]
+    
+    def set(self, key: str, question: str, value: str, sections: Iterable[str] = ()) -> None:
+        value = preencode(value)
+        size = sys.getsizeof(value) + len(value.encoded) + sys.getsizeof(question) + ENTRY_OVERHEAD
+        sections = tuple(sections)
+        now = time.time()
+        
+        with self._lock:
+            self._maybe_sweep()
+            
+            if key in self.entries:
+                self._remove(key, notify=False)
+            
+            self.entries[key] = {
+                "question": question,
+                "value": value,
+                "timestamp": now,
+                "size": size,
+                "hits": 0,
+                "sections": sections
+            }
+            self._expiry_order[key] = now
+            self.bytes_used += size
+            for section in sections:
+                self._section_keys.setdefault(section, set()).add(key)
+            
+            # Eviction LRU sampai kembali di bawah budget
+            while self.entries and (len(self.entries) > self.max_entries
+                                    or self.bytes_used > self.max_bytes):
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+    
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self.entries:
+                self._remove(key)
+    
+    def invalidate_sections(self, sections: Iterable[str]) -> int:
+        with self._lock:
+            keys = set()
+            for section in sections:
+                keys |= self._section_keys.get(section, set())
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+            self._expiry_order.clear()
+            self._section_keys.clear()
+            self.bytes_used = 0
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def hottest(self, limit: int) -> List[Tuple[str, str]]:
+        with self._lock:
+            top = heapq.nlargest(limit, self.entries.items(), key=lambda item: item[1]["hits"])
+        return [(key, item["question"]) for key, item in top]
+    
+    def sweep(self) -> int:
+        with self._lock:
+            return self._sweep_expired()
+    
+    def _remove(self, key: str, notify: bool = True) -> None:
+        """
+        Hapus satu entry dan update pemakaian byte (lock harus sudah dipegang)
+        """
+        cached_item = self.entries.pop(key)
+        self._expiry_order.pop(key, None)
+        self.bytes_used -= cached_item["size"]
+        for section in cached_item["sections"]:
+            section_keys = self._section_keys.get(section)
+            if section_keys is not None:
+                section_keys.discard(key)
+                if not section_keys:
+                    del self._section_keys[section]
+        if notify:
+            self._notify_remove(key)
+    
+    def _maybe_sweep(self) -> None:
+        """
+        Sweep entry expired secara amortized setiap CACHE_SWEEP_INTERVAL operasi
+        """
+        self._ops_since_sweep += 1
+        if self._ops_since_sweep < CACHE_SWEEP_INTERVAL:
+            return
+        self._ops_since_sweep = 0
+        self._sweep_expired()
+    
+    def _sweep_expired(self) -> int:
+        """
+        Hapus entry expired dari depan _expiry_order (lock harus sudah dipegang)
+        Hanya menyentuh entry yang memang sudah expired
+        """
+        deadline = time.time() - self.ttl
+        removed = 0
+        while self._expiry_order:
+            key, timestamp = next(iter(self._expiry_order.items()))
+            if timestamp >= deadline:
+                break
+            self._remove(key)
+            removed += 1
+        self.expirations += removed
+        return removed
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "bytes_used": self.bytes_used,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+class SQLiteBackend(CacheBackend):
+    name = "sqlite"
+    
+    def __init__(self, path: str = CACHE_SQLITE_PATH, ttl: int = CACHE_TTL,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        """
+        Satu file SQLite (mode WAL) yang dibuka oleh semua worker
+        Reader tidak memblokir writer, dan data tetap ada setelah restart
+        """
+        super().__init__(ttl)
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._ops_since_sweep = 0
+        # Hit counter ditampung di memori lalu di-flush saat sweep (hindari write per read)
+        self._pending_hits: Counter = Counter()
+        
+        self.evictions = 0
+        self.expirations = 0
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answer_cache ("
+            "key TEXT PRIMARY KEY, question TEXT NOT NULL, value TEXT NOT NULL, "
+            "timestamp REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0, "
+            "sections TEXT NOT NULL DEFAULT '')"
+        )
+        # File cache lama (sebelum ada kolom sections) tetap bisa dipakai
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(answer_cache)")}
+        if "sections" not in columns:
+            self._conn.execute("ALTER TABLE answer_cache ADD COLUMN sections TEXT NOT NULL DEFAULT ''")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_answer_cache_timestamp ON answer_cache (timestamp)"
+        )
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            self._maybe_sweep()
+            row = self._conn.execute(
+                "SELECT value, timestamp FROM answer_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            value, timestamp = row
+            if time.time() - timestamp > self.ttl:
+                self._conn.execute("DELETE FROM answer_cache WHERE key = ?", (key,))
+                self.expirations += 1
+                self._notify_remove(key)
+                return None
+            
+            self._pending_hits[key] += 1
+            return value
+    
+    def set(self, key: str, question: str, value: str, sections: Iterable[str] = ()) -> None:
+        # Format "|profil|jurusan|" agar bisa dicari dengan LIKE '%|section|%'
+        sections_text = "".join(f"|{section}" for section in sections) + "|" if sections else ""
+        with self._lock:
+            self._maybe_sweep()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answer_cache (key, question, value, timestamp, hits, sections) "
+                "VALUES (?, ?, ?, ?, 0, ?)",
+                (key, question, value, time.time(), sections_text)
+            )
+    
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM answer_cache WHERE key = ?", (key,))
+            self._pending_hits.pop(key, None)
+    
+    def invalidate_sections(self, sections: Iterable[str]) -> int:
+        patterns = [f"%|{section}|%" for section in sections]
+        if not patterns:
+            return 0
+        where = " OR ".join("sections LIKE ?" for _ in patterns)
+        with self._lock:
+            keys = [row[0] for row in self._conn.execute(
+                f"SELECT key FROM answer_cache WHERE {where}", patterns
+            )]
+            self._conn.execute(f"DELETE FROM answer_cache WHERE {where}", patterns)
+            for key in keys:
+                self._pending_hits.pop(key, None)
+        for key in keys:
+            self._notify_remove(key)
+        return len(keys)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM answer_cache")
+            self._pending_hits.clear()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM answer_cache").fetchone()[0]
+    
+    def hottest(self, limit: int) -> List[Tuple[str, str]]:
+        with self._lock:
+            self._flush_hits()
+            rows = self._conn.execute(
+                "SELECT key, question FROM answer_cache WHERE timestamp >= ? "
+                "ORDER BY hits DESC LIMIT ?",
+                (time.time() - self.ttl, limit)
+            ).fetchall()
+        return [(key, question) for key, question in rows]
+    
+    def sweep(self) -> int:
+        with self._lock:
+            return self._sweep_expired()
+    
+    def _maybe_sweep(self) -> None:
+        """
+        Sweep amortized setiap CACHE_SWEEP_INTERVAL operasi (lock harus sudah dipegang)
+        """
+        self._ops_since_sweep += 1
+        if self._ops_since_sweep < CACHE_SWEEP_INTERVAL:
+            return
+        self._ops_since_sweep = 0
+        self._sweep_expired()
+    
+    def _flush_hits(self) -> None:
+        if self._pending_hits:
+            self._conn.executemany(
+                "UPDATE answer_cache SET hits = hits + ? WHERE key = ?",
+                [(count, key) for key, count in self._pending_hits.items()]
+            )
+            self._pending_hits.clear()
+    
+    def _sweep_expired(self) -> int:
+        """
+        Flush hit counter, buang entry expired, lalu pangkas entry tertua di atas max_entries
+        """
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._flush_hits()
+            expired = self._conn.execute(
+                "DELETE FROM answer_cache WHERE timestamp < ?", (time.time() - self.ttl,)
+            ).rowcount
+            overflow = self._conn.execute("SELECT COUNT(*) FROM answer_cache").fetchone()[0] - self.max_entries
+            evicted = 0
+            if overflow > 0:
+                evicted = self._conn.execute(
+                    "DELETE FROM answer_cache WHERE key IN "
+                    "(SELECT key FROM answer_cache ORDER BY timestamp ASC LIMIT ?)",
+                    (overflow,)
+                ).rowcount
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        
+        self.expirations += expired
+        self.evictions += evicted
+        return expired
+    
+    def stats(self) -> Dict[str, Any]:
+        try:
+            bytes_used = os.path.getsize(self.path)
+        except OSError:
+            bytes_used = 0
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "max_entries": self.max_entries,
+            "bytes_used": bytes_used,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+class RedisBackend(CacheBackend):
+    name = "redis"
+    
+    def __init__(self, url: str = CACHE_REDIS_URL, ttl: int = CACHE_TTL,
+                 prefix: str = "smkn4:cache:", client: Any = None,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        """
+        Entry disimpan sebagai hash {q, v} dengan EXPIRE = TTL
+        Popularitas dicatat di sorted set <prefix>hot untuk warm-up; entry paling tidak
+        populer dibuang jika jumlahnya melewati max_entries
+        Waktu expired di sorted set <prefix>expiry dan section per key di hash <prefix>meta,
+        sehingga sweep bisa merapikan hot / section set untuk key yang sudah di-expire Redis
+        client bisa diinjeksi (misalnya fakeredis) untuk pengujian lokal
+        """
+        super().__init__(ttl)
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("CACHE_BACKEND=redis membutuhkan package 'redis'") from e
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self._client = client
+        self.prefix = prefix
+        self.max_entries = max_entries
+        self._hot_key = f"{prefix}hot"
+        self._expiry_key = f"{prefix}expiry"
+        self._meta_key = f"{prefix}meta"
+        self._lock = threading.Lock()
+        self._ops_since_sweep = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+    
+    def get(self, key: str) -> Optional[str]:
+        # Satu round trip: ambil value + naikkan skor popularitas (hanya jika member ada)
+        pipe = self._client.pipeline()
+        pipe.hget(self._key(key), "v")
+        pipe.zadd(self._hot_key, {key: 1}, xx=True, incr=True)
+        value, _ = pipe.execute()
+        self._maybe_sweep()
+        return value
+    
+    def _section_key(self, section: str) -> str:
+        return f"{self.prefix}section:{section}"
+    
+    def set(self, key: str, question: str, value: str, sections: Iterable[str] = ()) -> None:
+        sections = list(sections)
+        pipe = self._client.pipeline()
+        pipe.hset(self._key(key), mapping={"q": question, "v": value})
+        pipe.expire(self._key(key), self.ttl)
+        pipe.zadd(self._hot_key, {key: 0}, nx=True)
+        pipe.zadd(self._expiry_key, {key: time.time() + self.ttl})
+        pipe.hset(self._meta_key, key, "\n".join(sections))
+        for section in sections:
+            pipe.sadd(self._section_key(section), key)
+        pipe.zcard(self._hot_key)
+        size = pipe.execute()[-1]
+        if self.max_entries and size > self.max_entries:
+            self._evict_overflow(size - self.max_entries)
+        self._maybe_sweep()
+    
+    def _remove_keys(self, keys: List[str], notify: bool = True) -> None:
+        """
+        Hapus entry beserta jejaknya di hot, expiry, meta, dan section set
+        """
+        if not keys:
+            return
+        metas = self._client.hmget(self._meta_key, keys)
+        pipe = self._client.pipeline()
+        for key, meta in zip(keys, metas):
+            pipe.delete(self._key(key))
+            for section in meta.split("\n") if meta else ():
+                pipe.srem(self._section_key(section), key)
+        pipe.zrem(self._hot_key, *keys)
+        pipe.zrem(self._expiry_key, *keys)
+        pipe.hdel(self._meta_key, *keys)
+        pipe.execute()
+        if notify:
+            for key in keys:
+                self._notify_remove(key)
+    
+    def _evict_overflow(self, count: int) -> None:
+        """
+        Pangkas entry paling tidak populer di atas max_entries (ZREMRANGEBYRANK dalam satu MULTI
+        agar key yang dibaca sama dengan yang dibuang, walau beberapa worker menulis bersamaan)
+        """
+        pipe = self._client.pipeline(transaction=True)
+        pipe.zrange(self._hot_key, 0, count - 1)
+        pipe.zremrangebyrank(self._hot_key, 0, count - 1)
+        victims, _ = pipe.execute()
+        self._remove_keys(victims)
+        with self._lock:
+            self.evictions += len(victims)
+    
+    def delete(self, key: str) -> None:
+        self._remove_keys([key], notify=False)
+    
+    def invalidate_sections(self, sections: Iterable[str]) -> int:
+        section_keys = [self._section_key(section) for section in sections]
+        if not section_keys:
+            return 0
+        keys = list(self._client.sunion(section_keys))
+        self._remove_keys(keys)
+        self._client.delete(*section_keys)
+        return len(keys)
+    
+    def clear(self) -> None:
+        keys = list(self._client.scan_iter(match=f"{self.prefix}*"))
+        if keys:
+            self._client.delete(*keys)
+    
+    def __len__(self) -> int:
+        return self._client.zcard(self._hot_key)
+    
+    def hottest(self, limit: int) -> List[Tuple[str, str]]:
+        keys = self._client.zrevrange(self._hot_key, 0, limit - 1)
+        pipe = self._client.pipeline()
+        for key in keys:
+            pipe.hget(self._key(key), "q")
+        questions = pipe.execute()
+        return [(key, question) for key, question in zip(keys, questions) if question is not None]
+    
+    def _maybe_sweep(self) -> None:
+        """
+        Sweep amortized setiap CACHE_SWEEP_INTERVAL operasi
+        """
+        with self._lock:
+            self._ops_since_sweep += 1
+            if self._ops_since_sweep < CACHE_SWEEP_INTERVAL:
+                return
+            self._ops_since_sweep = 0
+        self.sweep()
+    
+    def sweep(self) -> int:
+        """
+        Redis sudah membuang hash entry expired sendiri; buang jejaknya di hot / meta / section set
+        Hanya membaca key yang memang sudah expired (sorted set expiry)
+        """
+        expired = self._client.zrangebyscore(self._expiry_key, "-inf", time.time())
+        self._remove_keys(expired)
+        with self._lock:
+            self.expirations += len(expired)
+        return len(expired)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "prefix": self.prefix,
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+class _NamespaceRouter:
+    """
+    Dipasang di on_remove backend bersama: notifikasi key "ns:..." diteruskan ke
+    NamespacedBackend pemiliknya, key tanpa namespace ke listener semula (cache default)
+    """
+    def __init__(self, backend: CacheBackend):
+        self.fallback = backend.on_remove
+        self.namespaces: Dict[str, "NamespacedBackend"] = {}
+        backend.on_remove = self.dispatch
+    
+    @classmethod
+    def install(cls, backend: CacheBackend) -> "_NamespaceRouter":
+        router = getattr(backend.on_remove, "__self__", None)
+        if isinstance(router, cls):
+            return router
+        return cls(backend)
+    
+    def dispatch(self, key: str) -> None:
+        namespace, separator, local_key = key.partition(":")
+        owner = self.namespaces.get(namespace) if separator else None
+        if owner is not None:
+            owner._on_inner_remove(local_key)
+        elif self.fallback is not None:
+            self.fallback(key)
+
+class NamespacedBackend(CacheBackend):
+    """
+    View satu namespace (tenant) di atas backend bersama
+    Semua tenant berbagi satu LRU dan satu budget byte/entry milik backend tersebut;
+    key dan section diberi prefix "namespace:" sehingga tidak bertabrakan
+    """
+    def __init__(self, inner: CacheBackend, namespace: str):
+        """
+        _keys: key milik namespace ini yang ditulis proses ini (untuk len / stats)
+        Entry namespace juga ditandai section "namespace:*" agar clear() cukup satu invalidasi
+        """
+        super().__init__(inner.ttl)
+        self.name = inner.name
+        self.blocking = inner.blocking
+        self.inner = inner
+        self.namespace = namespace
+        self.prefix = f"{namespace}:"
+        self._all_section = f"{namespace}:*"
+        self._keys: Set[str] = set()
+        self._lock = threading.Lock()
+        self._router = _NamespaceRouter.install(inner)
+        self._router.namespaces[namespace] = self
+    
+    def get(self, key: str) -> Optional[str]:
+        return self.inner.get(self.prefix + key)
+    
+    def set(self, key: str, question: str, value: str, sections: Iterable[str] = ()) -> None:
+        tagged = [self.prefix + section for section in sections]
+        tagged.append(self._all_section)
+        with self._lock:
+            self._keys.add(key)
+        self.inner.set(self.prefix + key, question, value, tagged)
+    
+    def delete(self, key: str) -> None:
+        self.inner.delete(self.prefix + key)
+        with self._lock:
+            self._keys.discard(key)
+    
+    def invalidate_sections(self, sections: Iterable[str]) -> int:
+        return self.inner.invalidate_sections([self.prefix + section for section in sections])
+    
+    def clear(self) -> None:
+        self.inner.invalidate_sections([self._all_section])
+        with self._lock:
+            self._keys.clear()
+    
+    def detach(self) -> int:
+        """
+        Buang semua entry namespace dan lepas dari router (tenant dibongkar)
+        """
+        removed = self.inner.invalidate_sections([self._all_section])
+        self._router.namespaces.pop(self.namespace, None)
+        with self._lock:
+            self._keys.clear()
+        return removed
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def hottest(self, limit: int) -> List[Tuple[str, str]]:
+        entries = [(key[len(self.prefix):], question) for key, question in self.inner.hottest(limit * 4)
+                   if key.startswith(self.prefix)]
+        return entries[:limit]
+    
+    def sweep(self) -> int:
+        return self.inner.sweep()
+    
+    def _on_inner_remove(self, key: str) -> None:
+        with self._lock:
+            self._keys.discard(key)
+        self._notify_remove(key)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "namespace": self.namespace, "shared": True}
+
+def create_backend(name: str, ttl: int = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES,
+                   max_bytes: int = CACHE_MAX_BYTES) -> CacheBackend:
+    """
+    Buat backend berdasarkan nama di config (CACHE_BACKEND)
+    """
+    if name == "memory":
+        return MemoryBackend(ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+    if name == "sqlite":
+        return SQLiteBackend(ttl=ttl, max_entries=max_entries)
+    if name == "redis":
+        return RedisBackend(ttl=ttl, max_entries=max_entries)
+    raise ValueError(f"CACHE_BACKEND tidak dikenal: {name}")
@@ -1,20 +1,51 @@
 """
 Cache Service
 Menyimpan hasil query agar tidak perlu memanggil LLM berulang kali
-Menggunakan dictionary sederhana dengan TTL (Time To Live)
+Storage bisa diganti (memory LRU / SQLite / Redis) lewat CACHE_BACKEND
+Exact match MD5 dilengkapi semantic index untuk pertanyaan yang mirip
 """
 import time
+import asyncio
 import hashlib
-from typing import Optional, Dict, Any
-from app.core.config import CACHE_ENABLED, CACHE_TTL
+import threading
+from typing import Optional, Dict, Any, Iterable
+from app.core.config import (
+    CACHE_ENABLED,
+    CACHE_BACKEND,
+    CACHE_MAX_ENTRIES,
+    CACHE_WARM_ENTRIES,
+    SEMANTIC_CACHE_ENABLED,
+    SIMILARITY_THRESHOLD
+)
+from app.services.cache_backends import CacheBackend, create_backend
+from app.services.semantic_index import SemanticIndex
 
 class CacheService:
-    def __init__(self):
+    def __init__(self, backend: Optional[CacheBackend] = None, warm_entries: int = CACHE_WARM_ENTRIES):
         """
         Inisialisasi cache storage
-        cache_data: menyimpan {key: {"value": response, "timestamp": time}}
+        backend: tempat jawaban disimpan (default sesuai CACHE_BACKEND)
+        semantic_index: indeks near-duplicate milik proses ini, di-warm dari entry terpopuler
         """
-        self.cache_data: Dict[str, Dict[str, Any]] = {}
+        self.backend = backend if backend is not None else create_backend(CACHE_BACKEND)
+        self._lock = threading.Lock()
+        self.semantic_index = (SemanticIndex(SIMILARITY_THRESHOLD, max_size=CACHE_MAX_ENTRIES)
+                               if SEMANTIC_CACHE_ENABLED else None)
+        self.backend.on_remove = self._on_backend_remove
+        
+        self.hits = 0
+        self.misses = 0
+        self.semantic_hits = 0
+        self.semantic_lookups = 0
+        self.semantic_lookup_seconds = 0.0
+        self.warmed_entries = 0
+        
+        if CACHE_ENABLED and warm_entries > 0:
+            self.warm_up(warm_entries)
+    
+    @property
+    def ttl(self) -> int:
+        return self.backend.ttl
     
     def _generate_key(self, question: str) -> str:
         """
@@ -33,49 +64,139 @@ class CacheService:
         if not CACHE_ENABLED:
             return None
         
-        key = self._generate_key(question)
-        
-        if key not in self.cache_data:
-            return None
+        value = self.backend.get(self._generate_key(question))
+        if value is None and self.semantic_index is not None:
+            value = self._get_similar(question)
         
-        cached_item = self.cache_data[key]
-        current_time = time.time()
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+    
+    async def aget(self, question: str) -> Optional[str]:
+        """
+        Versi async dari get: backend dengan I/O (sqlite/redis) dibaca di thread agar event loop
+        tidak tertahan; memory backend langsung (lebih murah daripada pindah thread)
+        """
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.get, question)
+        return self.get(question)
+    
+    def _get_similar(self, question: str) -> Optional[str]:
+        """
+        Fallback near-duplicate: cari pertanyaan tersimpan yang cukup mirip
+        """
+        start = time.perf_counter()
+        with self._lock:
+            match = self.semantic_index.lookup(question)
+            self.semantic_lookups += 1
+            self.semantic_lookup_seconds += time.perf_counter() - start
         
-        # Check apakah cache sudah expired
-        if current_time - cached_item["timestamp"] > CACHE_TTL:
-            # Hapus cache yang sudah expired
-            del self.cache_data[key]
+        if match is None:
             return None
         
-        return cached_item["value"]
+        value = self.backend.get(match[0])
+        with self._lock:
+            if value is None:
+                # Entry sudah dibuang (mis. oleh worker lain); rapikan indeks
+                self.semantic_index.remove(match[0])
+            else:
+                self.semantic_hits += 1
+        return value
     
-    def set(self, question: str, answer: str) -> None:
+    def set(self, question: str, answer: str, sections: Iterable[str] = ()) -> None:
         """
         Menyimpan jawaban ke cache
+        sections: section data yang menjadi context jawaban (untuk invalidasi saat reload)
         """
         if not CACHE_ENABLED:
             return
         
         key = self._generate_key(question)
-        self.cache_data[key] = {
-            "value": answer,
-            "timestamp": time.time()
-        }
+        self.backend.set(key, question, answer, sections)
+        if self.semantic_index is not None:
+            with self._lock:
+                self.semantic_index.add(key, question)
+    
+    async def aset(self, question: str, answer: str, sections: Iterable[str] = ()) -> None:
+        """
+        Versi async dari set (lihat aget)
+        """
+        if self.backend.blocking:
+            await asyncio.to_thread(self.set, question, answer, sections)
+        else:
+            self.set(question, answer, sections)
+    
+    def warm_up(self, limit: int = CACHE_WARM_ENTRIES) -> int:
+        """
+        Muat entry terpopuler dari backend ke semantic index
+        Berguna untuk backend persisten (sqlite/redis) setelah restart
+        """
+        if self.semantic_index is None:
+            return 0
+        
+        entries = self.backend.hottest(limit)
+        with self._lock:
+            for key, question in entries:
+                self.semantic_index.add(key, question)
+            self.warmed_entries += len(entries)
+        return len(entries)
+    
+    def invalidate_sections(self, sections: Iterable[str]) -> int:
+        """
+        Hapus hanya jawaban yang berasal dari section data yang berubah
+        """
+        return self.backend.invalidate_sections(sections)
+    
+    def _on_backend_remove(self, key: str) -> None:
+        """
+        Callback dari backend saat entry dibuang (eviction/expired)
+        """
+        if self.semantic_index is not None:
+            with self._lock:
+                self.semantic_index.remove(key)
+    
+    def sweep(self) -> int:
+        """
+        Paksa sweep entry expired sekarang
+        """
+        return self.backend.sweep()
     
     def clear(self) -> None:
         """
         Membersihkan seluruh cache
         """
-        self.cache_data.clear()
+        self.backend.clear()
+        if self.semantic_index is not None:
+            with self._lock:
+                self.semantic_index.clear()
     
     def stats(self) -> Dict[str, Any]:
         """
         Mengembalikan statistik cache
         """
+        lookups = self.hits + self.misses
         return {
-            "total_cached": len(self.cache_data),
+            "total_cached": len(self.backend),
             "enabled": CACHE_ENABLED,
-            "ttl_seconds": CACHE_TTL
+            "ttl_seconds": self.ttl,
+            **self.backend.stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "semantic": {
+                "enabled": self.semantic_index is not None,
+                "threshold": SIMILARITY_THRESHOLD,
+                "indexed": len(self.semantic_index) if self.semantic_index is not None else 0,
+                "warmed_entries": self.warmed_entries,
+                "hits": self.semantic_hits,
+                # Porsi hit yang hanya didapat berkat semantic lookup
+                "hit_rate_gain": round(self.semantic_hits / lookups, 4) if lookups else 0.0,
+                "avg_lookup_us": round(self.semantic_lookup_seconds / self.semantic_lookups * 1e6, 1)
+                                 if self.semantic_lookups else 0.0
+            }
         }
 
 # Global cache instance
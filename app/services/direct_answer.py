@@ -0,0 +1,286 @@
+"""
+Direct Answer Engine
+Tabel rule deklaratif (pattern → path JSON → template jawaban) untuk jawaban tanpa LLM
+Semua rule dikompilasi sekali menjadi satu KeywordIndex, jawaban di-render (dan di-encode JSON) saat load
+"""
+import re
+from typing import Any, Callable, Dict, List, Optional, Set
+from app.core.config import SCHOOL_NAME
+from app.core.text import content_tokens, stemmed_tokens
+from app.core.fast_json import preencode
+from app.services.keyword_index import KeywordIndex
+
+# Urutan = prioritas: jika beberapa rule cocok, rule paling atas yang dipakai
+# - patterns: frasa pemicu (dicocokkan per kata, bukan substring)
+# - exclude: frasa yang membatalkan rule
+# - requires: rule hanya aktif jika salah satu frasa ini juga muncul (topik pendamping),
+#   kecuali pertanyaan hanya berisi kata pemicu ("alamatnya dimana?")
+# - path: lokasi data di info_sekolah.json (divalidasi saat startup)
+# - template: format jawaban ({value}, {count}, {school} = nama sekolah); None = serahkan ke LLM
+# - format: cara mengubah data menjadi {value} (lihat VALUE_FORMATTERS)
+
+# Pertanyaan harus tentang sekolahnya, bukan ruang / orang / kegiatan di dalamnya
+SCHOOL_TERMS = ["sekolah", "smk", "smkn"]
+# Data profil milik sekolah, bukan milik orang / organisasi ini
+PERSON_TERMS = ["guru", "kepala", "wakil", "waka", "wali", "staf", "staff", "karyawan", "siswa",
+                "murid", "alumni", "osis", "ketua", "pembina", "pak", "bu", "bapak", "ibu"]
+# Kontak pribadi bukan data profil orang tersebut
+CONTACT_TERMS = ["hp", "nomor", "telepon", "telpon", "wa", "whatsapp", "email", "instagram", "ig",
+                 "rumah", "alamat"]
+# Jumlah per kelompok dijawab structured query / LLM, bukan total sekolah
+GROUP_TERMS = ["per", "setiap", "tiap", "masing", "jurusan", "kelas", "rombel", "rata",
+               "ekskul", "ekstrakurikuler"]
+
+DIRECT_ANSWER_RULES: List[Dict[str, Any]] = [
+    {
+        # Pertanyaan definisi lebih baik dijelaskan LLM
+        "name": "penjelasan_jurusan",
+        "patterns": ["apa itu rpl", "rpl itu apa", "apa itu tkj", "tkj itu apa",
+                     "apa itu mm", "multimedia itu apa"],
+        "template": None
+    },
+    {
+        "name": "nama_sekolah",
+        "patterns": ["nama sekolah", "nama smk"],
+        "path": ["profil", "nama"],
+        "template": "{value} adalah sekolah menengah kejuruan yang berlokasi di Bojonegoro."
+    },
+    {
+        "name": "alamat",
+        "patterns": ["alamat", "lokasi", "letak", "di mana", "dimana"],
+        "requires": SCHOOL_TERMS,
+        "exclude": PERSON_TERMS + ["email", "ruang", "lab", "laboratorium", "bengkel", "kantin",
+                                   "perpustakaan", "pkl", "prakerin", "magang", "kerja", "industri",
+                                   "mitra", "daftar", "pendaftaran", "tes", "ujian"],
+        "path": ["profil", "alamat"],
+        "template": "{school} berlokasi di {value}. Sekolah ini mudah diakses dan berada di lokasi strategis."
+    },
+    {
+        "name": "kepala_sekolah",
+        "patterns": ["kepala sekolah", "kepsek"],
+        "exclude": ["wakil", "waka"] + CONTACT_TERMS,
+        "path": ["profil", "kepala_sekolah"],
+        "format": "person",
+        "template": "Kepala Sekolah {school} saat ini adalah {value}."
+    },
+    {
+        "name": "jumlah_siswa",
+        "patterns": ["berapa siswa", "jumlah siswa", "banyak siswa", "total siswa"],
+        "exclude": GROUP_TERMS + ["laki", "perempuan", "putra", "putri", "baru", "diterima", "kuota",
+                                  "lulusan"],
+        "path": ["profil", "jumlah_siswa"],
+        "template": "{school} memiliki {value} siswa yang tersebar di berbagai jurusan."
+    },
+    {
+        "name": "jumlah_guru",
+        "patterns": ["berapa guru", "jumlah guru", "banyak guru", "total guru"],
+        "exclude": GROUP_TERMS + ["produktif", "honorer", "pns", "mapel", "pelajaran"],
+        "path": ["profil", "jumlah_guru"],
+        "template": "Sekolah ini memiliki {value} guru profesional yang siap membimbing siswa."
+    },
+    {
+        "name": "daftar_jurusan",
+        "patterns": ["jurusan apa", "ada jurusan", "jurusan yang tersedia", "jurusan di"],
+        # Pertanyaan jumlah kelas / prestasi per jurusan dijawab structured query
+        "exclude": ["kelas", "prestasi", "terbanyak", "paling"],
+        "path": ["jurusan"],
+        "format": "names",
+        "template": "{school} memiliki {count} jurusan unggulan: {value}. Semua jurusan dirancang untuk mempersiapkan siswa memasuki dunia kerja atau melanjutkan kuliah."
+    },
+    {
+        "name": "akreditasi",
+        "patterns": ["akreditasi"],
+        "path": ["profil", "akreditasi"],
+        "template": "{school} berakreditasi {value}, yang menunjukkan kualitas pendidikan yang baik dan terstandar."
+    },
+    {
+        "name": "visi",
+        "patterns": ["visi"],
+        "exclude": ["misi"],
+        "path": ["profil", "visi"],
+        "template": "Visi {school}: {value}"
+    },
+    {
+        "name": "telepon",
+        "patterns": ["telepon", "telpon", "no telp", "nomor telepon"],
+        "exclude": PERSON_TERMS,
+        "path": ["profil", "telpon"],
+        "template": "Nomor telepon {school}: {value}."
+    },
+    {
+        "name": "email",
+        "patterns": ["email", "e mail"],
+        "exclude": PERSON_TERMS,
+        "path": ["profil", "email"],
+        "template": "Email resmi {school}: {value}."
+    },
+    {
+        "name": "instagram",
+        "patterns": ["instagram", "ig"],
+        "exclude": PERSON_TERMS + ["jurusan", "ekskul", "ekstrakurikuler"],
+        "path": ["profil", "instagram"],
+        "template": "Instagram resmi {school}: {value}."
+    },
+    {
+        "name": "website",
+        "patterns": ["website", "situs"],
+        "exclude": PERSON_TERMS + ["ppdb", "pendaftaran", "daftar"],
+        "path": ["profil", "website"],
+        "template": "Website resmi {school}: {value}."
+    },
+    {
+        "name": "tahun_berdiri",
+        "patterns": ["berdiri", "didirikan"],
+        "requires": SCHOOL_TERMS,
+        "exclude": GROUP_TERMS + ["osis", "gedung", "lab", "laboratorium", "masjid", "musholla"],
+        "path": ["profil", "tahun_berdiri"],
+        "template": "{school} berdiri pada tahun {value}."
+    },
+    {
+        "name": "luas_sekolah",
+        "patterns": ["luas sekolah", "luas tanah", "luas lahan"],
+        "path": ["profil", "luas"],
+        "template": "Luas area {school} adalah {value}."
+    },
+]
+
+def _format_names(value: Any) -> List[str]:
+    """
+    Ambil nama unik dari list campuran string / {"nama": ...}
+    """
+    names: List[str] = []
+    for item in value:
+        name = item.get("nama") if isinstance(item, dict) else item
+        if isinstance(name, str) and name not in names:
+            names.append(name)
+    return names
+
+def _format_list(value: Any) -> List[str]:
+    return [str(item) for item in value]
+
+def _format_person(value: Any) -> List[str]:
+    """
+    Nama dengan gelar dipisah koma: "Abdul Fatah, S.Pd. M.MPd." -> "Abdul Fatah, S.Pd., M.MPd."
+    """
+    name, _, titles = str(value).partition(",")
+    titles = re.split(r"[\s,]+", titles.strip())
+    return [", ".join([name.strip()] + [title for title in titles if title])]
+
+# Formatter menghasilkan list item; {value} = item digabung koma, {count} = jumlah item
+VALUE_FORMATTERS: Dict[str, Callable[[Any], List[str]]] = {
+    "names": _format_names,
+    "list": _format_list,
+    "person": _format_person,
+}
+
+class DirectAnswerEngine:
+    def __init__(self, data: Dict[str, Any], rules: List[Dict[str, Any]] = DIRECT_ANSWER_RULES,
+                 school_name: str = SCHOOL_NAME):
+        """
+        Compile rules terhadap data yang sudah di-load
+        school_name: pengisi {school} di template (per tenant)
+        answers: index rule -> jawaban yang sudah di-render (None = serahkan ke LLM)
+        broken_rules: rule yang path-nya tidak ada / kosong di data (tidak pernah aktif)
+        bare_tokens: rule dengan requires -> token pattern-nya (cek pertanyaan tanpa topik lain)
+        """
+        self.rules = rules
+        self.school_name = school_name
+        self.answers: Dict[int, Optional[str]] = {}
+        self.broken_rules: List[str] = []
+        self.hits: Dict[str, int] = {rule["name"]: 0 for rule in rules}
+        self.bare_tokens: Dict[int, Set[str]] = {}
+        self.index: KeywordIndex = KeywordIndex()
+        
+        for position, rule in enumerate(rules):
+            if rule["template"] is not None:
+                answer = self._render(rule, data)
+                if answer is None:
+                    self.broken_rules.append(rule["name"])
+                    continue
+                self.answers[position] = preencode(answer)
+            else:
+                self.answers[position] = None
+            
+            if "requires" in rule:
+                self.bare_tokens[position] = {token for pattern in rule["patterns"]
+                                              for token in stemmed_tokens(pattern)}
+            for kind in ("patterns", "exclude", "requires"):
+                for pattern in rule.get(kind, []):
+                    self.index.add(pattern, (position, kind))
+        
+        if self.broken_rules:
+            print(f"Warning: direct answer rule tanpa data: {', '.join(self.broken_rules)}")
+    
+    def _render(self, rule: Dict[str, Any], data: Dict[str, Any]) -> Optional[str]:
+        """
+        Resolve path dan render template sekali
+        Titik penutup template tidak digandakan jika nilai sudah diakhiri titik ("M.Pd.")
+        Return None jika path tidak ada atau nilainya kosong
+        """
+        value: Any = data
+        for key in rule["path"]:
+            if not isinstance(value, dict) or key not in value:
+                return None
+            value = value[key]
+        if value in (None, "", [], {}):
+            return None
+        
+        formatter = VALUE_FORMATTERS.get(rule.get("format", ""))
+        items = formatter(value) if formatter is not None else [str(value)]
+        text = ", ".join(items)
+        template = rule["template"]
+        if text.endswith("."):
+            template = template.replace("{value}.", "{value}")
+        return template.format(value=text, count=len(items), school=self.school_name)
+    
+    def match(self, question: str, count: bool = True) -> Optional[str]:
+        """
+        Satu lintasan atas token pertanyaan; rule prioritas tertinggi yang tidak di-exclude menang
+        Return None jika tidak ada rule yang cocok atau rule menyerahkan ke LLM
+        count: False untuk pengecekan internal (hit count rule tidak berubah)
+        """
+        matches = self.index.find_all(question)
+        if not matches:
+            return None
+        
+        found: Dict[str, set] = {"patterns": set(), "exclude": set(), "requires": set()}
+        for _, _, (position, kind) in matches:
+            found[kind].add(position)
+        candidates = [position for position in found["patterns"] - found["exclude"]
+                      if "requires" not in self.rules[position] or position in found["requires"]
+                      or self._is_bare(question, position)]
+        if not candidates:
+            return None
+        
+        position = min(candidates)
+        if count:
+            self.hits[self.rules[position]["name"]] += 1
+        return self.answers[position]
+    
+    def _is_bare(self, question: str, position: int) -> bool:
+        """
+        Pertanyaan hanya berisi kata pemicu rule ("dimana alamatnya") -> topik = sekolah ini
+        """
+        return set(content_tokens(question)) <= self.bare_tokens[position]
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit count per rule (urut terbanyak) dan rule yang rusak
+        """
+        return {
+            "rules": len(self.rules),
+            "broken_rules": self.broken_rules,
+            "hits": dict(sorted(self.hits.items(), key=lambda item: item[1], reverse=True))
+        }
+    
+    def carry_over_stats(self, previous: "DirectAnswerEngine") -> None:
+        """
+        Salin hit count dari engine versi data sebelumnya (setelah reload)
+        """
+        for name, hits in previous.hits.items():
+            if name in self.hits:
+                self.hits[name] += hits
+    
+    def reset_stats(self) -> None:
+        for name in self.hits:
+            self.hits[name] = 0
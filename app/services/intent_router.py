@@ -0,0 +1,328 @@
+"""
+Intent Router
+Klasifikasi intent lokal (CPU, tanpa LLM) untuk pertanyaan yang lolos direct / structured / cache
+- Model: regresi logistik multikelas atas hashed n-gram (kata, bigram kata, trigram karakter),
+  dilatih dari data berlabel INTENT_DATA_PATH; bobot disimpan sebagai JSON (sidik jari data + parameter)
+  sehingga proses baru cukup memuatnya (ms); data berubah -> dilatih ulang otomatis saat startup
+- greeting  -> jawaban template, off_topic -> penolakan sopan: keduanya tanpa LLM call,
+  hanya jika yakin dan pertanyaan tidak menyebut keyword / kosakata data sekolah
+- direct / structured / retrieval -> diteruskan ke retrieval + LLM dengan tier model per intent
+Model tidak bergantung isi data sekolah: dimuat sekali per proses dan dipakai bersama tenant
+"""
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import (
+    LLM_MODEL,
+    LLM_MODEL_LARGE,
+    INTENT_DATA_PATH,
+    INTENT_MODEL_PATH,
+    INTENT_HASH_BUCKETS,
+    INTENT_TRAIN_EPOCHS,
+    INTENT_MIN_CONFIDENCE,
+    INTENT_MODEL_TIERS
+)
+from app.core.metrics import Counter
+from app.core.text import char_ngrams, content_tokens, stemmed_tokens
+
+INTENTS = ("greeting", "direct", "structured", "retrieval", "off_topic")
+ROUTE_ACTIONS = ("greeting", "refuse", "llm")
+MODEL_TIERS = {"small": LLM_MODEL, "large": LLM_MODEL_LARGE}
+
+# Naikkan jika cara ekstraksi fitur / training berubah (bobot lama otomatis dilatih ulang)
+INTENT_MODEL_FORMAT_VERSION = 1
+
+GREETING_MESSAGE = ("Halo! Saya asisten virtual {school}. Silakan tanyakan tentang profil sekolah, "
+                    "jurusan, fasilitas, prestasi, ekstrakurikuler, atau pendaftaran.")
+THANKS_MESSAGE = "Sama-sama! Jika ada yang ingin ditanyakan lagi tentang {school}, silakan."
+THANKS_TOKENS = {"terima", "makasih", "trims", "thanks", "thank", "thx", "nuwun", "suwun"}
+
+INTENT_ROUTES = Counter("chatbot_intent_routes_total", "Keputusan intent router per intent dan aksi",
+                        ["intent", "action"])
+
+@lru_cache(maxsize=65536)
+def _token_features(token: str, buckets: int) -> Tuple[int, ...]:
+    """
+    Indeks hash kata + trigram karakternya; di-cache karena kosakata pertanyaan sangat berulang
+    """
+    grams = [f"w:{token}"] + [f"c:{gram}" for gram in char_ngrams(token)]
+    return tuple(zlib.crc32(gram.encode("utf-8")) % buckets for gram in grams)
+
+def features(text: str, buckets: int = INTENT_HASH_BUCKETS) -> Tuple[List[int], float]:
+    """
+    Hashed n-gram: kata, bigram kata, trigram karakter per kata, dan panjang pertanyaan
+    Return: (indeks fitur aktif, nilai bersama); nilai dinormalisasi (L2) agar skor
+    tidak bergantung panjang pertanyaan. crc32 (bukan hash()) supaya indeks sama di semua proses
+    """
+    tokens = stemmed_tokens(text)
+    indices = {zlib.crc32(f"n:{min(len(tokens), 6)}".encode("utf-8")) % buckets}
+    for position, token in enumerate(tokens):
+        indices.update(_token_features(token, buckets))
+        if position:
+            indices.add(zlib.crc32(f"b:{tokens[position - 1]} {token}".encode("utf-8")) % buckets)
+    return list(indices), 1.0 / math.sqrt(len(indices))
+
+def softmax(scores: List[float]) -> List[float]:
+    top = max(scores)
+    exps = [math.exp(score - top) for score in scores]
+    total = sum(exps)
+    return [value / total for value in exps]
+
+def load_examples(path: str = INTENT_DATA_PATH) -> List[Tuple[str, str]]:
+    """
+    Baca data berlabel: satu contoh per baris "<intent><TAB><pertanyaan>", baris "#" = komentar
+    """
+    examples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            intent, _, question = line.partition("\t")
+            if intent not in INTENTS or not question.strip():
+                raise ValueError(f"Baris data intent tidak valid: {line!r}")
+            examples.append((intent, question.strip()))
+    return examples
+
+class IntentModel:
+    """
+    Bobot linear sparse: hanya fitur yang muncul di data latih yang disimpan
+    """
+    def __init__(self, intents: Tuple[str, ...], bias: List[float],
+                 weights: Dict[int, List[float]], buckets: int):
+        self.intents = intents
+        self.bias = bias
+        self.weights = weights
+        self.buckets = buckets
+    
+    def scores(self, indices: List[int], value: float) -> List[float]:
+        rows = [row for row in map(self.weights.get, indices) if row is not None]
+        if not rows:
+            return list(self.bias)
+        return [bias + value * total for bias, total in zip(self.bias, map(sum, zip(*rows)))]
+    
+    def predict(self, question: str) -> Tuple[str, float]:
+        """
+        Return: (intent, probabilitas)
+        """
+        probabilities = softmax(self.scores(*features(question, self.buckets)))
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        return self.intents[best], probabilities[best]
+    
+    @classmethod
+    def train(cls, examples: List[Tuple[str, str]], buckets: int = INTENT_HASH_BUCKETS,
+              epochs: int = INTENT_TRAIN_EPOCHS, learning_rate: float = 0.5, seed: int = 0) -> "IntentModel":
+        """
+        SGD cross-entropy dengan learning rate menurun, urutan contoh diacak deterministik (seed)
+        """
+        intents = INTENTS
+        model = cls(intents, [0.0] * len(intents), {}, buckets)
+        samples = [(features(question, buckets), intents.index(intent)) for intent, question in examples]
+        order = list(range(len(samples)))
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(order)
+            rate = learning_rate / (1 + epoch * 0.1)
+            for sample in order:
+                (indices, value), label = samples[sample]
+                probabilities = softmax(model.scores(indices, value))
+                gradients = [rate * (probability - (position == label))
+                             for position, probability in enumerate(probabilities)]
+                for position, gradient in enumerate(gradients):
+                    model.bias[position] -= gradient
+                for index in indices:
+                    row = model.weights.get(index)
+                    if row is None:
+                        row = model.weights[index] = [0.0] * len(intents)
+                    for position, gradient in enumerate(gradients):
+                        row[position] -= gradient * value
+        return model
+    
+    def to_dict(self) -> Dict[str, Any]:
+        indices = sorted(self.weights)
+        return {
+            "intents": list(self.intents),
+            "buckets": self.buckets,
+            "bias": [round(value, 6) for value in self.bias],
+            "features": indices,
+            "weights": [[round(value, 6) for value in self.weights[index]] for index in indices]
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IntentModel":
+        return cls(tuple(data["intents"]), data["bias"],
+                   dict(zip(data["features"], data["weights"])), data["buckets"])
+
+def _fingerprint(data_path: str) -> Optional[str]:
+    """
+    Sidik jari data latih (byte mentah) + parameter training
+    """
+    try:
+        with open(data_path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    digest = hashlib.sha256(raw)
+    digest.update(repr((INTENTS, INTENT_HASH_BUCKETS, INTENT_TRAIN_EPOCHS,
+                        INTENT_MODEL_FORMAT_VERSION)).encode("utf-8"))
+    return digest.hexdigest()
+
+def load_intent_model(data_path: str = INTENT_DATA_PATH,
+                      model_path: Optional[str] = INTENT_MODEL_PATH) -> Tuple[Optional[IntentModel], Dict[str, Any]]:
+    """
+    Muat bobot dari model_path jika sidik jarinya cocok, selain itu latih dari data_path
+    lalu tulis (best effort, filesystem read-only cukup dilewati)
+    Return: (model atau None jika data latih tidak ada, info sumber + durasi)
+    """
+    start = time.perf_counter()
+    fingerprint = _fingerprint(data_path)
+    if fingerprint is None:
+        return None, {"source": "missing", "data_path": data_path}
+    
+    if model_path:
+        try:
+            with open(model_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get("fingerprint") == fingerprint:
+                model = IntentModel.from_dict(stored["model"])
+                return model, {"source": "json", "examples": stored["examples"], "features": len(model.weights),
+                               "load_ms": round((time.perf_counter() - start) * 1000, 2)}
+        except (OSError, ValueError, KeyError):
+            pass
+    
+    examples = load_examples(data_path)
+    model = IntentModel.train(examples)
+    if model_path:
+        tmp_path = f"{model_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": fingerprint, "examples": len(examples), "model": model.to_dict()}, f)
+            os.replace(tmp_path, model_path)
+        except OSError:
+            pass
+    return model, {"source": "trained", "examples": len(examples), "features": len(model.weights),
+                   "load_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+@lru_cache(maxsize=1)
+def shared_intent_model() -> Tuple[Optional[IntentModel], Dict[str, Any]]:
+    """
+    Satu model per proses untuk semua tenant, dimuat saat routing pertama
+    (request direct / cache tidak membayarnya)
+    """
+    return load_intent_model()
+
+class Route:
+    """
+    Keputusan router untuk satu pertanyaan
+    action: "greeting" / "refuse" (dijawab tanpa LLM) atau "llm"; model: nama model untuk LLM call
+    """
+    __slots__ = ("intent", "confidence", "action", "model")
+    
+    def __init__(self, intent: str, confidence: float, action: str, model: Optional[str]):
+        self.intent = intent
+        self.confidence = confidence
+        self.action = action
+        self.model = model
+    
+    def metadata(self) -> Dict[str, Any]:
+        metadata = {"name": self.intent, "confidence": round(self.confidence, 3), "action": self.action}
+        if self.model:
+            metadata["model"] = self.model
+        return metadata
+
+class IntentRouter:
+    def __init__(self, retrieval, min_confidence: float = INTENT_MIN_CONFIDENCE,
+                 tiers: Dict[str, str] = INTENT_MODEL_TIERS):
+        """
+        retrieval: sumber keyword trie dan kosakata BM25 tenant (pengaman greeting / off_topic)
+        """
+        self.retrieval = retrieval
+        self.min_confidence = min_confidence
+        self.tiers = tiers
+        self._lock = threading.Lock()
+        self.questions = 0
+        self.seconds = 0.0
+        self.guarded = 0
+    
+    @property
+    def model(self) -> Optional[IntentModel]:
+        return shared_intent_model()[0]
+    
+    def route(self, question: str) -> Optional[Route]:
+        """
+        Return None jika model tidak tersedia (data latih tidak ada): pipeline berjalan seperti biasa
+        """
+        model = self.model
+        if model is None:
+            return None
+        start = time.perf_counter()
+        intent, confidence = model.predict(question)
+        action = "llm"
+        if confidence >= self.min_confidence and intent in ("greeting", "off_topic"):
+            if self._mentions_school(question):
+                # Menyebut hal yang ada di data: biarkan retrieval + LLM yang menjawab
+                with self._lock:
+                    self.guarded += 1
+            else:
+                action = "greeting" if intent == "greeting" else "refuse"
+        tier = self.tiers.get(intent, "small") if confidence >= self.min_confidence else "small"
+        route = Route(intent, confidence, action, MODEL_TIERS[tier] if action == "llm" else None)
+        
+        elapsed = time.perf_counter() - start
+        INTENT_ROUTES.inc((intent, action))
+        with self._lock:
+            self.questions += 1
+            self.seconds += elapsed
+        return route
+    
+    def _mentions_school(self, question: str) -> bool:
+        """
+        Ada keyword mapping, atau mayoritas kata bermakna ada di data sekolah (nama guru, fasilitas, ...)
+        Satu kata umum yang kebetulan ada di data ("hari", "cara") tidak cukup
+        """
+        if self.retrieval.keyword_index.find_all(question):
+            return True
+        bm25 = self.retrieval.bm25
+        tokens = [token for token in content_tokens(question) if not token.isdigit()]
+        return bool(tokens) and sum(token in bm25 for token in tokens) * 2 >= len(tokens)
+    
+    def greeting_answer(self, question: str) -> str:
+        """
+        Jawaban template aksi greeting: sapaan atau balasan terima kasih
+        """
+        school = self.retrieval.school_name
+        if THANKS_TOKENS.intersection(stemmed_tokens(question)):
+            return THANKS_MESSAGE.format(school=school)
+        return GREETING_MESSAGE.format(school=school)
+    
+    def stats(self) -> Dict[str, Any]:
+        routes = INTENT_ROUTES.values()
+        loaded = shared_intent_model.cache_info().currsize > 0
+        return {
+            "questions": self.questions,
+            "avg_us": round(self.seconds / self.questions * 1e6, 2) if self.questions else 0.0,
+            "min_confidence": self.min_confidence,
+            "intents": {intent: int(sum(value for (name, _), value in routes.items() if name == intent))
+                        for intent in INTENTS},
+            "actions": {action: int(sum(value for (_, name), value in routes.items() if name == action))
+                        for action in ROUTE_ACTIONS},
+            # LLM call yang tidak terjadi karena dijawab template / ditolak
+            "llm_calls_avoided": int(sum(value for (_, action), value in routes.items() if action != "llm")),
+            "guarded": self.guarded,
+            # Model dimuat saat routing pertama; /stats tidak memicu load
+            "model": shared_intent_model()[1] if loaded else {"source": "not_loaded"}
+        }
+    
+    def reset_stats(self) -> None:
+        INTENT_ROUTES.reset()
+        with self._lock:
+            self.questions = 0
+            self.seconds = 0.0
+            self.guarded = 0
@@ -0,0 +1,61 @@
+"""
+Keyword Index
+Multi-pattern matcher berbasis token trie (batas kata)
+Semua frasa dikompilasi sekali; pencarian cukup satu lintasan atas token pertanyaan
+"""
+from typing import Any, Dict, Generic, List, Tuple, TypeVar
+from app.core.text import stemmed_tokens
+
+T = TypeVar("T")
+
+# Penanda akhir frasa di node trie (bukan token valid karena token hanya \w+)
+_END = "$"
+
+class KeywordIndex(Generic[T]):
+    def __init__(self):
+        """
+        _root: trie token {token: {token: ..., "$": [payload, ...]}}
+        """
+        self._root: Dict[str, Any] = {}
+        self.size = 0
+        self.max_depth = 0
+    
+    def add(self, phrase: str, payload: T) -> bool:
+        """
+        Daftarkan frasa; satu frasa boleh punya beberapa payload
+        Return False jika frasa kosong
+        """
+        tokens = stemmed_tokens(phrase)
+        if not tokens:
+            return False
+        
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(_END, []).append(payload)
+        self.size += 1
+        self.max_depth = max(self.max_depth, len(tokens))
+        return True
+    
+    def find_all(self, text: str) -> List[Tuple[int, int, T]]:
+        """
+        Semua frasa yang muncul di teks (utuh per kata, bukan substring)
+        Return: [(token_awal, token_akhir, payload), ...] urut posisi
+        """
+        tokens = stemmed_tokens(text)
+        root = self._root
+        matches = []
+        for start in range(len(tokens)):
+            node = root.get(tokens[start])
+            end = start
+            while node is not None:
+                for payload in node.get(_END, ()):
+                    matches.append((start, end + 1, payload))
+                end += 1
+                if end >= len(tokens):
+                    break
+                node = node.get(tokens[end])
+        return matches
+    
+    def __len__(self) -> int:
+        return self.size
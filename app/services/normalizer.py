@@ -0,0 +1,323 @@
+"""
+Question Normalizer
+Tahap paling awal pipeline: perbaiki singkatan/slang dan typo sebelum direct answer dan cache
+"brp siswa" -> "berapa siswa", "jurusn" -> "jurusan", "kpl sekolah" -> "kepala sekolah"
+- Slang/singkatan: kamus SLANG_DICTIONARY (lookup dict)
+- Typo: koreksi symmetric-delete (SymSpell) terhadap kosakata domain (keyword mapping, rule direct
+  answer, kamus slang, data latih intent router) yang dikompilasi sekali per proses dan dipakai bersama tenant;
+  kata dari JSON sekolah (kosakata BM25) tidak pernah "dikoreksi" dan menjadi kandidat cadangan
+Hasil per token di-cache, sehingga pertanyaan berulang cukup beberapa lookup dict
+"""
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from app.core.config import NORMALIZER_MAX_EDIT_DISTANCE, NORMALIZER_MIN_TOKEN_LENGTH, NORMALIZER_CACHE_SIZE
+from app.core.metrics import Counter
+from app.core.text import TOKEN_PATTERN, STOPWORDS, SCHOOL_TOKENS, stem, tokenize
+from app.services.direct_answer import DIRECT_ANSWER_RULES
+from app.services.intent_router import load_examples
+from app.services.query_engine import QUERY_VOCABULARY
+from app.services.retrieval_service import KEYWORD_MAPPING, retrieval_service
+
+NORMALIZED_QUESTIONS = Counter("chatbot_normalized_questions_total", "Pertanyaan yang ditulis ulang normalizer")
+NORMALIZER_REWRITES = Counter("chatbot_normalizer_rewrites_total", "Token yang ditulis ulang per jenis", ["kind"])
+NORMALIZER_CONVERSIONS = Counter("chatbot_normalizer_conversions_total",
+                                 "Pertanyaan yang baru terjawab tanpa LLM / mendapat context berkat normalisasi",
+                                 ["outcome"])
+CONVERSION_OUTCOMES = ("direct", "structured", "prerendered", "cache", "retrieval")
+
+# Singkatan dan slang chat siswa -> bentuk baku (satu token; boleh menjadi beberapa kata)
+SLANG_DICTIONARY: Dict[str, str] = {
+    # Kata tanya
+    "brp": "berapa", "brapa": "berapa", "berapakah": "berapa",
+    "dmn": "dimana", "dmna": "dimana", "dimn": "dimana",
+    "gmn": "bagaimana", "gmna": "bagaimana", "gimana": "bagaimana", "bgmn": "bagaimana",
+    "kpn": "kapan", "knp": "kenapa", "napa": "kenapa", "sapa": "siapa", "ap": "apa", "apaan": "apa",
+    # Sekolah dan data
+    "sklh": "sekolah", "sekolh": "sekolah", "skolah": "sekolah", "skl": "sekolah",
+    "kpl": "kepala", "kplsek": "kepsek", "jrsn": "jurusan", "jursan": "jurusan",
+    "ssw": "siswa", "mrd": "murid", "kls": "kelas", "thn": "tahun", "th": "tahun",
+    "jml": "jumlah", "jmlh": "jumlah", "almt": "alamat", "alamt": "alamat",
+    "tlp": "telepon", "tlpn": "telepon", "telfon": "telepon", "no": "nomor", "nmr": "nomor",
+    "fasil": "fasilitas", "eskul": "ekskul", "akre": "akreditasi", "akred": "akreditasi",
+    "pndftrn": "pendaftaran", "daftr": "daftar", "psb": "ppdb", "prest": "prestasi",
+    # Kata umum
+    "yg": "yang", "dg": "dengan", "dgn": "dengan", "utk": "untuk", "untk": "untuk",
+    "dr": "dari", "dri": "dari", "krn": "karena", "karna": "karena", "jg": "juga", "lg": "lagi",
+    "bs": "bisa", "bsa": "bisa", "ga": "tidak", "gak": "tidak", "gk": "tidak", "nggak": "tidak",
+    "engga": "tidak", "tdk": "tidak", "sdh": "sudah", "udh": "sudah", "udah": "sudah",
+    "blm": "belum", "blom": "belum", "bnyk": "banyak", "byk": "banyak", "org": "orang",
+    "trs": "terus", "tp": "tapi", "tpi": "tapi", "klo": "kalau", "kalo": "kalau",
+    "pny": "punya", "pnya": "punya", "sy": "saya", "aq": "aku", "sj": "saja",
+    "mksd": "maksud", "bgt": "banget", "bnr": "benar",
+}
+
+# Kata umum pertanyaan: target koreksi typo sekaligus dilindungi dari koreksi
+COMMON_WORDS = (
+    "berapa", "bagaimana", "dimana", "kemana", "kapan", "kenapa", "mengapa", "siapa", "apa", "mana",
+    "sekolah", "kelas", "jumlah", "tahun", "berdiri", "kepala", "wakil", "jurusan", "nomor",
+    "daftar", "biaya", "syarat", "jadwal", "kegiatan", "prestasi", "juara", "lulusan", "lulus",
+    "kerja", "kuliah", "masuk", "setelah", "sebelum", "bagus", "terbaik", "favorit", "banyak",
+    "sudah", "belum", "tidak", "bukan", "punya", "memiliki", "mempunyai", "sekarang", "dulu",
+)
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """
+    Semua string hasil menghapus 1..max_distance karakter dari word
+    """
+    result: Set[str] = set()
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for item in frontier:
+            if len(item) <= 1:
+                continue
+            for position in range(len(item)):
+                next_frontier.add(item[:position] + item[position + 1:])
+        result |= next_frontier
+        frontier = next_frontier
+    return result
+
+def edit_distance(source: str, target: str, max_distance: int) -> int:
+    """
+    Damerau-Levenshtein (optimal string alignment) dengan early exit;
+    return max_distance + 1 jika melebihi batas
+    """
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+    previous_previous: List[int] = []
+    previous = list(range(len(target) + 1))
+    for i in range(1, len(source) + 1):
+        current = [i] + [0] * len(target)
+        row_min = i
+        for j in range(1, len(target) + 1):
+            cost = 0 if source[i - 1] == target[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (i > 1 and j > 1 and source[i - 1] == target[j - 2]
+                    and source[i - 2] == target[j - 1]):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+class SymSpell:
+    """
+    Koreksi ejaan symmetric-delete: kosakata di-precompute menjadi varian hapus-karakter,
+    lookup cukup membuat varian hapus dari input lalu mencocokkan dict (tanpa scan kosakata)
+    """
+    def __init__(self, words: Dict[str, int], max_distance: int):
+        """
+        words: kata -> frekuensi (penentu pemenang jika jarak sama)
+        _deletes: varian hapus -> kata asal
+        """
+        self.words = words
+        self.max_distance = max_distance
+        self._deletes: Dict[str, List[str]] = {}
+        for word in words:
+            for variant in _deletes(word, max_distance) | {word}:
+                self._deletes.setdefault(variant, []).append(word)
+    
+    def lookup(self, token: str, max_distance: Optional[int] = None) -> Optional[Tuple[str, int]]:
+        """
+        Kata terdekat (jarak terkecil, lalu frekuensi tertinggi): (kata, jarak) atau None
+        """
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        candidates: Set[str] = set()
+        for variant in _deletes(token, max_distance) | {token}:
+            candidates.update(self._deletes.get(variant, ()))
+        
+        best: Optional[Tuple[int, int, str]] = None
+        for candidate in candidates:
+            distance = edit_distance(token, candidate, max_distance)
+            if distance > max_distance:
+                continue
+            rank = (distance, -self.words[candidate], candidate)
+            if best is None or rank < best:
+                best = rank
+        return (best[2], best[0]) if best else None
+    
+    def __contains__(self, word: str) -> bool:
+        return word in self.words
+    
+    def __len__(self) -> int:
+        return len(self.words)
+
+def domain_vocabulary() -> Dict[str, int]:
+    """
+    Kosakata domain yang sama untuk semua sekolah: keyword mapping (+ path), pattern rule
+    direct answer, kata kunci structured query, bentuk baku kamus slang, kata umum pertanyaan,
+    dan kata di data latih intent router (sapaan "selamat pagi" tidak "dikoreksi" menjadi "alamat lagi")
+    """
+    words: Dict[str, int] = {}
+    
+    def add(texts: Iterable[Any], weight: int) -> None:
+        for text in texts:
+            for token in tokenize(str(text).replace("_", " ")):
+                if len(token) >= 3 and not token.isdigit():
+                    words[token] = words.get(token, 0) + weight
+    
+    for keyword, path in KEYWORD_MAPPING.items():
+        add([keyword], 3)
+        add(path, 1)
+    for rule in DIRECT_ANSWER_RULES:
+        add(rule["patterns"], 3)
+        add(rule.get("exclude", []) + rule.get("requires", []), 1)
+    add(SLANG_DICTIONARY.values(), 2)
+    add(COMMON_WORDS, 2)
+    add(QUERY_VOCABULARY, 2)
+    try:
+        add((question for _, question in load_examples()), 1)
+    except (OSError, ValueError):
+        pass
+    return words
+
+@lru_cache(maxsize=1)
+def shared_spelling_index() -> SymSpell:
+    """
+    Indeks SymSpell kosakata domain, dikompilasi sekali per proses dan dipakai bersama semua tenant
+    """
+    return SymSpell(domain_vocabulary(), NORMALIZER_MAX_EDIT_DISTANCE)
+
+class QuestionNormalizer:
+    def __init__(self, retrieval=retrieval_service, cache_size: int = NORMALIZER_CACHE_SIZE):
+        """
+        retrieval: sumber kosakata data (token BM25) milik sekolah ini
+        _corrections: token -> (pengganti, jenis) atau None jika token dibiarkan
+        """
+        self.retrieval = retrieval
+        self.spelling = shared_spelling_index()
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._corrections: Dict[str, Optional[Tuple[str, str]]] = {}
+        self._data_buckets: Optional[Dict[Tuple[str, int], List[str]]] = None
+        
+        self.questions = 0
+        self.seconds = 0.0
+        
+        # Kosakata data berganti saat reload: cache koreksi ikut dibuang
+        self.retrieval.add_reload_listener(self._on_reload)
+    
+    def _on_reload(self, sections: List[str]) -> int:
+        with self._lock:
+            self._corrections = {}
+            self._data_buckets = None
+        return 0
+    
+    def _is_known(self, token: str) -> bool:
+        bm25 = self.retrieval.bm25
+        stemmed = stem(token)
+        return (token in STOPWORDS or token in SCHOOL_TOKENS or token in self.spelling
+                or stemmed in self.spelling or token in bm25 or stemmed in bm25)
+    
+    def _max_distance(self, token: str) -> int:
+        # Token pendek: satu edit saja agar kata lain tidak ikut "dikoreksi" ("kemana" bukan "kepala")
+        return 1 if len(token) <= 6 else NORMALIZER_MAX_EDIT_DISTANCE
+    
+    def _lookup_data(self, token: str, max_distance: int) -> Optional[str]:
+        """
+        Cadangan untuk kata khas data sekolah (nama jurusan, mitra, ekskul):
+        bandingkan dengan kosakata BM25 berhuruf awal sama dan panjang mirip
+        """
+        buckets = self._data_buckets
+        if buckets is None:
+            buckets = {}
+            for word in self.retrieval.bm25.vocabulary():
+                if len(word) >= NORMALIZER_MIN_TOKEN_LENGTH and not word.isdigit():
+                    buckets.setdefault((word[0], len(word)), []).append(word)
+            self._data_buckets = buckets
+        
+        best: Optional[Tuple[int, str]] = None
+        for length in range(len(token) - max_distance, len(token) + max_distance + 1):
+            for word in buckets.get((token[0], length), ()):
+                distance = edit_distance(token, word, max_distance)
+                if distance <= max_distance and (best is None or (distance, word) < best):
+                    best = (distance, word)
+        return best[1] if best else None
+    
+    def _correct(self, token: str) -> Optional[Tuple[str, str]]:
+        """
+        (pengganti, "slang" | "spelling") atau None jika token sudah benar / tidak dikenali
+        """
+        replacement = SLANG_DICTIONARY.get(token)
+        if replacement is not None:
+            return (replacement, "slang") if replacement != token else None
+        if (len(token) < NORMALIZER_MIN_TOKEN_LENGTH or not token.isalpha()
+                or self._is_known(token)):
+            return None
+        
+        # Akhiran -nya dipertahankan: "jurusnnya" -> "jurusannya"
+        base, suffix = (token[:-3], "nya") if len(token) > 5 and token.endswith("nya") else (token, "")
+        max_distance = self._max_distance(base)
+        match = self.spelling.lookup(base, max_distance)
+        corrected = match[0] if match else self._lookup_data(base, max_distance)
+        if corrected is None or corrected == base:
+            return None
+        return corrected + suffix, "spelling"
+    
+    def _cached_correct(self, token: str) -> Optional[Tuple[str, str]]:
+        try:
+            return self._corrections[token]
+        except KeyError:
+            pass
+        result = self._correct(token)
+        with self._lock:
+            if len(self._corrections) >= self.cache_size:
+                self._corrections = {}
+            self._corrections[token] = result
+        return result
+    
+    def normalize(self, question: str) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Return: (pertanyaan ternormalisasi, daftar koreksi {"from", "to", "kind"})
+        Jika tidak ada yang diubah, pertanyaan asli dikembalikan apa adanya (key cache tetap)
+        """
+        start = time.perf_counter()
+        replacements: Dict[str, Tuple[str, str]] = {}
+        for token in set(tokenize(question)):
+            correction = self._cached_correct(token)
+            if correction is not None:
+                replacements[token] = correction
+        
+        corrections: List[Dict[str, str]] = []
+        if replacements:
+            question = TOKEN_PATTERN.sub(
+                lambda match: replacements.get(match.group().lower(), (match.group(),))[0], question
+            )
+            for token, (replacement, kind) in replacements.items():
+                corrections.append({"from": token, "to": replacement, "kind": kind})
+                NORMALIZER_REWRITES.inc((kind,))
+            NORMALIZED_QUESTIONS.inc()
+        
+        self.questions += 1
+        self.seconds += time.perf_counter() - start
+        return question, corrections
+    
+    def record_conversion(self, outcome: str) -> None:
+        NORMALIZER_CONVERSIONS.inc((outcome,))
+    
+    def stats(self) -> Dict[str, Any]:
+        normalized = NORMALIZED_QUESTIONS.total()
+        rewrites = NORMALIZER_REWRITES.values()
+        conversions = NORMALIZER_CONVERSIONS.values()
+        return {
+            "questions": self.questions,
+            "normalized_questions": int(normalized),
+            "normalized_rate": round(normalized / self.questions, 4) if self.questions else 0.0,
+            "slang_rewrites": int(rewrites.get(("slang",), 0)),
+            "spelling_corrections": int(rewrites.get(("spelling",), 0)),
+            "avg_us": round(self.seconds / self.questions * 1e6, 2) if self.questions else 0.0,
+            "vocabulary": len(self.spelling),
+            "cached_tokens": len(self._corrections),
+            # LLM call yang dihindari (direct / structured / prerendered / cache) atau diberi context (retrieval)
+            "converted": {outcome: int(conversions.get((outcome,), 0)) for outcome in CONVERSION_OUTCOMES}
+        }
+    
+    def reset_stats(self) -> None:
+        for metric in (NORMALIZED_QUESTIONS, NORMALIZER_REWRITES, NORMALIZER_CONVERSIONS):
+            metric.reset()
+        self.questions = 0
+        self.seconds = 0.0
@@ -0,0 +1,329 @@
+"""
+Structured Query Engine
+Jawaban deterministik tanpa LLM untuk pertanyaan lookup / agregat atas data terstruktur:
+- data_guru: "siapa wakil kepala sekolah kesiswaan", "jabatan syamsul anam"
+- prestasi: "prestasi tahun 2023 apa saja", "berapa prestasi jurusan rpl"
+- jurusan: "berapa kelas rpl", "jurusan dengan kelas terbanyak", "ada berapa jurusan"
+Indeks per section (jabatan, nama guru, tahun, nama + alias jurusan) dibangun sekali per versi data
+Pertanyaan hanya dijawab jika semua kata bermaknanya dipahami query; selain itu None
+(diteruskan ke answer table / cache / retrieval + LLM)
+"""
+import re
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from app.core.config import SCHOOL_NAME
+from app.core.text import content_tokens, stemmed_tokens, tokenize
+from app.services.keyword_index import KeywordIndex
+
+# Pertanyaan penjelasan / alasan tetap dijawab LLM
+EXPLAIN_CUES = {"bagaimana", "gimana", "kenapa", "mengapa", "cara", "jelaskan", "ceritakan", "syarat"}
+
+COUNT_CUES = {"berapa", "jumlah", "total"}
+LIST_CUES = {"apa", "daftar", "sebutkan", "mana", "list", "semua"}
+PERSON_CUES = {"siapa", "nama", "jabatan", "menjabat", "dijabat", "sebagai"}
+PRESTASI_CUES = {"prestasi", "juara", "lomba", "penghargaan", "kejuaraan"}
+KELAS_CUES = {"kelas", "rombel"}
+JURUSAN_CUES = {"jurusan", "program", "keahlian", "kompetensi", "prodi"}
+
+# Kata yang tidak mengubah maksud query (selain stopword di app.core.text)
+FILLER_TOKENS = {
+    "sekolah", "tahun", "saat", "sekarang", "kini", "semua", "punya", "memiliki", "dimiliki", "pernah",
+    "sudah", "diraih", "meraih", "raih", "didapat", "mendapat", "dapat", "tiap", "per", "masing",
+    "setiap", "paling", "banyak", "sedikit", "terbanyak", "tersedikit", "daftar", "sebutkan", "list",
+    "mana", "total", "jumlah", "berapa", "siswa"
+}
+
+JABATAN_ALIASES = {"waka": "wakil kepala sekolah", "wakasek": "wakil kepala sekolah", "kepsek": "kepala sekolah"}
+
+# Gelar di nama guru ("S.Pd" -> "s", "pd") bukan bagian nama untuk pencocokan
+TITLE_TOKENS = {"spd", "mpd", "mmpd", "skom", "mkom", "ssi", "msi", "drs", "dra", "amd", "spdi", "ssos", "sst"}
+
+YEAR_PATTERN = re.compile(r"\b(19|20)\d{2}\b")
+
+# Kosakata query (dipakai normalizer sebagai target koreksi typo)
+QUERY_VOCABULARY = tuple(sorted(COUNT_CUES | PERSON_CUES | PRESTASI_CUES | KELAS_CUES | JURUSAN_CUES
+                                | {"wakil", "kepala", "terbanyak", "tersedikit"}))
+
+class ParsedQuestion:
+    """
+    Pertanyaan yang sudah diurai sekali untuk semua query
+    tokens: semua token (stemmed), terms: token bermakna, consumed: token yang sudah
+    dipahami sebagai nama jurusan / tahun
+    """
+    __slots__ = ("tokens", "terms", "years", "jurusan", "consumed", "count", "superlative")
+    
+    def __init__(self, question: str, jurusan_index: KeywordIndex):
+        stemmed = stemmed_tokens(question)
+        self.tokens: Set[str] = set(stemmed)
+        self.terms: Set[str] = set(content_tokens(question))
+        self.years: List[int] = sorted({int(token) for token in self.terms if YEAR_PATTERN.fullmatch(token)})
+        self.consumed: Set[str] = {str(year) for year in self.years}
+        self.jurusan: List[str] = []
+        for start, end, name in jurusan_index.find_all(question):
+            if name not in self.jurusan:
+                self.jurusan.append(name)
+            self.consumed.update(stemmed[start:end])
+        self.count = bool(self.tokens & COUNT_CUES)
+        if "terbanyak" in self.tokens or {"paling", "banyak"} <= self.tokens:
+            self.superlative: Optional[str] = "max"
+        elif "tersedikit" in self.tokens or {"paling", "sedikit"} <= self.tokens:
+            self.superlative = "min"
+        else:
+            self.superlative = None
+    
+    def leftover(self, allowed: Set[str]) -> Set[str]:
+        """
+        Token bermakna yang tidak dipahami query (harus kosong agar query menjawab)
+        """
+        return self.terms - allowed - self.consumed - FILLER_TOKENS
+
+def _join(items: List[str]) -> str:
+    return items[0] if len(items) == 1 else f"{', '.join(items[:-1])} dan {items[-1]}"
+
+class StructuredQueryEngine:
+    def __init__(self, data: Dict[str, Any], jurusan_aliases: Optional[Dict[str, str]] = None,
+                 school_name: str = SCHOOL_NAME):
+        """
+        Bangun indeks per section dari data yang sudah di-load
+        jurusan_aliases: frasa -> nama jurusan (mis. "rpl" -> "Rekayasa Perangkat Lunak"),
+        alias ke jurusan yang tidak ada di data diabaikan
+        """
+        self.school_name = school_name
+        self.hits: Dict[str, int] = {name: 0 for name, _ in STRUCTURED_QUERIES}
+        self.declined = 0
+        
+        # jurusan: nama (urut data) -> jumlah kelas (None jika tidak tercatat)
+        self.classes: Dict[str, Optional[int]] = {}
+        for item in data.get("jurusan") or []:
+            name = item.get("nama") if isinstance(item, dict) else item
+            if not isinstance(name, str):
+                continue
+            count = item.get("jumlah_kelas") if isinstance(item, dict) else None
+            if isinstance(count, int):
+                self.classes[name] = count
+            else:
+                self.classes.setdefault(name, None)
+        profile = data.get("profil") if isinstance(data.get("profil"), dict) else {}
+        total = profile.get("jumlah_kelas_total")
+        self.total_classes: Optional[int] = total if isinstance(total, int) else None
+        
+        self.jurusan_index: KeywordIndex = KeywordIndex()
+        for name in self.classes:
+            self.jurusan_index.add(name, name)
+            initials = "".join(word[0] for word in tokenize(name))
+            if len(initials) >= 3:
+                self.jurusan_index.add(initials, name)
+        for alias, name in (jurusan_aliases or {}).items():
+            if name in self.classes:
+                self.jurusan_index.add(alias, name)
+        
+        # data_guru: token jabatan / token nama -> posisi entry
+        self.staff: List[Tuple[str, str]] = []
+        self.staff_roles: List[Set[str]] = []
+        self.staff_names: List[Set[str]] = []
+        self.role_vocabulary: Set[str] = set()
+        self.staff_by_name: Dict[str, List[int]] = {}
+        for item in data.get("data_guru") or []:
+            if not isinstance(item, dict) or not item.get("nama") or not item.get("jabatan"):
+                continue
+            position = len(self.staff)
+            self.staff.append((str(item["nama"]), str(item["jabatan"])))
+            roles = set(content_tokens(str(item["jabatan"])))
+            names = {token for token in tokenize(str(item["nama"]))
+                     if len(token) >= 3 and token not in TITLE_TOKENS}
+            self.staff_roles.append(roles)
+            self.staff_names.append(names)
+            self.role_vocabulary |= roles
+            for token in names:
+                self.staff_by_name.setdefault(token, []).append(position)
+        
+        # prestasi: tahun / jurusan -> posisi entry
+        self.achievements: List[Tuple[str, Optional[int]]] = []
+        self.achievements_by_year: Dict[int, List[int]] = {}
+        self.achievements_by_jurusan: Dict[str, List[int]] = {}
+        for item in data.get("prestasi") or []:
+            if not isinstance(item, dict) or not item.get("judul"):
+                continue
+            position = len(self.achievements)
+            title = str(item["judul"])
+            year = item.get("tahun")
+            if not isinstance(year, int):
+                found = YEAR_PATTERN.search(title)
+                year = int(found.group()) if found else None
+            self.achievements.append((title, year))
+            if year is not None:
+                self.achievements_by_year.setdefault(year, []).append(position)
+            if isinstance(item.get("jurusan"), str):
+                self.achievements_by_jurusan.setdefault(item["jurusan"], []).append(position)
+    
+    def match(self, question: str, count: bool = True) -> Optional[Tuple[str, str]]:
+        """
+        Return (nama query, jawaban) atau None jika tidak ada query yang bisa menjawab pasti
+        count: False untuk pengecekan internal (hit count tidak berubah)
+        """
+        tokens = set(tokenize(question))
+        if tokens & EXPLAIN_CUES:
+            return None
+        if not tokens & (PERSON_CUES | PRESTASI_CUES | KELAS_CUES | JURUSAN_CUES | COUNT_CUES):
+            return None
+        
+        parsed = ParsedQuestion(question, self.jurusan_index)
+        for name, query in STRUCTURED_QUERIES:
+            answer = query(self, parsed)
+            if answer is not None:
+                if count:
+                    self.hits[name] += 1
+                return name, answer
+        if count:
+            self.declined += 1
+        return None
+    
+    def _query_jabatan(self, question: ParsedQuestion) -> Optional[str]:
+        """
+        Nama guru -> jabatan, atau jabatan -> nama (jabatan paling spesifik yang cocok)
+        """
+        if not self.staff or not question.tokens & PERSON_CUES or question.jurusan:
+            return None
+        
+        # Lookup nama: cukup dua token nama (atau seluruh nama jika hanya satu token)
+        found: Dict[int, int] = {}
+        for term in question.terms:
+            for position in self.staff_by_name.get(term, ()):
+                found[position] = found.get(position, 0) + 1
+        people = [position for position, matched in found.items()
+                  if matched >= min(2, len(self.staff_names[position]))]
+        if people:
+            names = set().union(*(self.staff_names[position] for position in people))
+            if question.leftover(PERSON_CUES | self.role_vocabulary | names):
+                return None
+            return " ".join(f"{self.staff[position][0]} menjabat sebagai {self.staff[position][1]} "
+                            f"di {self.school_name}." for position in sorted(people))
+        
+        terms: Set[str] = set()
+        for term in question.terms:
+            terms.update(JABATAN_ALIASES[term].split() if term in JABATAN_ALIASES else (term,))
+        roles = terms & self.role_vocabulary
+        if not roles or terms - roles - PERSON_CUES - FILLER_TOKENS:
+            return None
+        candidates = [position for position, tokens in enumerate(self.staff_roles) if roles <= tokens]
+        if not candidates:
+            return None
+        fewest_extra = min(len(self.staff_roles[position] - roles) for position in candidates)
+        if len(roles) == 1 and fewest_extra:
+            # Satu kata jabatan saja ("siapa kepala ...") terlalu samar kecuali jabatannya memang satu kata
+            return None
+        chosen = [position for position in candidates if len(self.staff_roles[position] - roles) == fewest_extra]
+        if len(chosen) == 1:
+            name, role = self.staff[chosen[0]]
+            return f"{role} {self.school_name} adalah {name}."
+        return f"Jabatan di {self.school_name}: " + "; ".join(
+            f"{self.staff[position][1]}: {self.staff[position][0]}" for position in chosen) + "."
+    
+    def _query_kelas_jurusan(self, question: ParsedQuestion) -> Optional[str]:
+        """
+        Jumlah kelas per jurusan, jurusan dengan kelas terbanyak / tersedikit, total kelas
+        Kata lain ("ruang kelas", "siswa kelas 10") berarti bukan pertanyaan jumlah kelas jurusan
+        """
+        if not self.classes or not question.terms & KELAS_CUES:
+            return None
+        if question.leftover(KELAS_CUES | JURUSAN_CUES) or "siswa" in question.terms:
+            return None
+        
+        if question.jurusan:
+            counts = [(name, self.classes[name]) for name in question.jurusan]
+            if any(value is None for _, value in counts):
+                return None
+            if len(counts) == 1:
+                return f"Jurusan {counts[0][0]} di {self.school_name} memiliki {counts[0][1]} kelas."
+            return f"Jumlah kelas di {self.school_name}: " + ", ".join(
+                f"{name} {value} kelas" for name, value in counts) + "."
+        
+        known = {name: value for name, value in self.classes.items() if value is not None}
+        if question.superlative and known:
+            target = max(known.values()) if question.superlative == "max" else min(known.values())
+            names = [name for name, value in known.items() if value == target]
+            label = "terbanyak" if question.superlative == "max" else "paling sedikit"
+            return f"Jurusan dengan kelas {label} di {self.school_name} adalah {_join(names)} ({target} kelas)."
+        
+        if question.count or question.terms & JURUSAN_CUES:
+            if len(known) == len(self.classes):
+                breakdown = ", ".join(f"{name} {value} kelas" for name, value in known.items())
+                return f"{self.school_name} memiliki total {sum(known.values())} kelas: {breakdown}."
+            if self.total_classes is not None:
+                return f"{self.school_name} memiliki total {self.total_classes} kelas."
+        return None
+    
+    def _query_jumlah_jurusan(self, question: ParsedQuestion) -> Optional[str]:
+        if (not self.classes or not question.count or "jurusan" not in question.terms
+                or question.jurusan or question.leftover(JURUSAN_CUES)):
+            return None
+        names = list(self.classes)
+        return f"{self.school_name} memiliki {len(names)} jurusan: {', '.join(names)}."
+    
+    def _query_prestasi(self, question: ParsedQuestion) -> Optional[str]:
+        """
+        Daftar / jumlah prestasi, difilter tahun (union antar tahun) dan jurusan (union antar jurusan)
+        """
+        if not self.achievements or not question.terms & PRESTASI_CUES:
+            return None
+        if question.leftover(PRESTASI_CUES | JURUSAN_CUES | {"tim", "kategori"}):
+            return None
+        if not (question.years or question.jurusan or question.count or question.tokens & LIST_CUES):
+            return None
+        
+        positions = set(range(len(self.achievements)))
+        description = ""
+        if question.years:
+            positions &= {position for year in question.years
+                          for position in self.achievements_by_year.get(year, ())}
+            description += f" tahun {_join([str(year) for year in question.years])}"
+        if question.jurusan:
+            positions &= {position for name in question.jurusan
+                          for position in self.achievements_by_jurusan.get(name, ())}
+            description += f" jurusan {_join(question.jurusan)}"
+        
+        if not positions:
+            return f"Belum ada prestasi {self.school_name}{description} yang tercatat."
+        items = []
+        for position in sorted(positions):
+            title, year = self.achievements[position]
+            items.append(f"{title} ({year})" if year is not None and str(year) not in title else title)
+        if question.count:
+            return f"{self.school_name} mencatat {len(items)} prestasi{description}: {'; '.join(items)}."
+        return f"Prestasi {self.school_name}{description}: {'; '.join(items)}."
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit count per query, pertanyaan ber-cue yang ditolak, dan ukuran indeks per section
+        """
+        return {
+            "queries": len(self.hits),
+            "indexed": {
+                "data_guru": len(self.staff),
+                "prestasi": len(self.achievements),
+                "jurusan": len(self.classes)
+            },
+            "hits": dict(sorted(self.hits.items(), key=lambda item: item[1], reverse=True)),
+            "declined": self.declined
+        }
+    
+    def carry_over_stats(self, previous: "StructuredQueryEngine") -> None:
+        """
+        Salin hit count dari engine versi data sebelumnya (setelah reload)
+        """
+        for name, hits in previous.hits.items():
+            if name in self.hits:
+                self.hits[name] += hits
+        self.declined += previous.declined
+    
+    def reset_stats(self) -> None:
+        for name in self.hits:
+            self.hits[name] = 0
+        self.declined = 0
+
+# Urutan = prioritas: query pertama yang menjawab dipakai
+STRUCTURED_QUERIES: Tuple[Tuple[str, Callable[[StructuredQueryEngine, ParsedQuestion], Optional[str]]], ...] = (
+    ("jabatan_guru", StructuredQueryEngine._query_jabatan),
+    ("kelas_jurusan", StructuredQueryEngine._query_kelas_jurusan),
+    ("jumlah_jurusan", StructuredQueryEngine._query_jumlah_jurusan),
+    ("prestasi", StructuredQueryEngine._query_prestasi),
+)
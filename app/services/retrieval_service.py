@@ -1,78 +1,347 @@
 """
 Retrieval Service
 Mengambil hanya data yang relevan dari JSON berdasarkan pertanyaan
-Menggunakan keyword matching untuk efisiensi
+Keyword index (token trie) untuk sinonim + BM25 atas seluruh JSON untuk ranking passage
+Semua indeks dikompilasi sekali per versi data dan bisa di-reload tanpa restart
 """
+import hashlib
 import json
 import os
-from typing import Dict, List, Any, Optional
-from app.core.config import MAX_CONTEXT_LENGTH
+import pickle
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from app.core.config import (
+    MAX_CONTEXT_TOKENS,
+    RETRIEVAL_TOP_K,
+    PASSAGE_LIST_CHUNK,
+    RETRIEVAL_SNAPSHOT_PATH,
+    SCHOOL_NAME
+)
+from app.core.tokens import count_tokens, truncate_to_tokens
+from app.core.text import content_tokens
+from app.services.bm25_index import BM25Index
+from app.services.direct_answer import DIRECT_ANSWER_RULES, DirectAnswerEngine
+from app.services.keyword_index import KeywordIndex
+from app.services.query_engine import StructuredQueryEngine
+
+# Naikkan jika struktur snapshot / cara build indeks berubah (file pickle lama otomatis diabaikan)
+SNAPSHOT_FORMAT_VERSION = 4
+
+# Mapping keyword ke section data (sama untuk semua tenant; trie-nya dikompilasi sekali per proses)
+# Selain menunjuk data, path juga dipakai sebagai ekspansi query BM25 (sinonim)
+KEYWORD_MAPPING: Dict[str, List[Any]] = {
+    # Profil sekolah
+    "nama": ["profil", "nama"],
+    "alamat": ["profil", "alamat"],
+    "lokasi": ["profil", "alamat"],
+    "kepala sekolah": ["profil", "kepala_sekolah"],
+    "kepsek": ["profil", "kepala_sekolah"],
+    "siswa": ["profil", "jumlah_siswa"],
+    "murid": ["profil", "jumlah_siswa"],
+    "guru": ["profil", "jumlah_guru"],
+    "pengajar": ["profil", "jumlah_guru"],
+    "akreditasi": ["profil", "akreditasi"],
+    "visi": ["profil", "visi"],
+    "misi": ["profil", "misi"],
+    "profile": ["profil"],
+    "profil": ["profil"],
+    "sejarah": ["profil"],
+    "berdiri": ["profil", "tahun_berdiri"],
+    "telepon": ["profil", "telpon"],
+    "telp": ["profil", "telpon"],
+    "email": ["profil", "email"],
+    "instagram": ["profil", "instagram"],
+    "ig": ["profil", "instagram"],
+    "website": ["profil", "website"],
+    "web": ["profil", "website"],
+    "kontak": ["kontak"],
+    "wakil kepala sekolah": ["data_guru"],
+    "waka": ["data_guru"],
+    "jabatan": ["data_guru"],
+    
+    # Jurusan (jurusan berupa list, path memakai nama jurusan untuk ekspansi query)
+    "jurusan": ["jurusan"],
+    "tkj": ["jurusan", "TKJ"],
+    "rekayasa perangkat lunak": ["jurusan", "Rekayasa Perangkat Lunak"],
+    "rpl": ["jurusan", "Rekayasa Perangkat Lunak"],
+    "multimedia": ["jurusan", "MM"],
+    "mm": ["jurusan", "MM"],
+    "teknik komputer": ["jurusan", "TKJ"],
+    "jaringan": ["jurusan", "TKJ"],
+    "software": ["jurusan", "Rekayasa Perangkat Lunak"],
+    "aplikasi": ["jurusan", "Rekayasa Perangkat Lunak"],
+    "kuliner": ["jurusan", "Kuliner"],
+    "tata boga": ["jurusan", "Kuliner"],
+    "pengelasan": ["jurusan", "Teknik Pengelasan"],
+    "las": ["jurusan", "Teknik Pengelasan"],
+    "geologi": ["jurusan", "Geologi Pertambangan"],
+    "tambang": ["jurusan", "Geologi Pertambangan"],
+    "perhotelan": ["jurusan", "Perhotelan"],
+    "hotel": ["jurusan", "Perhotelan"],
+    "ternak": ["jurusan", "Agribisnis Ternak Ruminansia"],
+    "agribisnis": ["jurusan", "Agribisnis Ternak Ruminansia"],
+    "desain": ["jurusan", "MM"],
+    "video": ["jurusan", "MM"],
+    "animasi": ["jurusan", "MM"],
+    
+    # Fasilitas
+    "fasilitas": ["fasilitas"],
+    "lab": ["fasilitas"],
+    "laboratorium": ["fasilitas"],
+    "perpustakaan": ["fasilitas"],
+    "masjid": ["fasilitas"],
+    "wifi": ["fasilitas"],
+    "internet": ["fasilitas"],
+    "komputer": ["fasilitas"],
+    "gedung": ["fasilitas"],
+    "ruang": ["fasilitas"],
+    
+    # Prestasi, PPDB, alumni, kegiatan
+    "prestasi": ["prestasi"],
+    "juara": ["prestasi"],
+    "lomba": ["prestasi"],
+    "ppdb": ["info_ppdb"],
+    "spmb": ["info_ppdb"],
+    "pendaftaran": ["info_ppdb"],
+    "daftar": ["info_ppdb"],
+    "alumni": ["alumni_kerja"],
+    "lulusan": ["alumni_kerja"],
+    "bkk": ["alumni_kerja"],
+    "mitra": ["mitra_industri"],
+    "industri": ["mitra_industri"],
+    "magang": ["mitra_industri"],
+    "prakerin": ["mitra_industri"],
+    "pkl": ["mitra_industri"],
+    "ekskul": ["ekstrakurikuler"],
+    "ekstrakurikuler": ["ekstrakurikuler"],
+    "ekstra": ["ekstrakurikuler"],
+    "kegiatan": ["kegiatan"],
+    "acara": ["kegiatan"],
+    "agenda": ["kegiatan"],
+    "rutin": ["kegiatan_rutin"],
+}
+
+# Alias nama jurusan untuk structured query ("rpl" -> "Rekayasa Perangkat Lunak")
+JURUSAN_ALIASES: Dict[str, str] = {
+    keyword: path[1] for keyword, path in KEYWORD_MAPPING.items() if path[0] == "jurusan" and len(path) > 1
+}
+
+@lru_cache(maxsize=1)
+def shared_keyword_index() -> KeywordIndex:
+    """
+    Trie KEYWORD_MAPPING: tidak bergantung isi data, jadi satu instance dipakai bersama
+    semua RetrievalService (tenant) dan tidak ikut di-pickle di snapshot
+    Payload: (prioritas, {"keyword", "path"})
+    """
+    index: KeywordIndex = KeywordIndex()
+    for priority, (keyword, path) in enumerate(KEYWORD_MAPPING.items()):
+        index.add(keyword, (priority, {"keyword": keyword, "path": path}))
+    return index
+
+class RetrievalSnapshot:
+    """
+    Satu versi data beserta semua indeksnya
+    Tidak pernah diubah setelah dibuat; reload membuat snapshot baru lalu menukar referensinya
+    """
+    __slots__ = ("data", "data_hash", "unresolved_keywords", "passages", "bm25", "direct_answers",
+                 "structured_queries")
+    
+    def __init__(self, data: Dict[str, Any], data_hash: str, unresolved_keywords: List[str],
+                 passages: List[Dict[str, Any]], bm25: BM25Index, direct_answers: DirectAnswerEngine,
+                 structured_queries: StructuredQueryEngine):
+        self.data = data
+        self.data_hash = data_hash
+        self.unresolved_keywords = unresolved_keywords
+        self.passages = passages
+        self.bm25 = bm25
+        self.direct_answers = direct_answers
+        self.structured_queries = structured_queries
 
 class RetrievalService:
-    def __init__(self, data_path: str = "data/info_sekolah.json"):
+    def __init__(self, data_path: str = "data/info_sekolah.json",
+                 snapshot_path: Optional[str] = RETRIEVAL_SNAPSHOT_PATH,
+                 school_name: Optional[str] = SCHOOL_NAME):
         """
-        Load data sekolah dari JSON
+        Load snapshot indeks pertama: dari file pickle jika masih cocok dengan data,
+        jika tidak parse JSON + bangun indeks lalu simpan pickle untuk cold start berikutnya
+        school_name: nama sekolah di jawaban/prompt; None = diambil dari data (profil.nama_singkat / profil.nama)
         """
         self.data_path = data_path
-        self.data = self._load_data()
-        
-        # Mapping keyword ke section data
-        self.keyword_mapping = {
-            # Profile sekolah
-            "nama": ["profile", "nama"],
-            "alamat": ["profile", "alamat"],
-            "lokasi": ["profile", "alamat"],
-            "kepala sekolah": ["profile", "kepala_sekolah"],
-            "kepsek": ["profile", "kepala_sekolah"],
-            "siswa": ["profile", "jumlah_siswa"],
-            "murid": ["profile", "jumlah_siswa"],
-            "guru": ["profile", "jumlah_guru"],
-            "pengajar": ["profile", "jumlah_guru"],
-            "akreditasi": ["profile", "akreditasi"],
-            "visi": ["profile", "visi"],
-            "misi": ["profile", "misi"],
-            "profile": ["profile"],
-            "profil": ["profile"],
-            "sejarah": ["profile"],
-            
-            # Jurusan
-            "jurusan": ["jurusan"],
-            "tkj": ["jurusan", "TKJ"],
-            "rekayasa perangkat lunak": ["jurusan", "RPL"],
-            "rpl": ["jurusan", "RPL"],
-            "multimedia": ["jurusan", "MM"],
-            "mm": ["jurusan", "MM"],
-            "teknik komputer": ["jurusan", "TKJ"],
-            "jaringan": ["jurusan", "TKJ"],
-            "software": ["jurusan", "RPL"],
-            "aplikasi": ["jurusan", "RPL"],
-            "desain": ["jurusan", "MM"],
-            "video": ["jurusan", "MM"],
-            "animasi": ["jurusan", "MM"],
-            
-            # Fasilitas
-            "fasilitas": ["fasilitas"],
-            "lab": ["fasilitas"],
-            "laboratorium": ["fasilitas"],
-            "perpustakaan": ["fasilitas"],
-            "masjid": ["fasilitas"],
-            "wifi": ["fasilitas"],
-            "internet": ["fasilitas"],
-            "komputer": ["fasilitas"],
-            "gedung": ["fasilitas"],
-            "ruang": ["fasilitas"],
+        self.snapshot_path = snapshot_path or None
+        self.snapshot_source = "json"
+        self.keyword_mapping = KEYWORD_MAPPING
+        self._keyword_index = shared_keyword_index()
+        self._school_name = school_name
+        
+        # Listener reload dipanggil dengan daftar section yang berubah (mis. invalidasi cache)
+        self._reload_listeners: List[Callable[[List[str]], int]] = []
+        self._reload_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self.reload_stats: Dict[str, Any] = {
+            "reloads": 0,
+            "last_reload_ms": 0.0,
+            "last_swap_us": 0.0,
+            "last_changed_sections": [],
+            "last_invalidated_cache_entries": 0,
+            "failed_reloads": 0,
+            "last_reload_error": None
         }
+        
+        self._loaded_mtime = self._data_mtime()
+        self._snapshot = self._load_or_build_snapshot()
+    
+    # Akses ke snapshot aktif (readers tidak pernah mengunci)
+    @property
+    def data(self) -> Dict[str, Any]:
+        return self._snapshot.data
+    
+    @property
+    def data_hash(self) -> str:
+        return self._snapshot.data_hash
+    
+    @property
+    def keyword_index(self) -> KeywordIndex:
+        return self._keyword_index
+    
+    @property
+    def unresolved_keywords(self) -> List[str]:
+        return self._snapshot.unresolved_keywords
+    
+    @property
+    def passages(self) -> List[Dict[str, Any]]:
+        return self._snapshot.passages
+    
+    @property
+    def bm25(self) -> BM25Index:
+        return self._snapshot.bm25
+    
+    @property
+    def direct_answers(self) -> DirectAnswerEngine:
+        return self._snapshot.direct_answers
+    
+    @property
+    def structured_queries(self) -> StructuredQueryEngine:
+        return self._snapshot.structured_queries
+    
+    @property
+    def school_name(self) -> str:
+        return self._snapshot.direct_answers.school_name
+    
+    def _resolve_school_name(self, data: Dict[str, Any]) -> str:
+        if self._school_name:
+            return self._school_name
+        profile = data.get("profil")
+        if isinstance(profile, dict):
+            return str(profile.get("nama_singkat") or profile.get("nama") or SCHOOL_NAME)
+        return SCHOOL_NAME
+    
+    def _build_snapshot(self, data: Dict[str, Any]) -> RetrievalSnapshot:
+        """
+        Kompilasi semua indeks untuk satu versi data
+        """
+        # Trie keyword dipakai bersama; per data cukup dicatat path yang tidak ada
+        unresolved_keywords = self._unresolved_keywords(data)
+        
+        # Flatten JSON menjadi passage lalu bangun BM25 index
+        # (token passage hanya dibutuhkan saat build, tidak disimpan di snapshot)
+        passages = self._build_passages(data)
+        bm25 = BM25Index([self._passage_tokens(passage) for passage in passages])
+        
+        # Rule direct answer divalidasi terhadap data dan di-render sekali
+        school_name = self._resolve_school_name(data)
+        direct_answers = DirectAnswerEngine(data, school_name=school_name)
+        
+        # Indeks per section (jabatan, tahun prestasi, jurusan) untuk query lookup / agregat
+        structured_queries = StructuredQueryEngine(data, JURUSAN_ALIASES, school_name=school_name)
+        
+        # Sidik jari isi data (bukan mtime) untuk artifact yang dibangun dari data ini
+        canonical = json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        data_hash = hashlib.sha256(canonical).hexdigest()[:16]
+        
+        return RetrievalSnapshot(data, data_hash, unresolved_keywords, passages, bm25, direct_answers,
+                                 structured_queries)
+    
+    def _source_fingerprint(self) -> Optional[str]:
+        """
+        Sidik jari semua input snapshot: isi file JSON (byte mentah, tanpa parse),
+        keyword mapping, rule direct answer, dan parameter build
+        """
+        try:
+            with open(self.data_path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            return None
+        digest = hashlib.sha256(raw)
+        digest.update(json.dumps(self.keyword_mapping, sort_keys=True).encode("utf-8"))
+        digest.update(repr((DIRECT_ANSWER_RULES, PASSAGE_LIST_CHUNK, SNAPSHOT_FORMAT_VERSION,
+                            self._school_name)).encode("utf-8"))
+        return digest.hexdigest()
+    
+    def _load_or_build_snapshot(self) -> RetrievalSnapshot:
+        fingerprint = self._source_fingerprint() if self.snapshot_path else None
+        if fingerprint:
+            snapshot = self._read_snapshot_file(fingerprint)
+            if snapshot is not None:
+                self.snapshot_source = "pickle"
+                return snapshot
+        
+        snapshot = self._build_snapshot(self._load_data())
+        self.snapshot_source = "json"
+        if fingerprint:
+            self._write_snapshot_file(snapshot, fingerprint)
+        return snapshot
+    
+    def _read_snapshot_file(self, fingerprint: str) -> Optional[RetrievalSnapshot]:
+        """
+        Header (fingerprint) dibaca dulu; snapshot hanya di-unpickle jika cocok
+        File ini artifact build milik aplikasi sendiri, bukan input dari luar
+        """
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                if pickle.load(f) != fingerprint:
+                    return None
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
     
-    def _load_data(self) -> Dict[str, Any]:
+    def _write_snapshot_file(self, snapshot: RetrievalSnapshot, fingerprint: str) -> None:
+        """
+        Best effort: filesystem read-only (serverless) cukup dilewati
+        """
+        tmp_path = f"{self.snapshot_path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(fingerprint, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError:
+            pass
+    
+    def _data_mtime(self) -> float:
+        try:
+            return os.path.getmtime(self.data_path)
+        except OSError:
+            return 0.0
+    
+    def _load_data(self, strict: bool = False) -> Dict[str, Any]:
         """
         Load JSON data dari file
+        strict: raise OSError / ValueError jika file hilang, rusak, atau kosong (dipakai reload
+        agar snapshot lama tetap aktif); default: startup tetap jalan dengan data kosong
         """
         try:
             with open(self.data_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                data = json.load(f)
         except FileNotFoundError:
+            if strict:
+                raise
             print(f"Warning: File {self.data_path} tidak ditemukan")
             return {}
+        if strict and (not isinstance(data, dict) or not data):
+            raise ValueError("data kosong atau bukan object JSON")
+        return data
     
     def _get_nested_value(self, data: Dict, keys: List[str]) -> Any:
         """
@@ -87,133 +356,284 @@ class RetrievalService:
                 return None
         return current
     
+    def _unresolved_keywords(self, data: Dict[str, Any]) -> List[str]:
+        """
+        Keyword yang path-nya tidak ada di data; tetap ada di trie
+        karena path-nya berguna sebagai ekspansi query
+        """
+        return [keyword for keyword, path in self.keyword_mapping.items()
+                if self._get_nested_value(data, path) is None]
+    
+    def _format_value(self, value: Any) -> str:
+        """
+        Ubah nilai JSON menjadi teks ringkas untuk context
+        """
+        if isinstance(value, dict):
+            return "; ".join(f"{key}: {self._format_value(item)}" for key, item in value.items())
+        if isinstance(value, list):
+            return ", ".join(self._format_value(item) for item in value)
+        return str(value)
+    
+    def _make_passage(self, path: List[Any], value: Any) -> Dict[str, Any]:
+        """
+        Satu passage = satu field/item data beserta label path-nya
+        """
+        label = ".".join(str(key).strip() for key in path)
+        text = f"{label}: {self._format_value(value)}"
+        return {
+            "path": path,
+            "label": label,
+            "text": text,
+            "data": value,
+            "token_count": count_tokens(text)
+        }
+    
+    @staticmethod
+    def _passage_tokens(passage: Dict[str, Any]) -> List[str]:
+        # Label ikut diindeks agar nama section ("prestasi", "jumlah_siswa") bisa dicari
+        return content_tokens(passage["text"].replace("_", " ").replace(".", " "))
+    
+    def _build_passages(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Flatten seluruh JSON menjadi passage
+        - dict: satu passage per key
+        - list of dict: satu passage per item
+        - list of scalar: dipotong per PASSAGE_LIST_CHUNK item
+        """
+        passages = []
+        for section, value in data.items():
+            if isinstance(value, dict):
+                for key, item in value.items():
+                    passages.append(self._make_passage([section, key], item))
+            elif isinstance(value, list):
+                scalars = [item for item in value if not isinstance(item, (dict, list))]
+                for start in range(0, len(scalars), PASSAGE_LIST_CHUNK):
+                    passages.append(self._make_passage([section], scalars[start:start + PASSAGE_LIST_CHUNK]))
+                for position, item in enumerate(value):
+                    if isinstance(item, (dict, list)):
+                        passages.append(self._make_passage([section, position], item))
+            else:
+                passages.append(self._make_passage([section], value))
+        return passages
+    
     def retrieve_relevant_data(self, question: str) -> Optional[Dict[str, Any]]:
         """
         Mengambil data yang relevan berdasarkan pertanyaan
-        Return: {"section": "...", "data": {...}, "direct_answer": "..."}
-        """
-        question_lower = question.lower()
-        
-        # Cari keyword yang cocok
-        matched_sections = []
-        for keyword, path in self.keyword_mapping.items():
-            if keyword in question_lower:
-                value = self._get_nested_value(self.data, path)
-                if value is not None:
-                    matched_sections.append({
-                        "keyword": keyword,
-                        "path": path,
-                        "data": value
-                    })
-        
-        if not matched_sections:
+        Keyword yang cocok memperluas query dengan path-nya, lalu BM25 meranking passage
+        Return: {"keyword": ..., "path": [...], "data": ..., "passages": [passage teratas...]}
+        """
+        snapshot = self._snapshot
+        query_tokens = content_tokens(question)
+        matches = self._keyword_index.find_all(question)
+        
+        keyword_section = None
+        if matches:
+            # Keyword yang paling awal di mapping dianggap paling relevan
+            _, keyword_section = min((payload for _, _, payload in matches), key=lambda payload: payload[0])
+            for _, _, (_, section) in matches:
+                query_tokens += content_tokens(" ".join(map(str, section["path"])).replace("_", " "))
+        
+        ranked = snapshot.bm25.search(query_tokens, RETRIEVAL_TOP_K)
+        if not ranked:
             return None
         
-        # Ambil section pertama yang match (paling relevan)
-        return matched_sections[0]
+        top_passages = [snapshot.passages[doc_id] for _, doc_id in ranked]
+        best = top_passages[0]
+        return {
+            "keyword": keyword_section["keyword"] if keyword_section else None,
+            "path": best["path"],
+            "data": best["data"],
+            "passages": top_passages
+        }
     
     def format_context(self, retrieved_data: Dict[str, Any]) -> str:
         """
         Format data yang sudah di-retrieve menjadi context string
-        Batasi panjang sesuai MAX_CONTEXT_LENGTH
+        Dibatasi budget MAX_CONTEXT_TOKENS, diisi field utuh sesuai urutan relevansi
         """
         if not retrieved_data:
             return ""
         
+        if retrieved_data.get("passages"):
+            return self._pack_passages(retrieved_data["passages"])
+        
         data = retrieved_data.get("data")
         keyword = retrieved_data.get("keyword", "")
         
         # Format berdasarkan tipe data
         if isinstance(data, dict):
-            # Jika dict, ambil key-value yang penting
-            context_parts = []
+            # Jika dict, ambil key-value yang penting (satu field per bagian)
+            parts = []
             for key, value in data.items():
                 if isinstance(value, (str, int, float)):
-                    context_parts.append(f"{key}: {value}")
+                    parts.append(f"{key}: {value}")
                 elif isinstance(value, list):
-                    context_parts.append(f"{key}: {', '.join(map(str, value))}")
-            context = " | ".join(context_parts)
+                    parts.append(f"{key}: {', '.join(map(str, value))}")
+            return self._pack_texts(parts, " | ")
         elif isinstance(data, list):
-            context = ", ".join(map(str, data))
-        else:
-            context = str(data)
-        
-        # Potong jika terlalu panjang
-        if len(context) > MAX_CONTEXT_LENGTH:
-            context = context[:MAX_CONTEXT_LENGTH] + "..."
-        
-        return context
+            return self._pack_texts([", ".join(map(str, data))], "")
+        return self._pack_texts([str(data)], "")
     
-    def get_direct_answer(self, question: str) -> Optional[str]:
+    def _pack_passages(self, passages: List[Dict[str, Any]]) -> str:
+        """
+        Isi budget MAX_CONTEXT_TOKENS dengan passage utuh sesuai urutan ranking
+        """
+        return self._pack_texts([passage["text"] for passage in passages], "\n",
+                                [passage["token_count"] for passage in passages])
+    
+    def _pack_texts(self, texts: List[str], separator: str,
+                    costs: Optional[List[int]] = None) -> str:
+        """
+        Greedy knapsack berurutan: field yang tidak muat dilewati (field berikutnya
+        yang lebih pendek masih boleh masuk), duplikat dibuang.
+        Hanya field pertama yang boleh dipotong (di batas kata) agar context tidak kosong
+        """
+        separator_cost = count_tokens(separator.strip()) if separator.strip() else 0
+        parts: List[str] = []
+        seen = set()
+        used = 0
+        for index, text in enumerate(texts):
+            if text in seen:
+                continue
+            seen.add(text)
+            cost = (costs[index] if costs else count_tokens(text)) + (separator_cost if parts else 0)
+            if used + cost <= MAX_CONTEXT_TOKENS:
+                parts.append(text)
+                used += cost
+            elif not parts:
+                truncated = truncate_to_tokens(text, MAX_CONTEXT_TOKENS)
+                if truncated:
+                    parts.append(truncated)
+                    used = MAX_CONTEXT_TOKENS
+        return separator.join(parts)
+    
+    def get_direct_answer(self, question: str, count: bool = True) -> Optional[str]:
         """
         Coba jawab langsung tanpa LLM untuk pertanyaan sederhana
+        Rule ada di DIRECT_ANSWER_RULES (direct_answer.py), dikompilasi saat load
         Return None jika perlu LLM untuk penjelasan lebih detail
+        count: False untuk pengecekan internal (tidak dihitung sebagai hit rule)
         """
-        question_lower = question.lower()
-        
-        # Pattern untuk pertanyaan simple yang bisa dijawab langsung
-        
-        # Nama sekolah
-        if "nama sekolah" in question_lower or "nama smk" in question_lower:
-            nama = self.data.get("profile", {}).get("nama", None)
-            if nama:
-                return f"{nama} adalah sekolah menengah kejuruan yang berlokasi di Bojonegoro."
-        
-        # Alamat
-        if "alamat" in question_lower or "di mana" in question_lower or "dimana" in question_lower:
-            alamat = self.data.get("profile", {}).get("alamat", None)
-            if alamat:
-                return f"SMKN 4 Bojonegoro berlokasi di {alamat}. Sekolah ini mudah diakses dan berada di lokasi strategis."
-        
-        # Kepala sekolah
-        if "kepala sekolah" in question_lower or "kepsek" in question_lower:
-            kepsek = self.data.get("profile", {}).get("kepala_sekolah", None)
-            if kepsek:
-                return f"Kepala Sekolah SMKN 4 Bojonegoro saat ini adalah {kepsek}."
-        
-        # Jumlah siswa
-        if "berapa siswa" in question_lower or "jumlah siswa" in question_lower:
-            siswa = self.data.get("profile", {}).get("jumlah_siswa", None)
-            if siswa:
-                return f"SMKN 4 Bojonegoro memiliki {siswa} siswa yang tersebar di berbagai jurusan."
-        
-        # Jumlah guru
-        if "berapa guru" in question_lower or "jumlah guru" in question_lower:
-            guru = self.data.get("profile", {}).get("jumlah_guru", None)
-            if guru:
-                return f"Sekolah ini memiliki {guru} guru profesional yang siap membimbing siswa."
-        
-        # List jurusan - lebih detail
-        if ("jurusan apa" in question_lower or "ada jurusan" in question_lower or 
-            "jurusan yang tersedia" in question_lower or "jurusan di" in question_lower):
-            jurusan_data = self.data.get("jurusan", {})
-            if jurusan_data:
-                jurusan_list = list(jurusan_data.keys())
-                return f"SMKN 4 Bojonegoro memiliki {len(jurusan_list)} jurusan unggulan: {', '.join(jurusan_list)}. Semua jurusan dirancang untuk mempersiapkan siswa memasuki dunia kerja atau melanjutkan kuliah."
-        
-        # Akreditasi
-        if "akreditasi" in question_lower:
-            akred = self.data.get("profile", {}).get("akreditasi", None)
-            if akred:
-                return f"SMKN 4 Bojonegoro berakreditasi {akred}, yang menunjukkan kualitas pendidikan yang baik dan terstandar."
-        
-        # Visi
-        if "visi" in question_lower and "misi" not in question_lower:
-            visi = self.data.get("profile", {}).get("visi", None)
-            if visi:
-                return f"Visi SMKN 4 Bojonegoro: {visi}"
-        
-        # Tambahan: Pertanyaan umum tentang jurusan tanpa data spesifik
-        if "apa itu rpl" in question_lower or "rpl itu apa" in question_lower:
-            return None  # Biarkan LLM jelaskan dengan lebih baik
-        
-        if "apa itu tkj" in question_lower or "tkj itu apa" in question_lower:
-            return None  # Biarkan LLM jelaskan dengan lebih baik
-        
-        if "apa itu mm" in question_lower or "multimedia itu apa" in question_lower:
-            return None  # Biarkan LLM jelaskan dengan lebih baik
-        
-        return None
+        return self._snapshot.direct_answers.match(question, count=count)
+    
+    def get_structured_answer(self, question: str, count: bool = True) -> Optional[Tuple[str, str]]:
+        """
+        Jawaban deterministik untuk pertanyaan lookup / agregat (query_engine.py)
+        Return (nama query, jawaban) atau None jika harus lewat retrieval + LLM
+        """
+        return self._snapshot.structured_queries.match(question, count=count)
+    
+    def add_reload_listener(self, listener: Callable[[List[str]], int]) -> None:
+        """
+        Daftarkan callback yang dipanggil setelah data berganti
+        Callback menerima section yang berubah dan mengembalikan jumlah entry cache yang di-invalidate
+        """
+        self._reload_listeners.append(listener)
+    
+    def reload(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Load ulang JSON, bangun snapshot baru di luar jalur request, lalu tukar secara atomik
+        Request yang sedang berjalan tetap memakai snapshot lama sampai selesai (copy-on-write)
+        File hilang / rusak / kosong: snapshot lama dipertahankan dan mtime tidak dicatat,
+        sehingga watcher mencoba lagi setelah file diperbaiki
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return {"reloaded": False, "reason": "reload sedang berjalan"}
+        
+        try:
+            old_snapshot = self._snapshot
+            mtime = self._data_mtime()
+            if not force and mtime == self._loaded_mtime:
+                return {"reloaded": False, "reason": "data tidak berubah"}
+            
+            start = time.perf_counter()
+            try:
+                data = self._load_data(strict=True)
+            except (OSError, ValueError) as e:
+                error = f"{type(e).__name__}: {e}"
+                if error != self.reload_stats["last_reload_error"]:
+                    print(f"Warning: reload {self.data_path} gagal, data lama tetap dipakai: {error}")
+                self.reload_stats["failed_reloads"] += 1
+                self.reload_stats["last_reload_error"] = error
+                return {"reloaded": False, "reason": f"data tidak valid: {error}"}
+            self._loaded_mtime = mtime
+            self.reload_stats["last_reload_error"] = None
+            changed_sections = sorted(
+                section for section in set(old_snapshot.data) | set(data)
+                if old_snapshot.data.get(section) != data.get(section)
+            )
+            if not changed_sections and not force:
+                return {"reloaded": False, "reason": "data tidak berubah"}
+            
+            new_snapshot = self._build_snapshot(data)
+            # Hit count rule tetap berlanjut antar versi data
+            new_snapshot.direct_answers.carry_over_stats(old_snapshot.direct_answers)
+            new_snapshot.structured_queries.carry_over_stats(old_snapshot.structured_queries)
+            build_ms = (time.perf_counter() - start) * 1000
+            self.snapshot_source = "json"
+            
+            if self.snapshot_path:
+                fingerprint = self._source_fingerprint()
+                if fingerprint:
+                    self._write_snapshot_file(new_snapshot, fingerprint)
+            
+            swap_start = time.perf_counter()
+            self._snapshot = new_snapshot
+            swap_us = (time.perf_counter() - swap_start) * 1e6
+            
+            invalidated = sum(listener(changed_sections) or 0 for listener in self._reload_listeners)
+            
+            self.reload_stats.update({
+                "reloads": self.reload_stats["reloads"] + 1,
+                "last_reload_ms": round(build_ms, 2),
+                "last_swap_us": round(swap_us, 2),
+                "last_changed_sections": changed_sections,
+                "last_invalidated_cache_entries": invalidated
+            })
+            return {
+                "reloaded": True,
+                "changed_sections": changed_sections,
+                "invalidated_cache_entries": invalidated,
+                "reload_ms": round(build_ms, 2),
+                "swap_us": round(swap_us, 2)
+            }
+        finally:
+            self._reload_lock.release()
+    
+    def start_watcher(self, interval: float) -> None:
+        """
+        Polling mtime file data setiap `interval` detik di thread daemon
+        """
+        if self._watcher is not None:
+            return
+        
+        def watch() -> None:
+            while True:
+                time.sleep(interval)
+                if self._data_mtime() != self._loaded_mtime:
+                    try:
+                        self.reload()
+                    except Exception as e:
+                        print(f"Warning: reload {self.data_path} gagal: {e}")
+        
+        self._watcher = threading.Thread(target=watch, name="data-watcher", daemon=True)
+        self._watcher.start()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Statistik data dan reload
+        """
+        snapshot = self._snapshot
+        return {
+            "data_path": self.data_path,
+            "data_hash": snapshot.data_hash,
+            "snapshot_source": self.snapshot_source,
+            "sections": len(snapshot.data),
+            "passages": len(snapshot.passages),
+            "unresolved_keywords": len(snapshot.unresolved_keywords),
+            "watching": self._watcher is not None,
+            **self.reload_stats
+        }
 
 # Global retrieval service instance
 retrieval_service = RetrievalService()
@@ -0,0 +1,187 @@
+"""
+Semantic Index
+Lookup near-duplicate pertanyaan untuk cache (tanpa GPU, tanpa network)
+Menggunakan MinHash LSH atas character trigram untuk mencari kandidat,
+lalu verifikasi dengan soft token Jaccard: setiap token bermakna harus punya pasangan
+(sama persis, atau mirip jika panjang dan alfabetis) agar "kelas rpl" tidak cocok dengan "kelas tkj"
+dan "kepala sekolah" tidak cocok dengan "wakil kepala sekolah"
+"""
+import zlib
+from collections import Counter
+from itertools import islice
+from typing import Dict, List, Optional, Set, Tuple
+from app.core.text import content_tokens, char_ngrams
+
+# Parameter LSH: 8 band x 2 row = 16 hash
+# Recall ~97% untuk kemiripan trigram 0.6; kandidat lemah dibatasi MAX_CANDIDATES
+NUM_BANDS = 8
+ROWS_PER_BAND = 2
+NUM_PERM = NUM_BANDS * ROWS_PER_BAND
+
+# Batas kandidat agar lookup tetap konstan walau bucket populer membesar
+MAX_BUCKET_SCAN = 64
+MAX_CANDIDATES = 16
+
+# Token pendek (rpl, tkj, mm) atau berisi angka (2023, 10) harus sama persis
+MIN_FUZZY_TOKEN_LENGTH = 4
+TOKEN_SIMILARITY = 0.5
+
+def _make_masks() -> List[int]:
+    """
+    Mask XOR 32-bit deterministik (satu per "permutasi") agar signature stabil antar proses
+    XOR atas hash crc32 cukup acak untuk LSH karena kandidat selalu diverifikasi ulang
+    """
+    masks = []
+    state = 0x9E3779B9
+    for _ in range(NUM_PERM):
+        state = (state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+        masks.append(state >> 32)
+    return masks
+
+_MASKS = _make_masks()
+
+def _token_similarity(a: str, b: str) -> float:
+    """
+    Kemiripan dua token berdasarkan trigram (toleran typo ringan)
+    """
+    if a == b:
+        return 1.0
+    if (len(a) < MIN_FUZZY_TOKEN_LENGTH or len(b) < MIN_FUZZY_TOKEN_LENGTH
+            or not a.isalpha() or not b.isalpha()):
+        return 0.0
+    grams_a = char_ngrams(a)
+    grams_b = char_ngrams(b)
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+def soft_jaccard(tokens_a: Tuple[str, ...], tokens_b: Tuple[str, ...],
+                 threshold: float = 0.0) -> float:
+    """
+    Jaccard antar himpunan token, pasangan token mirip dihitung sebesar kemiripannya
+    Return 0.0 jika ada token di salah satu sisi yang tidak punya pasangan
+    (satu token berbeda, mis. jurusan / tahun / jalur, mengubah maksud pertanyaan)
+    atau lebih awal jika skor tidak mungkin mencapai threshold
+    """
+    if not tokens_a or not tokens_b:
+        return 0.0
+    exact = set(tokens_a) & set(tokens_b)
+    left_a = [token for token in tokens_a if token not in exact]
+    left_b = [token for token in tokens_b if token not in exact]
+    if len(left_a) != len(left_b):
+        return 0.0
+    
+    matched = float(len(exact))
+    total = len(tokens_a) + len(tokens_b)
+    for token in left_a:
+        best_index, best_score = -1, TOKEN_SIMILARITY
+        for i, other in enumerate(left_b):
+            score = _token_similarity(token, other)
+            if score >= best_score:
+                best_index, best_score = i, score
+        if best_index < 0:
+            return 0.0
+        matched += best_score
+        left_b.pop(best_index)
+        # Batas atas jika sisa token cocok sempurna
+        best_case = matched + len(left_b)
+        if best_case / (total - best_case) < threshold:
+            return 0.0
+    return matched / (total - matched)
+
+class SemanticIndex:
+    def __init__(self, threshold: float, max_size: int = 0):
+        """
+        _exact: bentuk kanonik -> key (hit tanpa MinHash)
+        _tokens: key -> token bermakna, urut waktu masuk (untuk verifikasi dan penghapusan)
+        _buckets: (band, hash band) -> set key
+        max_size: batas jumlah key (0 = tanpa batas); key tertua dibuang lebih dulu
+        """
+        self.threshold = threshold
+        self.max_size = max_size
+        self._exact: Dict[str, str] = {}
+        self._tokens: Dict[str, Tuple[str, ...]] = {}
+        self._buckets: Dict[Tuple[int, int], Set[str]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._tokens)
+    
+    def _band_hashes(self, tokens: Tuple[str, ...]) -> List[Tuple[int, int]]:
+        """
+        MinHash signature atas trigram semua token, dipotong per band
+        """
+        shingles = set()
+        for token in tokens:
+            shingles.update(char_ngrams(token))
+        hashes = [zlib.crc32(s.encode()) for s in shingles]
+        signature = [min([h ^ mask for h in hashes]) for mask in _MASKS]
+        return [(band, hash(tuple(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])))
+                for band in range(NUM_BANDS)]
+    
+    def add(self, key: str, question: str) -> None:
+        """
+        Indeks pertanyaan yang jawabannya tersimpan di cache dengan key tersebut
+        """
+        tokens = tuple(content_tokens(question))
+        if not tokens:
+            return
+        if key in self._tokens:
+            self.remove(key)
+        
+        self._tokens[key] = tokens
+        self._exact[" ".join(sorted(tokens))] = key
+        for band_key in self._band_hashes(tokens):
+            self._buckets.setdefault(band_key, set()).add(key)
+        
+        if self.max_size and len(self._tokens) > self.max_size:
+            self.remove(next(iter(self._tokens)))
+    
+    def remove(self, key: str) -> None:
+        """
+        Hapus key dari indeks (dipanggil saat entry cache dibuang)
+        """
+        tokens = self._tokens.pop(key, None)
+        if tokens is None:
+            return
+        canonical = " ".join(sorted(tokens))
+        if self._exact.get(canonical) == key:
+            del self._exact[canonical]
+        for band_key in self._band_hashes(tokens):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+    
+    def lookup(self, question: str) -> Optional[Tuple[str, float]]:
+        """
+        Cari key pertanyaan yang paling mirip di atas threshold
+        Return: (key, skor) atau None
+        """
+        tokens = tuple(content_tokens(question))
+        if not tokens:
+            return None
+        
+        exact_key = self._exact.get(" ".join(sorted(tokens)))
+        if exact_key is not None:
+            return exact_key, 1.0
+        
+        # Kandidat: key yang paling sering berbagi band dengan pertanyaan
+        collisions: Counter = Counter()
+        for band_key in self._band_hashes(tokens):
+            bucket = self._buckets.get(band_key)
+            if bucket:
+                collisions.update(islice(bucket, MAX_BUCKET_SCAN))
+        
+        best: Optional[Tuple[str, float]] = None
+        for key, _ in collisions.most_common(MAX_CANDIDATES):
+            score = soft_jaccard(tokens, self._tokens[key], self.threshold)
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (key, score)
+        return best
+    
+    def clear(self) -> None:
+        """
+        Kosongkan indeks
+        """
+        self._exact.clear()
+        self._tokens.clear()
+        self._buckets.clear()
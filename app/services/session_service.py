@@ -0,0 +1,237 @@
+"""
+Session Service
+Riwayat percakapan ringkas per session (in-memory) untuk pertanyaan lanjutan
+"berapa kelasnya?" setelah "apa itu rpl" ditulis ulang menjadi "berapa kelasnya? rpl"
+sehingga tetap lewat direct answer / cache / retrieval, bukan LLM tanpa context
+Memori dibatasi per session (jumlah turn + byte) dan total (jumlah session + byte),
+session idle dibuang (LRU + TTL)
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from app.core.config import (
+    SESSION_IDLE_TTL,
+    SESSION_MAX_TURNS,
+    SESSION_MAX_BYTES,
+    SESSION_MAX_SESSIONS,
+    SESSION_MEMORY_BUDGET,
+    SESSION_FOLLOWUP_MAX_TOKENS,
+    SESSION_QUESTION_CHARS
+)
+from app.core.text import content_tokens, tokenize
+from app.services.retrieval_service import retrieval_service
+
+# Penanda rujukan ke topik sebelumnya ("kelasnya", "jurusan itu", "yang tadi")
+ANAPHORA_TOKENS = {"itu", "tersebut", "tadi", "dia", "mereka", "sana", "situ", "disana", "disitu", "nya"}
+
+# Kata tanya bukan topik: tidak dibawa ke turn berikutnya
+QUESTION_WORDS = {"berapa", "bagaimana", "gimana", "kapan", "siapa", "dimana", "mana", "kenapa", "mengapa"}
+
+# Perkiraan overhead satu session / satu turn di memori (object, deque, entry OrderedDict)
+_SESSION_OVERHEAD = 700
+_TURN_OVERHEAD = 160
+
+class Session:
+    """
+    State satu session: topik aktif dan beberapa turn terakhir (ringkas)
+    Turn: (pertanyaan dipotong, topik yang dipakai, source jawaban)
+    """
+    __slots__ = ("session_id", "topic", "section", "turns", "last_seen", "size")
+    
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.topic: Tuple[str, ...] = ()
+        self.section: Optional[str] = None
+        self.turns: Deque[Tuple[str, Tuple[str, ...], str]] = deque()
+        self.last_seen = time.monotonic()
+        self.size = _SESSION_OVERHEAD + len(session_id)
+    
+    def _turn_size(self, turn: Tuple[str, Tuple[str, ...], str]) -> int:
+        question, topic, source = turn
+        return _TURN_OVERHEAD + len(question) + sum(len(term) for term in topic) + len(source)
+    
+    def add_turn(self, turn: Tuple[str, Tuple[str, ...], str]) -> int:
+        """
+        Tambah turn, buang turn terlama jika melewati batas; return perubahan ukuran (byte)
+        """
+        before = self.size
+        self.turns.append(turn)
+        self.size += self._turn_size(turn)
+        while self.turns and (len(self.turns) > SESSION_MAX_TURNS or self.size > SESSION_MAX_BYTES):
+            self.size -= self._turn_size(self.turns.popleft())
+        return self.size - before
+    
+    def history(self) -> List[Dict[str, Any]]:
+        return [{"question": question, "topic": list(topic), "source": source}
+                for question, topic, source in self.turns]
+
+class SessionService:
+    def __init__(self, retrieval=retrieval_service, max_sessions: int = SESSION_MAX_SESSIONS,
+                 memory_budget: int = SESSION_MEMORY_BUDGET, idle_ttl: float = SESSION_IDLE_TTL):
+        """
+        _sessions: LRU (urutan akses terakhir), yang paling lama idle ada di depan
+        """
+        self.retrieval = retrieval
+        self.max_sessions = max_sessions
+        self.memory_budget = memory_budget
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.total_bytes = 0
+        
+        self.turns = 0
+        self.followups = 0
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+    
+    def _topic_of(self, question: str) -> Tuple[Tuple[str, ...], Optional[str]]:
+        """
+        Topik pertanyaan: keyword yang cocok (urut prioritas mapping) beserta section-nya,
+        jika tidak ada keyword, token bermakna selain kata tanya
+        """
+        matches = self.retrieval.keyword_index.find_all(question)
+        if matches:
+            payloads = sorted({payload[0]: payload[1] for _, _, payload in matches}.items())
+            section = str(payloads[0][1]["path"][0])
+            return tuple(payload["keyword"] for _, payload in payloads[:2]), section
+        tokens = [token for token in content_tokens(question) if token not in QUESTION_WORDS]
+        return tuple(tokens[:3]), None
+    
+    def _is_followup(self, question: str, has_keyword: bool) -> bool:
+        """
+        Pertanyaan lanjutan: tidak menyebut keyword sendiri dan pendek / memakai kata rujukan
+        """
+        if has_keyword:
+            return False
+        tokens = tokenize(question)
+        anaphora = any(token in ANAPHORA_TOKENS or (len(token) > 5 and token.endswith("nya"))
+                       for token in tokens)
+        return anaphora or len(content_tokens(question)) <= SESSION_FOLLOWUP_MAX_TOKENS
+    
+    def resolve(self, session_id: str, question: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Tulis ulang pertanyaan lanjutan dengan topik turn sebelumnya
+        Return: (pertanyaan efektif, info session untuk metadata)
+        """
+        topic, section = self._topic_of(question)
+        has_keyword = section is not None
+        now = time.monotonic()
+        
+        with self._lock:
+            self._evict_idle(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = Session(session_id)
+                self.total_bytes += session.size
+                self._evict_capacity()
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_seen = now
+            
+            followup = bool(session.topic) and self._is_followup(question, has_keyword)
+            if followup:
+                effective = f"{question} {' '.join(session.topic)}"
+                topic, section = session.topic, session.section
+                self.followups += 1
+            else:
+                effective = question
+                if topic:
+                    session.topic, session.section = topic, section
+        
+        return effective, {
+            "id": session_id,
+            "followup": followup,
+            "topic": list(topic),
+            "section": section,
+            "resolved_question": effective
+        }
+    
+    def record(self, session_id: str, question: str, topic: List[str], source: str) -> None:
+        """
+        Simpan turn ringkas setelah jawaban didapat (pertanyaan dipotong, tanpa jawaban)
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            turn = (question[:SESSION_QUESTION_CHARS], tuple(topic), sys.intern(source))
+            self.total_bytes += session.add_turn(turn)
+            self.turns += 1
+            self._evict_capacity()
+    
+    def _evict_idle(self, now: float) -> None:
+        """
+        Buang session idle dari depan LRU; berhenti di session pertama yang masih aktif
+        """
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_seen < self.idle_ttl:
+                break
+            self._remove(session.session_id)
+            self.evicted_idle += 1
+    
+    def _evict_capacity(self) -> None:
+        while self._sessions and (len(self._sessions) > self.max_sessions
+                                  or self.total_bytes > self.memory_budget):
+            self._remove(next(iter(self._sessions)))
+            self.evicted_capacity += 1
+    
+    def _remove(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        self.total_bytes -= session.size
+    
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            return {
+                "id": session.session_id,
+                "topic": list(session.topic),
+                "section": session.section,
+                "idle_seconds": round(time.monotonic() - session.last_seen, 1),
+                "size_bytes": session.size,
+                "history": session.history()
+            }
+    
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id not in self._sessions:
+                return False
+            self._remove(session_id)
+            return True
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+            self.total_bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._sessions)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            active = len(self._sessions)
+            return {
+                "active_sessions": active,
+                "max_sessions": self.max_sessions,
+                "memory_bytes": self.total_bytes,
+                "memory_budget": self.memory_budget,
+                "avg_session_bytes": round(self.total_bytes / active) if active else 0,
+                "turns": self.turns,
+                "followups_resolved": self.followups,
+                "evicted_idle": self.evicted_idle,
+                "evicted_capacity": self.evicted_capacity
+            }
+    
+    def reset_stats(self) -> None:
+        self.turns = 0
+        self.followups = 0
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+
+# Global session service instance
+session_service = SessionService()
@@ -0,0 +1,253 @@
+"""
+Tenant Service
+Satu deployment untuk banyak sekolah: request membawa school_id, data dan indeks
+sekolah tersebut dimuat lazy dari TENANTS_DIR/<school_id>.json saat pertama dipakai
+- Struktur yang tidak bergantung isi data (trie keyword, rule direct answer, metrics,
+  LLM gateway, admission) dipakai bersama semua tenant
+- Cache jawaban tiap tenant = namespace di backend cache global: satu LRU + satu budget byte
+- Tenant idle / di luar budget dibongkar (LRU + TTL); dimuat ulang dari snapshot pickle saat dibutuhkan
+Tanpa school_id request dilayani answer_service global (deployment satu sekolah)
+"""
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from app.core.config import (
+    TENANTS_DIR,
+    TENANT_SNAPSHOT_DIR,
+    TENANT_MAX_LOADED,
+    TENANT_IDLE_TTL,
+    TENANT_MEMORY_BUDGET
+)
+from app.core.singleflight import SingleFlight
+from app.services.answer_service import AnswerService, answer_service
+from app.services.answer_table import AnswerTable
+from app.services.cache_backends import NamespacedBackend
+from app.services.cache_service import CacheService, cache_service
+from app.services.retrieval_service import RetrievalService
+
+# Juga dipakai sebagai prefix key cache / session, jadi tanpa ":" "/" "%" "_"
+SCHOOL_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9-]{0,63}$")
+
+# Perkiraan memori tenant per byte JSON (data + passage + BM25 + jawaban direct; terukur ~15-20x)
+_MEMORY_PER_DATA_BYTE = 20
+
+class UnknownTenantError(Exception):
+    """
+    school_id tidak valid atau tidak ada file datanya
+    """
+    def __init__(self, school_id: str):
+        super().__init__(f"Sekolah tidak dikenal: {school_id}")
+        self.school_id = school_id
+
+class Tenant:
+    """
+    Service milik satu sekolah yang sedang dimuat
+    """
+    __slots__ = ("school_id", "service", "size", "last_seen", "load_ms")
+    
+    def __init__(self, school_id: str, service: AnswerService, size: int, load_ms: float):
+        self.school_id = school_id
+        self.service = service
+        self.size = size
+        self.last_seen = time.monotonic()
+        self.load_ms = load_ms
+
+class TenantService:
+    def __init__(self, tenants_dir: str = TENANTS_DIR, snapshot_dir: Optional[str] = TENANT_SNAPSHOT_DIR,
+                 max_loaded: int = TENANT_MAX_LOADED, memory_budget: int = TENANT_MEMORY_BUDGET,
+                 idle_ttl: float = TENANT_IDLE_TTL, cache: CacheService = cache_service):
+        """
+        _tenants: LRU (urutan akses terakhir), tenant yang paling lama idle ada di depan
+        cache: backend-nya dibagi per namespace untuk semua tenant
+        """
+        self.tenants_dir = tenants_dir
+        self.snapshot_dir = snapshot_dir or None
+        self.max_loaded = max_loaded
+        self.memory_budget = memory_budget
+        self.idle_ttl = idle_ttl
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._tenants: "OrderedDict[str, Tenant]" = OrderedDict()
+        # Request serentak ke tenant yang belum dimuat cukup menunggu satu load
+        self.single_flight = SingleFlight()
+        self.total_bytes = 0
+        
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+    
+    def data_path(self, school_id: str) -> str:
+        return os.path.join(self.tenants_dir, f"{school_id}.json")
+    
+    def exists(self, school_id: str) -> bool:
+        return bool(SCHOOL_ID_PATTERN.match(school_id)) and os.path.isfile(self.data_path(school_id))
+    
+    def peek(self, school_id: str) -> Optional[AnswerService]:
+        """
+        Service tenant jika sudah dimuat (tanpa I/O); sekaligus menandai tenant aktif
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            tenant = self._tenants.get(school_id)
+            if tenant is None:
+                return None
+            self._tenants.move_to_end(school_id)
+            tenant.last_seen = now
+            return tenant.service
+    
+    def get(self, school_id: Optional[str]) -> AnswerService:
+        """
+        Answer service untuk school_id (None / kosong = deployment default)
+        Raise UnknownTenantError jika sekolah tidak dikenal
+        """
+        if not school_id:
+            return answer_service
+        service = self.peek(school_id)
+        if service is not None:
+            return service
+        if not self.exists(school_id):
+            raise UnknownTenantError(school_id)
+        tenant, _ = self.single_flight.do(school_id, lambda: self._load(school_id))
+        return tenant.service
+    
+    async def aget(self, school_id: Optional[str]) -> AnswerService:
+        """
+        Versi async: tenant yang sudah dimuat dijawab langsung,
+        load pertama (parse JSON / unpickle) dijalankan di thread agar event loop tidak tertahan
+        """
+        if not school_id:
+            return answer_service
+        service = self.peek(school_id)
+        if service is not None:
+            return service
+        return await asyncio.to_thread(self.get, school_id)
+    
+    def _load(self, school_id: str) -> Tenant:
+        with self._lock:
+            tenant = self._tenants.get(school_id)
+            if tenant is not None:
+                return tenant
+        
+        start = time.perf_counter()
+        data_path = self.data_path(school_id)
+        snapshot_path = None
+        if self.snapshot_dir:
+            try:
+                os.makedirs(self.snapshot_dir, exist_ok=True)
+                snapshot_path = os.path.join(self.snapshot_dir, f"{school_id}.pkl")
+            except OSError:
+                pass
+        
+        retrieval = RetrievalService(data_path, snapshot_path=snapshot_path, school_name=None)
+        cache = CacheService(backend=NamespacedBackend(self.cache.backend, school_id), warm_entries=0)
+        table = AnswerTable(os.path.join(self.tenants_dir, f"{school_id}.answers.bin"))
+        service = AnswerService(retrieval=retrieval, cache=cache, table=table, namespace=school_id)
+        
+        load_seconds = time.perf_counter() - start
+        try:
+            size = os.path.getsize(data_path) * _MEMORY_PER_DATA_BYTE
+        except OSError:
+            size = 0
+        tenant = Tenant(school_id, service, size, load_seconds * 1000)
+        
+        with self._lock:
+            self._tenants[school_id] = tenant
+            self.total_bytes += size
+            self.loads += 1
+            self.load_seconds += load_seconds
+            self._evict_capacity(keep=school_id)
+        return tenant
+    
+    def _evict_idle(self, now: float) -> None:
+        """
+        Bongkar tenant idle dari depan LRU; berhenti di tenant pertama yang masih aktif
+        """
+        while self._tenants:
+            tenant = next(iter(self._tenants.values()))
+            if now - tenant.last_seen < self.idle_ttl:
+                break
+            self._unload(tenant.school_id)
+            self.evicted_idle += 1
+    
+    def _evict_capacity(self, keep: str) -> None:
+        while len(self._tenants) > 1 and (len(self._tenants) > self.max_loaded
+                                          or self.total_bytes > self.memory_budget):
+            school_id = next(iter(self._tenants))
+            if school_id == keep:
+                break
+            self._unload(school_id)
+            self.evicted_capacity += 1
+    
+    def _unload(self, school_id: str) -> None:
+        """
+        Lepas tenant dari memori; entry cache namespace-nya ikut dibuang dari backend bersama
+        Request yang masih memegang service lama tetap selesai normal
+        """
+        tenant = self._tenants.pop(school_id)
+        self.total_bytes -= tenant.size
+        tenant.service.cache.backend.detach()
+        tenant.service.answer_table.close()
+    
+    def unload(self, school_id: str) -> bool:
+        with self._lock:
+            if school_id not in self._tenants:
+                return False
+            self._unload(school_id)
+            return True
+    
+    def reload(self, school_id: str, force: bool = False) -> Dict[str, Any]:
+        """
+        Reload data satu tenant (hanya jika sedang dimuat; jika tidak, load berikutnya sudah membaca file baru)
+        """
+        service = self.peek(school_id)
+        if service is None:
+            if not self.exists(school_id):
+                raise UnknownTenantError(school_id)
+            return {"reloaded": False, "reason": "tenant belum dimuat"}
+        return service.retrieval.reload(force=force)
+    
+    def __len__(self) -> int:
+        return len(self._tenants)
+    
+    def stats(self, include_tenants: bool = True) -> Dict[str, Any]:
+        """
+        include_tenants: rincian per tenant (bisa ratusan baris, untuk /tenants)
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            tenants = list(self._tenants.values()) if include_tenants else []
+            stats = {
+                "tenants_dir": self.tenants_dir,
+                "loaded": len(self._tenants),
+                "max_loaded": self.max_loaded,
+                "memory_bytes": self.total_bytes,
+                "memory_budget": self.memory_budget,
+                "loads": self.loads,
+                "avg_load_ms": round(self.load_seconds / self.loads * 1000, 2) if self.loads else 0.0,
+                "evicted_idle": self.evicted_idle,
+                "evicted_capacity": self.evicted_capacity
+            }
+        if include_tenants:
+            stats["tenants"] = [
+                {
+                    "school_id": tenant.school_id,
+                    "school_name": tenant.service.retrieval.school_name,
+                    "idle_seconds": round(now - tenant.last_seen, 1),
+                    "size_bytes": tenant.size,
+                    "load_ms": round(tenant.load_ms, 2),
+                    "snapshot_source": tenant.service.retrieval.snapshot_source,
+                    "cache_entries": len(tenant.service.cache.backend)
+                }
+                for tenant in reversed(tenants)
+            ]
+        return stats
+
+# Global tenant service instance
+tenant_service = TenantService()
@@ -0,0 +1,130 @@
+"""
+Benchmark cold start
+1. Breakdown `python -X importtime -c "import main"`: total, modul terberat, modul app.*,
+   dan cek bahwa paket LLM (langchain_groq, groq, httpx) TIDAK ikut ter-import
+2. Harness cold start: proses baru per run, ukur import main, request pertama
+   (direct answer), request kedua, dan biaya inisialisasi client LLM yang ditunda
+   Dijalankan dengan snapshot pickle dan dengan parse JSON untuk perbandingan
+
+Usage: python benchmarks/bench_coldstart.py [--runs 5] [--top 10] [--json]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ("langchain_groq", "langchain_core", "groq", "httpx")
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# Dijalankan di proses baru; TestClient di-import sebelum timer (bukan bagian dari app)
+HARNESS = r"""
+import json, sys, time
+from fastapi.testclient import TestClient
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+client = TestClient(main.app)
+first = client.post("/ask", json={"question": "siapa kepala sekolah"})
+first_done = time.perf_counter()
+client.post("/ask", json={"question": "alamat sekolah dimana"})
+second_done = time.perf_counter()
+lazy_loaded = [name for name in %r if name in sys.modules]
+from app.core.llm import get_shared_llm
+get_shared_llm()
+llm_done = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_request_ms": (first_done - imported) * 1000,
+    "second_request_ms": (second_done - first_done) * 1000,
+    "llm_init_ms": (llm_done - second_done) * 1000,
+    "first_source": first.json()["source"],
+    "snapshot_source": main.retrieval_service.snapshot_source,
+    "llm_modules_before_llm_call": lazy_loaded
+}))
+""" % (LAZY_MODULES,)
+
+def child_env(**overrides: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("GROQ_API_KEY", "offline")
+    env.update(overrides)
+    return env
+
+def importtime_breakdown(top: int) -> dict:
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                               cwd=ROOT, env=child_env(), capture_output=True, text=True, check=True)
+    modules = []
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({"module": name, "self_ms": int(self_us) / 1000,
+                            "cumulative_ms": int(cumulative_us) / 1000, "depth": len(indent) // 2})
+    total = next((module["cumulative_ms"] for module in modules if module["module"] == "main"), 0.0)
+    names = {module["module"] for module in modules}
+    return {
+        "total_ms": total,
+        "heaviest": sorted((module for module in modules if module["depth"] <= 1),
+                           key=lambda module: module["cumulative_ms"], reverse=True)[:top],
+        "app_modules": sorted((module for module in modules if module["module"].startswith("app.")),
+                              key=lambda module: module["cumulative_ms"], reverse=True)[:top],
+        "llm_modules_imported": [name for name in LAZY_MODULES if name in names]
+    }
+
+def cold_start(runs: int, **env: str) -> dict:
+    samples = []
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, "-c", HARNESS], cwd=ROOT, env=child_env(**env),
+                                   capture_output=True, text=True, check=True)
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    summary = {key: round(statistics.median(sample[key] for sample in samples), 1)
+               for key in ("import_ms", "first_request_ms", "second_request_ms", "llm_init_ms")}
+    summary.update({key: samples[-1][key]
+                    for key in ("first_source", "snapshot_source", "llm_modules_before_llm_call")})
+    summary["runs"] = runs
+    return summary
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="Output JSON (untuk dibandingkan antar commit)")
+    args = parser.parse_args()
+    
+    # Pastikan snapshot pickle ada sebelum mode "snapshot" diukur
+    subprocess.run([sys.executable, "scripts/build_snapshot.py"], cwd=ROOT, env=child_env(),
+                   capture_output=True, check=True)
+    
+    report = {
+        "python": sys.version.split()[0],
+        "importtime": importtime_breakdown(args.top),
+        "cold_start": {
+            "snapshot": cold_start(args.runs),
+            "json": cold_start(args.runs, RETRIEVAL_SNAPSHOT_PATH="")
+        }
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    
+    breakdown = report["importtime"]
+    print(f"import main: {breakdown['total_ms']:.1f} ms (python {report['python']})")
+    print(f"paket LLM ter-import saat startup: {breakdown['llm_modules_imported'] or 'tidak ada'}")
+    print("\nModul terberat (kumulatif):")
+    for module in breakdown["heaviest"]:
+        print(f"  {module['cumulative_ms']:>8.1f} ms  {module['module']}")
+    print("\nModul app.* (kumulatif / self):")
+    for module in breakdown["app_modules"]:
+        print(f"  {module['cumulative_ms']:>8.1f} / {module['self_ms']:>6.1f} ms  {module['module']}")
+    
+    print(f"\nCold start (median {args.runs} run):")
+    print(f"  {'mode':<9} {'import':>9} {'req #1':>9} {'req #2':>9} {'llm init':>9}  snapshot")
+    for mode, row in report["cold_start"].items():
+        print(f"  {mode:<9} {row['import_ms']:>7.1f}ms {row['first_request_ms']:>7.1f}ms "
+              f"{row['second_request_ms']:>7.1f}ms {row['llm_init_ms']:>7.1f}ms  {row['snapshot_source']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Ukuran prompt per budget context
+Menghitung token system prompt, context, dan prompt lengkap untuk sekumpulan pertanyaan
+pada beberapa nilai MAX_CONTEXT_TOKENS, untuk tuning SYSTEM_PROMPT dan budget (tanpa LLM call)
+
+Usage: python benchmarks/bench_prompt_tokens.py [budget ...]
+"""
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "offline")
+
+import app.services.retrieval_service as retrieval_module
+from app.core.config import SYSTEM_PROMPT
+from app.core.tokens import count_tokens, tokenizer_name
+from app.services.answer_service import answer_service
+from app.services.retrieval_service import retrieval_service
+
+QUESTIONS = [
+    "fasilitas apa saja yang ada di smkn 4 bojonegoro",
+    "ada lab komputer untuk jurusan rekayasa perangkat lunak tidak",
+    "bagaimana cara daftar ppdb tahun ini",
+    "prestasi apa saja yang pernah diraih siswa",
+    "jelaskan jurusan teknik pengelasan",
+    "ekstrakurikuler apa saja yang ada",
+    "siapa saja guru di sekolah ini",
+    "kerja sama industri sekolah dengan perusahaan apa",
+    "syarat pendaftaran siswa baru",
+    "sejarah sekolah"
+]
+
+def measure(budget: int) -> dict:
+    retrieval_module.MAX_CONTEXT_TOKENS = budget
+    contexts, prompts, passages_used, passages_total = [], [], 0, 0
+    for question in QUESTIONS:
+        retrieved = retrieval_service.retrieve_relevant_data(question)
+        context = retrieval_service.format_context(retrieved)
+        prompt = answer_service._build_prompt(question, context) if retrieved \
+            else answer_service._build_general_prompt(question)
+        contexts.append(count_tokens(context))
+        prompts.append(count_tokens(prompt))
+        if retrieved:
+            passages_total += len(retrieved["passages"])
+            passages_used += sum(1 for passage in retrieved["passages"] if passage["text"] in context)
+    return {
+        "budget": budget,
+        "context_avg": statistics.mean(contexts),
+        "context_max": max(contexts),
+        "prompt_avg": statistics.mean(prompts),
+        "prompt_max": max(prompts),
+        "passages_used": passages_used / passages_total if passages_total else 0.0
+    }
+
+def main() -> None:
+    budgets = [int(arg) for arg in sys.argv[1:]] or [60, 120, 180, 240, 360]
+    print(f"tokenizer: {tokenizer_name()}, system prompt: {count_tokens(SYSTEM_PROMPT)} token")
+    print(f"{'budget':>7} {'ctx avg':>8} {'ctx max':>8} {'prompt avg':>11} {'prompt max':>11} {'passage terpakai':>17}")
+    for budget in budgets:
+        row = measure(budget)
+        print(f"{row['budget']:>7} {row['context_avg']:>8.1f} {row['context_max']:>8} "
+              f"{row['prompt_avg']:>11.1f} {row['prompt_max']:>11} {row['passages_used']:>16.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Benchmark jalur response /ask untuk jawaban direct dan cache
+Membandingkan response lama (dict divalidasi response_model AnswerResponse lalu di-encode
+jsonable_encoder + JSONResponse) dengan fast path (RawJSONResponse, jawaban pre-encoded, orjson jika ada)
+- http: req/s dan latency app FastAPI lengkap (middleware, routing, parsing body) dipanggil langsung
+  lewat ASGI (tanpa socket / HTTP client, agar selisih jalur response tidak tertutup overhead client);
+  mode validated dan raw dijalankan bergantian beberapa ronde, diambil ronde terbaik
+- serialize: biaya per response saja (tanpa routing), mikrodetik; sisi validated mengikuti FastAPI yang
+  terpasang (<= 0.11x: jsonable_encoder + json.dumps, versi baru: validasi + dump_json pydantic-core)
+
+Usage: python benchmarks/bench_response.py [--requests 5000] [--concurrency 16] [--rounds 3] [--json] [--out FILE]
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GROQ_API_KEY", "offline")
+
+import fastapi
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from pydantic import TypeAdapter
+
+from benchmarks.bench_micro import measure
+from benchmarks.common import environment_info, latency_summary
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.loadtest import DIRECT_QUESTIONS, REPEATED_QUESTIONS
+from app.core.fast_json import RawJSONResponse, encode_answer, encoder_name
+from app.core.llm_gateway import LLMGateway
+import main
+
+async def ask(question: str) -> Tuple[int, Dict[str, Any]]:
+    """
+    Satu POST /ask langsung ke app ASGI (seperti yang dilakukan server, tanpa socket)
+    """
+    body = json.dumps({"question": question}).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/ask", "raw_path": b"/ask", "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000), "server": ("app", 80)
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    response: Dict[str, Any] = {"status": 0, "body": b""}
+    
+    async def receive() -> Dict[str, Any]:
+        return messages.pop() if messages else {"type": "http.disconnect"}
+    
+    async def send(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+    
+    await main.app(scope, receive, send)
+    return response["status"], json.loads(response["body"])
+
+def validated_serializer() -> Tuple[str, Callable[[Dict[str, Any]], bytes]]:
+    """
+    Serialisasi response_model seperti yang dilakukan FastAPI terpasang untuk endpoint yang mengembalikan dict
+    """
+    if "dump_json" in inspect.signature(serialize_response).parameters:
+        adapter = TypeAdapter(main.AnswerResponse)
+        return "dump_json", lambda result: adapter.dump_json(adapter.validate_python(result))
+    return "jsonable_encoder", lambda result: JSONResponse(jsonable_encoder(
+        main.AnswerResponse.model_validate(result))).body
+
+async def run_http(questions: List[str], total: int, concurrency: int) -> Dict[str, Any]:
+    samples: List[float] = []
+    sources: Dict[str, int] = {}
+    queue = iter(questions[index % len(questions)] for index in range(total))
+    
+    async def worker() -> None:
+        for question in queue:
+            start = time.perf_counter()
+            status, payload = await ask(question)
+            samples.append((time.perf_counter() - start) * 1000)
+            source = payload["source"] if status == 200 else "http_error"
+            sources[source] = sources.get(source, 0) + 1
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - start
+    return {
+        "rps": round(len(samples) / duration, 1) if duration else 0.0,
+        "latency_ms": latency_summary(samples, digits=3),
+        "sources": sources
+    }
+
+async def run(total: int, concurrency: int, rounds: int, iterations: int) -> Dict[str, Any]:
+    main.answer_service.llm = LLMGateway(FakeChatModel(0.0), requests_per_minute=0)
+    main.admission.enabled = False
+    main.cache_service.clear()
+    
+    # Satu lintasan lewat fake LLM mengisi cache; pertanyaan yang dijawab tier lain tidak dipakai
+    warm = {question: (await ask(question))[1]["source"] for question in DIRECT_QUESTIONS + REPEATED_QUESTIONS}
+    paths = {
+        "direct": [question for question in DIRECT_QUESTIONS if warm[question] == "direct"],
+        "cache": [question for question in REPEATED_QUESTIONS if (await ask(question))[1]["source"] == "cache"]
+    }
+    
+    results: Dict[str, Any] = {}
+    for path, questions in paths.items():
+        runs: Dict[str, List[Dict[str, Any]]] = {"validated": [], "raw": []}
+        for _ in range(rounds):
+            for mode, fast in (("validated", False), ("raw", True)):
+                main.FAST_RESPONSE_ENABLED = fast
+                await run_http(questions, min(total, 200), concurrency)
+                runs[mode].append(await run_http(questions, total, concurrency))
+        results[path] = {mode: max(samples, key=lambda run: run["rps"]) for mode, samples in runs.items()}
+        results[path]["speedup"] = round(results[path]["raw"]["rps"] / results[path]["validated"]["rps"], 2)
+    main.FAST_RESPONSE_ENABLED = True
+    
+    results["serialize_us"] = {}
+    _, validated = validated_serializer()
+    for path, questions in paths.items():
+        samples = [main.answer_service.get_answer(question) for question in questions]
+        results["serialize_us"][path] = {
+            "validated": measure(validated, samples, iterations),
+            "raw": measure(lambda result: RawJSONResponse(encode_answer(result)).body, samples, iterations)
+        }
+    return results
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark response direct / cache: validated vs raw")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--iterations", type=int, default=5000, help="Iterasi benchmark serialize")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--out", help="Tulis hasil JSON ke file")
+    args = parser.parse_args()
+    
+    report = {
+        "benchmark": "response",
+        **environment_info(),
+        "config": {"requests": args.requests, "concurrency": args.concurrency, "rounds": args.rounds,
+                   "iterations": args.iterations, "encoder": encoder_name(), "fastapi": fastapi.__version__,
+                   "validated_serializer": validated_serializer()[0]},
+        "results": asyncio.run(run(args.requests, args.concurrency, args.rounds, args.iterations))
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    
+    results = report["results"]
+    config = report["config"]
+    print(f"encoder: {config['encoder']}, fastapi {config['fastapi']} ({config['validated_serializer']})")
+    print(f"{'path':<8} {'mode':<10} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'serialize us':>13}")
+    for path in ("direct", "cache"):
+        for mode in ("validated", "raw"):
+            http = results[path][mode]
+            print(f"{path:<8} {mode:<10} {http['rps']:>9.1f} {http['latency_ms']['p50']:>8.3f} "
+                  f"{http['latency_ms']['p99']:>8.3f} {results['serialize_us'][path][mode]['mean']:>13.2f}")
+        print(f"{path:<8} speedup    {results[path]['speedup']:>8.2f}x")
+
+if __name__ == "__main__":
+    main_cli()
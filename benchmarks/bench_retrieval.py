@@ -0,0 +1,66 @@
+"""
+Micro-benchmark keyword retrieval
+Membandingkan loop substring lama dengan KeywordIndex (token trie) pada 10k keyword
+
+Usage: python benchmarks/bench_retrieval.py [jumlah_keyword]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.keyword_index import KeywordIndex
+
+QUESTIONS = [
+    "fasilitas apa saja yang ada di smkn 4 bojonegoro",
+    "ada lab komputer untuk jurusan rekayasa perangkat lunak tidak",
+    "bagaimana cara daftar ppdb tahun ini",
+    "siapa kepala sekolah sekarang dan berapa jumlah guru",
+    "prestasi apa saja yang pernah diraih siswa"
+]
+
+def legacy_match(mapping, question):
+    """
+    Implementasi lama: cek substring untuk setiap keyword
+    """
+    question_lower = question.lower()
+    for keyword, path in mapping.items():
+        if keyword in question_lower:
+            return keyword
+    return None
+
+def bench(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for question in QUESTIONS:
+            fn(question)
+    return (time.perf_counter() - start) / (repeat * len(QUESTIONS)) * 1e6
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rng = random.Random(7)
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    mapping = {}
+    while len(mapping) < size:
+        words = ["".join(rng.choices(alphabet, k=rng.randint(3, 9))) for _ in range(rng.randint(1, 3))]
+        mapping[" ".join(words)] = ["section"]
+    # Keyword asli di akhir mapping agar loop lama harus memeriksa semuanya
+    mapping.update({"fasilitas": ["fasilitas"], "ppdb": ["info_ppdb"], "prestasi": ["prestasi"]})
+    
+    start = time.perf_counter()
+    index = KeywordIndex()
+    for priority, keyword in enumerate(mapping):
+        index.add(keyword, priority)
+    compile_ms = (time.perf_counter() - start) * 1000
+    
+    legacy_us = bench(lambda q: legacy_match(mapping, q), 200)
+    trie_us = bench(index.find_all, 2000)
+    
+    print(f"keywords={len(mapping)} compile={compile_ms:.1f}ms")
+    print(f"legacy substring loop: {legacy_us:.1f}us/query")
+    print(f"token trie:            {trie_us:.1f}us/query ({legacy_us / trie_us:.0f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark semantic cache
+Mengukur waktu lookup SemanticIndex dengan N pertanyaan tersimpan
+
+Usage: python benchmarks/bench_semantic_cache.py [jumlah_entry]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import SIMILARITY_THRESHOLD
+from app.services.semantic_index import SemanticIndex
+
+WORDS = [
+    "jurusan", "kelas", "siswa", "guru", "alamat", "fasilitas", "prestasi", "ppdb",
+    "pendaftaran", "jadwal", "biaya", "seragam", "ekstrakurikuler", "lab", "perpustakaan",
+    "kantin", "bengkel", "hotel", "kuliner", "pengelasan", "geologi", "ternak", "rpl",
+    "berapa", "kapan", "siapa", "dimana", "bagaimana", "syarat", "nilai", "lomba",
+    "juara", "tahun", "alumni", "kerja", "mitra", "industri", "magang", "prakerin"
+]
+
+def make_question(rng: random.Random) -> str:
+    return " ".join(rng.sample(WORDS, rng.randint(3, 6))) + f" {rng.randint(0, 10**6)}"
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(42)
+    index = SemanticIndex(SIMILARITY_THRESHOLD)
+    
+    questions = [make_question(rng) for _ in range(size)]
+    start = time.perf_counter()
+    for i, question in enumerate(questions):
+        index.add(f"k{i}", question)
+    build_seconds = time.perf_counter() - start
+    
+    # Setengah query near-duplicate (kata diacak), setengah pertanyaan baru
+    queries = []
+    for _ in range(2000):
+        words = rng.choice(questions).split()
+        rng.shuffle(words)
+        queries.append(" ".join(words))
+        queries.append(make_question(rng))
+    
+    timings = []
+    hits = 0
+    for query in queries:
+        start = time.perf_counter()
+        hits += index.lookup(query) is not None
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    
+    print(f"entries={size} build={build_seconds:.2f}s")
+    print(f"lookup p50={timings[len(timings) // 2] * 1e6:.0f}us "
+          f"p99={timings[int(len(timings) * 0.99)] * 1e6:.0f}us "
+          f"hit_rate={hits / len(queries):.2f}")
+
+if __name__ == "__main__":
+    main()
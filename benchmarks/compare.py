@@ -0,0 +1,58 @@
+"""
+Bandingkan dua hasil benchmark JSON (loadtest / micro) antar commit
+Menampilkan nilai lama, baru, dan selisih %; exit code 1 jika ada regresi di atas threshold
+
+Usage: python benchmarks/compare.py baseline.json candidate.json [--threshold 10]
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+# Metrik yang makin besar makin baik; selain itu (latency, error, LLM call) makin kecil makin baik
+HIGHER_IS_BETTER = ("rps", "ops_per_s")
+IGNORED = ("count", "requests", "duration_s", "max")  # max terlalu berisik antar run
+
+def flatten(node: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        yield prefix, float(node)
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> int:
+    old = dict(flatten(baseline["results"]))
+    new = dict(flatten(candidate["results"]))
+    print(f"{baseline.get('commit')} -> {candidate.get('commit')} ({candidate.get('benchmark')})")
+    print(f"{'metric':<40} {'lama':>12} {'baru':>12} {'selisih':>9}")
+    regressions = 0
+    for name in sorted(old.keys() & new.keys()):
+        leaf = name.rsplit(".", 1)[-1]
+        if leaf in IGNORED or name.startswith("gateway."):
+            continue
+        before, after = old[name], new[name]
+        change = (after - before) / before * 100 if before else 0.0
+        worse = -change if leaf in HIGHER_IS_BETTER else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESI"
+            regressions += 1
+        print(f"{name:<40} {before:>12.2f} {after:>12.2f} {change:>+8.1f}%{flag}")
+    print(f"\n{regressions} regresi di atas {threshold}%")
+    return regressions
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bandingkan dua hasil benchmark JSON")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Batas regresi dalam persen")
+    args = parser.parse_args()
+    
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+    sys.exit(1 if compare(baseline, candidate, args.threshold) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Fake LLM server (OpenAI/Groq-compatible)
+Meniru /openai/v1/chat/completions dengan latency, kuota per menit (429 + Retry-After)
+dan error 5xx yang bisa diatur, untuk menguji LLM gateway tanpa memakai kuota asli
+
+Usage:
+    python benchmarks/fake_llm.py --port 8001 --latency 0.5 --rpm 30 --error-rate 0.05
+    LLM_BASE_URL=http://127.0.0.1:8001 GROQ_API_KEY=fake uvicorn main:app
+
+FakeChatModel menyediakan perilaku yang sama tanpa HTTP untuk benchmark in-process
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER = ("SMKN 4 Bojonegoro adalah sekolah menengah kejuruan negeri di Bojonegoro "
+          "dengan beberapa kompetensi keahlian dan fasilitas praktik yang lengkap.")
+
+class FakeMessage:
+    def __init__(self, content: str):
+        self.content = content
+
+class FakeProviderError(Exception):
+    """
+    Error bergaya SDK provider (status_code dibaca oleh LLM gateway)
+    """
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+class FakeChatModel:
+    def __init__(self, latency: float = 0.3, ttft: float = 0.1, rate_limit_rate: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 0):
+        """
+        Pengganti ChatGroq (invoke / ainvoke / astream) dengan latency dan injeksi 429 / 500
+        """
+        self.latency = latency
+        self.ttft = ttft
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.counters = {"requests": 0, "rate_limited": 0, "errors": 0}
+    
+    def _maybe_fail(self) -> None:
+        self.counters["requests"] += 1
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            self.counters["rate_limited"] += 1
+            raise FakeProviderError(429, "rate_limit_exceeded (fake)")
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.counters["errors"] += 1
+            raise FakeProviderError(500, "Internal error (fake)")
+    
+    def invoke(self, prompt: str) -> FakeMessage:
+        self._maybe_fail()
+        time.sleep(self.latency)
+        return FakeMessage(ANSWER)
+    
+    async def ainvoke(self, prompt: str) -> FakeMessage:
+        self._maybe_fail()
+        await asyncio.sleep(self.latency)
+        return FakeMessage(ANSWER)
+    
+    async def astream(self, prompt: str):
+        self._maybe_fail()
+        await asyncio.sleep(self.ttft)
+        words = ANSWER.split(" ")
+        step = max(self.latency - self.ttft, 0) / len(words)
+        for index, word in enumerate(words):
+            yield FakeMessage(word if index == 0 else " " + word)
+            await asyncio.sleep(step)
+
+def create_app(latency: float = 0.3, ttft: float = 0.1, rpm: float = 0,
+               burst: float = 5, error_rate: float = 0.0, seed: int = 0,
+               rate_limit_rate: float = 0.0) -> FastAPI:
+    """
+    latency: total waktu jawaban (detik), ttft: jeda sebelum chunk pertama saat streaming
+    rpm: kuota request per menit (0 = tanpa batas), error_rate: peluang 500,
+    rate_limit_rate: peluang 429 acak di luar kuota
+    """
+    app = FastAPI(title="Fake LLM")
+    quota = {"tokens": float(burst), "updated": time.monotonic()}
+    rng = random.Random(seed)
+    counters = {"requests": 0, "rate_limited": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+    
+    def reject(status: int, message: str, headers: dict = None) -> JSONResponse:
+        error_type = "rate_limit_exceeded" if status == 429 else "server_error"
+        return JSONResponse({"error": {"message": message, "type": error_type, "code": error_type}},
+                            status_code=status, headers=headers)
+    
+    def take_quota() -> float:
+        """
+        Token bucket sederhana; return detik sampai request berikutnya diizinkan
+        """
+        if rpm <= 0:
+            return 0.0
+        now = time.monotonic()
+        quota["tokens"] = min(burst, quota["tokens"] + (now - quota["updated"]) * rpm / 60.0)
+        quota["updated"] = now
+        if quota["tokens"] >= 1:
+            quota["tokens"] -= 1
+            return 0.0
+        return (1 - quota["tokens"]) * 60.0 / rpm
+    
+    def chunk(completion_id: str, model: str, delta: dict, finish_reason=None) -> str:
+        payload = {
+            "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+            "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+    
+    async def completions(request: Request):
+        body = await request.json()
+        counters["requests"] += 1
+        wait = take_quota()
+        if wait == 0 and rng.random() < rate_limit_rate:
+            wait = 1.0
+        if wait > 0:
+            counters["rate_limited"] += 1
+            return reject(429, "Rate limit reached (fake)", {"retry-after": f"{wait:.2f}"})
+        if rng.random() < error_rate:
+            counters["errors"] += 1
+            return reject(500, "Internal error (fake)")
+        
+        model = body.get("model", "fake")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        words = ANSWER.split(" ")
+        
+        if body.get("stream"):
+            async def stream():
+                counters["in_flight"] += 1
+                counters["max_in_flight"] = max(counters["max_in_flight"], counters["in_flight"])
+                try:
+                    await asyncio.sleep(ttft)
+                    yield chunk(completion_id, model, {"role": "assistant", "content": ""})
+                    step = max(latency - ttft, 0) / len(words)
+                    for index, word in enumerate(words):
+                        yield chunk(completion_id, model, {"content": word if index == 0 else " " + word})
+                        await asyncio.sleep(step)
+                    yield chunk(completion_id, model, {}, "stop")
+                    yield "data: [DONE]\n\n"
+                finally:
+                    counters["in_flight"] -= 1
+            return StreamingResponse(stream(), media_type="text/event-stream")
+        
+        counters["in_flight"] += 1
+        counters["max_in_flight"] = max(counters["max_in_flight"], counters["in_flight"])
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            counters["in_flight"] -= 1
+        return {
+            "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": ANSWER}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)}
+        }
+    
+    app.add_api_route("/openai/v1/chat/completions", completions, methods=["POST"])
+    app.add_api_route("/v1/chat/completions", completions, methods=["POST"])
+    app.add_api_route("/stats", lambda: counters, methods=["GET"])
+    return app
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--ttft", type=float, default=0.1)
+    parser.add_argument("--rpm", type=float, default=0)
+    parser.add_argument("--burst", type=float, default=5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    
+    import uvicorn
+    uvicorn.run(create_app(args.latency, args.ttft, args.rpm, args.burst, args.error_rate,
+                           rate_limit_rate=args.rate_limit_rate),
+                host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
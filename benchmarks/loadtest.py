@@ -0,0 +1,239 @@
+"""
+Load test /ask dengan fake LLM
+Campuran pertanyaan realistis: direct (dijawab rule), repeated (FAQ populer, distribusi Zipf)
+dan long-tail (unik, selalu ke LLM). Closed-loop dengan N worker paralel.
+
+Mode:
+- inprocess: app FastAPI lewat httpx ASGITransport, LLM = FakeChatModel (tanpa jaringan)
+- uvicorn  : app dan fake LLM server dijalankan sebagai proses terpisah (jalur HTTP asli, ChatGroq)
+
+Output: p50/p95/p99 latency, req/s, LLM call per 1k pertanyaan, per jenis pertanyaan dan per source
+--json / --out untuk hasil machine-readable (bandingkan antar commit dengan benchmarks/compare.py)
+
+Usage:
+    python benchmarks/loadtest.py --requests 2000 --concurrency 32 --latency 0.2 --rate-limit-rate 0.05
+    python benchmarks/loadtest.py --mode uvicorn --out results/loadtest.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GROQ_API_KEY", "offline")
+
+import httpx
+
+from benchmarks.common import environment_info, latency_summary
+
+DIRECT_QUESTIONS = [
+    "siapa kepala sekolah", "alamat sekolah dimana", "berapa jumlah siswa", "jurusan apa saja",
+    "email sekolah apa", "nomor telepon sekolah", "akreditasi sekolah apa", "berapa jumlah guru"
+]
+
+REPEATED_QUESTIONS = [
+    "apa itu rpl", "jelaskan jurusan tkj", "fasilitas apa saja yang ada", "bagaimana cara daftar ppdb",
+    "prestasi apa saja yang pernah diraih", "ekstrakurikuler apa saja", "mitra industri sekolah apa saja",
+    "lulusan kerja dimana", "apa itu jurusan perhotelan", "jelaskan jurusan kuliner",
+    "apa itu geologi pertambangan", "jurusan teknik pengelasan belajar apa", "kegiatan rutin sekolah apa",
+    "ada lab komputer tidak", "bagaimana sejarah sekolah", "apa itu pkl", "syarat pendaftaran apa saja",
+    "jelaskan jurusan multimedia", "apa itu agribisnis ternak ruminansia", "ada masjid di sekolah"
+]
+
+LONG_TAIL_TEMPLATES = [
+    "apakah ada {word} di sekolah nomor {i}", "bagaimana kalau {word} untuk angkatan {i}",
+    "jadwal {word} minggu ke {i}", "berapa biaya {word} tahun {i}"
+]
+LONG_TAIL_WORDS = ["seragam", "kantin", "beasiswa", "parkir", "asrama", "bus", "koperasi", "studi tur",
+                   "wisuda", "rapor", "osis", "pramuka", "kurikulum", "ujian", "magang luar negeri"]
+
+def build_workload(total: int, mix: Dict[str, float], seed: int) -> List[Tuple[str, str]]:
+    """
+    Daftar (jenis, pertanyaan) deterministik untuk seed yang sama
+    """
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    zipf = [1 / rank for rank in range(1, len(REPEATED_QUESTIONS) + 1)]
+    workload = []
+    for index in range(total):
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "direct":
+            question = rng.choice(DIRECT_QUESTIONS)
+        elif kind == "repeated":
+            question = rng.choices(REPEATED_QUESTIONS, zipf)[0]
+        else:
+            question = rng.choice(LONG_TAIL_TEMPLATES).format(word=rng.choice(LONG_TAIL_WORDS), i=index)
+        workload.append((kind, question))
+    return workload
+
+async def run_load(client: httpx.AsyncClient, workload: List[Tuple[str, str]],
+                   concurrency: int) -> Dict[str, Any]:
+    samples: List[Dict[str, Any]] = []
+    queue = iter(workload)
+    
+    async def worker() -> None:
+        for kind, question in queue:
+            start = time.perf_counter()
+            try:
+                response = await client.post("/ask", json={"question": question})
+                status = response.status_code
+                source = response.json().get("source", "unknown") if status == 200 else "http_error"
+            except httpx.HTTPError:
+                status, source = 0, "http_error"
+            samples.append({"kind": kind, "source": source, "status": status,
+                            "latency_ms": (time.perf_counter() - start) * 1000})
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - start
+    
+    by_kind = {kind: latency_summary([sample["latency_ms"] for sample in samples if sample["kind"] == kind])
+               for kind in sorted({sample["kind"] for sample in samples})}
+    by_source: Dict[str, int] = {}
+    for sample in samples:
+        by_source[sample["source"]] = by_source.get(sample["source"], 0) + 1
+    return {
+        "requests": len(samples),
+        "duration_s": round(duration, 3),
+        "rps": round(len(samples) / duration, 1) if duration else 0.0,
+        "latency_ms": latency_summary([sample["latency_ms"] for sample in samples]),
+        "by_kind": by_kind,
+        "by_source": by_source,
+        "errors": sum(1 for sample in samples if sample["status"] != 200)
+    }
+
+async def run_inprocess(args: argparse.Namespace, workload: List[Tuple[str, str]]) -> Dict[str, Any]:
+    from benchmarks.fake_llm import FakeChatModel
+    from app.core.llm_gateway import LLMGateway
+    import main
+    
+    fake = FakeChatModel(args.latency, rate_limit_rate=args.rate_limit_rate,
+                         error_rate=args.error_rate, seed=args.seed)
+    main.answer_service.llm = LLMGateway(fake, requests_per_minute=args.gateway_rpm)
+    main.admission.enabled = args.admission
+    main.cache_service.clear()
+    main.answer_service.reset_stats()
+    
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=60) as client:
+        result = await run_load(client, workload, args.concurrency)
+    result["llm_requests"] = fake.counters["requests"]
+    result["llm_rate_limited"] = fake.counters["rate_limited"]
+    result["gateway"] = main.answer_service.llm.stats()
+    return result
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def wait_ready(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} tidak merespons dalam {timeout}s")
+
+async def run_uvicorn(args: argparse.Namespace, workload: List[Tuple[str, str]]) -> Dict[str, Any]:
+    fake_port, app_port = free_port(), free_port()
+    fake_process = subprocess.Popen(
+        [sys.executable, "benchmarks/fake_llm.py", "--port", str(fake_port), "--latency", str(args.latency),
+         "--rate-limit-rate", str(args.rate_limit_rate), "--error-rate", str(args.error_rate)],
+        cwd=ROOT
+    )
+    env = dict(os.environ, LLM_BASE_URL=f"http://127.0.0.1:{fake_port}", GROQ_API_KEY="fake",
+               LLM_REQUESTS_PER_MINUTE=str(args.gateway_rpm), CACHE_BACKEND="memory",
+               RATE_LIMIT_ENABLED="1" if args.admission else "0")
+    app_process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning",
+         "--workers", str(args.workers)],
+        cwd=ROOT, env=env
+    )
+    try:
+        await wait_ready(f"http://127.0.0.1:{fake_port}/stats")
+        await wait_ready(f"http://127.0.0.1:{app_port}/")
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", timeout=60, limits=limits) as client:
+            result = await run_load(client, workload, args.concurrency)
+            fake_stats = (await client.get(f"http://127.0.0.1:{fake_port}/stats")).json()
+            if args.workers == 1:
+                result["gateway"] = (await client.get("/stats")).json()["answer_service"]["llm_gateway"]
+        result["llm_requests"] = fake_stats["requests"]
+        result["llm_rate_limited"] = fake_stats["rate_limited"]
+        return result
+    finally:
+        for process in (app_process, fake_process):
+            process.terminate()
+            process.wait(timeout=10)
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        kind, weight = part.split("=")
+        if kind not in ("direct", "repeated", "longtail"):
+            raise argparse.ArgumentTypeError(f"jenis tidak dikenal: {kind}")
+        mix[kind] = float(weight)
+    return mix
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test /ask dengan fake LLM")
+    parser.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("direct=0.3,repeated=0.5,longtail=0.2"))
+    parser.add_argument("--latency", type=float, default=0.2, help="Latency fake LLM (detik)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Peluang 429 dari fake LLM")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Peluang 500 dari fake LLM")
+    parser.add_argument("--gateway-rpm", type=float, default=0, help="Kuota LLM gateway (0 = tanpa batas)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker uvicorn (mode uvicorn)")
+    parser.add_argument("--admission", action="store_true",
+                        help="Aktifkan rate limit per client + load shedding (semua request dari satu client)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--out", help="Tulis hasil JSON ke file")
+    args = parser.parse_args()
+    
+    workload = build_workload(args.requests, args.mix, args.seed)
+    runner = run_inprocess if args.mode == "inprocess" else run_uvicorn
+    result = asyncio.run(runner(args, workload))
+    result["llm_calls_per_1k"] = round(result["llm_requests"] / result["requests"] * 1000, 1)
+    
+    report = {
+        "benchmark": "loadtest",
+        **environment_info(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("json", "out")},
+        "results": result
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    
+    latency = result["latency_ms"]
+    print(f"{args.mode}: {result['requests']} request, concurrency {args.concurrency}, "
+          f"{result['duration_s']}s -> {result['rps']} req/s, error {result['errors']}")
+    print(f"latency ms: p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+    for kind, summary in result["by_kind"].items():
+        print(f"  {kind:<9} n={summary['count']:<6} p50 {summary['p50']:>8}  p95 {summary['p95']:>8}  "
+              f"p99 {summary['p99']:>8}")
+    print(f"source: {result['by_source']}")
+    print(f"LLM request: {result['llm_requests']} ({result['llm_calls_per_1k']} per 1k pertanyaan), "
+          f"429: {result['llm_rate_limited']}")
+
+if __name__ == "__main__":
+    main()
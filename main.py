@@ -3,11 +3,28 @@ Main FastAPI Application
 Endpoint chatbot SMKN 4 Bojonegoro dengan arsitektur hemat token
 Architecture: Clean, modular, dan enterprise-ready
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+from typing import List, Optional
+from pydantic import BaseModel, Field
 from app.services.answer_service import answer_service
 from app.services.cache_service import cache_service
+from app.services.retrieval_service import retrieval_service
+from app.services.tenant_service import tenant_service, UnknownTenantError
+from app.core.fast_json import RawJSONResponse, dumps, encode_answer, encode_batch
+from app.core.tokens import load_encoding
+from app.core.metrics import REGISTRY, Gauge
+from app.core.tracing import TracingMiddleware, profiler
+from app.core.rate_limit import RateLimitMiddleware, OverloadedError, admission, retry_after_header
+from app.core.config import (
+    FAST_RESPONSE_ENABLED,
+    DATA_RELOAD_INTERVAL,
+    BATCH_MAX_QUESTIONS,
+    BATCH_LLM_CONCURRENCY,
+    PROFILER_MAX_SECONDS,
+    CORS_ALLOW_ORIGINS
+)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -16,18 +33,53 @@ app = FastAPI(
     version="2.0"
 )
 
-# CORS middleware
+# Tokenizer di-load sekarang, bukan di request pertama (fallback heuristik jika gagal / offline)
+load_encoding()
+
+# Hot reload data sekolah (polling mtime) jika diaktifkan
+if DATA_RELOAD_INTERVAL > 0:
+    retrieval_service.start_watcher(DATA_RELOAD_INTERVAL)
+
+# Rate limit per client (paling dalam, setelah CORS agar response 429 tetap terbaca browser)
+app.add_middleware(RateLimitMiddleware)
+
+# CORS middleware (origin dibatasi lewat env CORS_ALLOW_ORIGINS)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
+    allow_origins=CORS_ALLOW_ORIGINS,
+    allow_credentials=CORS_ALLOW_ORIGINS != ["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Server-Timing", "Retry-After"],
 )
 
+# Request ID di setiap response; breakdown latency jika header X-Debug-Trace dikirim
+app.add_middleware(TracingMiddleware)
+
+@app.exception_handler(OverloadedError)
+async def overloaded_handler(request: Request, error: OverloadedError):
+    """
+    Request ditolak admission control (limit client / antrean LLM penuh)
+    """
+    return JSONResponse(
+        status_code=429,
+        content={
+            "detail": "Terlalu banyak request, silakan coba lagi nanti",
+            "reason": error.reason,
+            "retry_after": round(error.retry_after, 2)
+        },
+        headers={"Retry-After": retry_after_header(error.retry_after)}
+    )
+
+@app.exception_handler(UnknownTenantError)
+async def unknown_tenant_handler(request: Request, error: UnknownTenantError):
+    return JSONResponse(status_code=404, content={"detail": str(error)})
+
 # Request model
 class Query(BaseModel):
     question: str
+    session_id: Optional[str] = Field(default=None, max_length=64)  # Aktifkan mode percakapan
+    school_id: Optional[str] = Field(default=None, max_length=64)  # Tenant (TENANTS_DIR/<school_id>.json)
 
 # Response model untuk dokumentasi yang lebih baik
 class AnswerResponse(BaseModel):
@@ -35,6 +87,19 @@ class AnswerResponse(BaseModel):
     source: str = "llm"
     metadata: dict = {}
 
+# Request/response model untuk batch
+class BatchQuery(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_QUESTIONS)
+    concurrency: Optional[int] = Field(default=None, ge=1, le=64)
+    school_id: Optional[str] = Field(default=None, max_length=64)
+
+class BatchAnswer(AnswerResponse):
+    timing_ms: float = 0.0
+
+class BatchResponse(BaseModel):
+    results: List[BatchAnswer]
+    metadata: dict = {}
+
 @app.get("/")
 def read_root():
     """
@@ -54,24 +119,113 @@ def read_root():
     }
 
 @app.post("/ask", response_model=AnswerResponse)
-def ask_bot(query: Query):
+async def ask_bot(query: Query):
     """
     Main endpoint untuk bertanya
     
     Flow:
     1. Coba direct answer (tanpa LLM) - HEMAT TOKEN
     2. Check cache - HEMAT TOKEN
-    3. Retrieve relevant data only - HEMAT TOKEN
-    4. Call LLM with minimal context - TOKEN EFFICIENT
+    3. Intent router: sapaan / di luar topik dijawab tanpa LLM - HEMAT TOKEN
+    4. Retrieve relevant data only - HEMAT TOKEN
+    5. Call LLM with minimal context (tier model sesuai intent) - TOKEN EFFICIENT
+    
+    429 + Retry-After jika limit client terlampaui atau antrean LLM penuh
+    (direct / cache tetap dijawab selama limit request umum client belum habis)
     
     Returns:
     - jawaban: Jawaban dari sistem
-    - source: "direct" | "cache" | "llm" | "fallback"
+    - source: "direct" | "structured" | "prerendered" | "cache" | "greeting" | "off_topic" | "llm" | "fallback"
     - metadata: Informasi tambahan tentang proses
+      (+ metadata.session jika session_id dikirim: pertanyaan lanjutan dilengkapi topik sebelumnya)
+      (+ metadata.timings per tahap jika header X-Debug-Trace: 1 dikirim)
+    
+    school_id: jawab dari data sekolah tersebut (404 jika tidak dikenal), tanpa school_id = sekolah default
+    
+    Handler async: panggilan LLM tidak memblokir thread worker,
+    sehingga direct/cache answer tidak ikut antri di belakang LLM yang lambat
+    
+    Response dikirim sebagai bytes siap kirim (RawJSONResponse): response_model hanya untuk
+    dokumentasi, jawaban direct / cache sudah ter-encode JSON sejak load / disimpan
     """
-    result = answer_service.get_answer(query.question)
+    service = await tenant_service.aget(query.school_id)
+    result = await service.aget_answer(query.question, query.session_id)
+    if FAST_RESPONSE_ENABLED:
+        return RawJSONResponse(encode_answer(result))
     return result
 
+@app.post("/ask/batch", response_model=BatchResponse)
+async def ask_bot_batch(query: BatchQuery):
+    """
+    Jawab banyak pertanyaan dalam satu request (kiosk, prerender FAQ)
+    
+    - Direct/cache dijawab dalam satu lintasan
+    - Pertanyaan identik hanya memicu satu LLM call
+    - LLM call berjalan paralel (dibatasi `concurrency`)
+    - Hasil urut sesuai input, masing-masing dengan `source` dan `timing_ms`
+    """
+    service = await tenant_service.aget(query.school_id)
+    batch = await service.aget_answers_batch(
+        query.questions,
+        concurrency=query.concurrency or BATCH_LLM_CONCURRENCY
+    )
+    if FAST_RESPONSE_ENABLED:
+        return RawJSONResponse(encode_batch(batch))
+    return batch
+
+@app.post("/ask/stream")
+async def ask_bot_stream(query: Query):
+    """
+    Endpoint streaming (Server-Sent Events) untuk time-to-first-token yang cepat
+    
+    Event:
+    - answer: jawaban direct/cache lengkap dalam satu frame
+    - token: potongan teks dari LLM ({"text": ...})
+    - done: response lengkap (format sama dengan /ask) + metadata.timings
+    - error: jawaban fallback jika LLM gagal
+    
+    Event pertama diambil sebelum response dimulai, sehingga penolakan
+    admission control masih bisa dikirim sebagai 429 biasa
+    """
+    service = await tenant_service.aget(query.school_id)
+    events = service.astream_answer(query.question, query.session_id)
+    first = await events.__anext__()
+    
+    async def event_stream():
+        yield format_event(first)
+        async for event in events:
+            yield format_event(event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/session/{session_id}")
+def get_session(session_id: str, school_id: Optional[str] = None):
+    """
+    Riwayat ringkas dan topik aktif satu session
+    """
+    service = tenant_service.get(school_id)
+    session = service.sessions.get(service.session_key(session_id))
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session tidak ditemukan atau sudah kedaluwarsa")
+    return session
+
+@app.delete("/session/{session_id}")
+def delete_session(session_id: str, school_id: Optional[str] = None):
+    """
+    Akhiri session (topik tidak lagi dibawa ke pertanyaan berikutnya)
+    """
+    service = tenant_service.get(school_id)
+    return {"deleted": service.sessions.delete(service.session_key(session_id))}
+
+def format_event(event: dict) -> bytes:
+    data = event["data"]
+    payload = encode_answer(data) if "jawaban" in data else dumps(data)
+    return b"event: " + event["event"].encode() + b"\ndata: " + payload + b"\n\n"
+
 @app.get("/stats")
 def get_stats():
     """
@@ -80,23 +234,102 @@ def get_stats():
     """
     return {
         "answer_service": answer_service.get_stats(),
-        "cache_service": cache_service.stats()
+        "cache_service": cache_service.stats(),
+        "retrieval": retrieval_service.stats(),
+        "direct_answers": retrieval_service.direct_answers.stats(),
+        "structured_queries": retrieval_service.structured_queries.stats(),
+        "answer_table": answer_service.answer_table.stats(),
+        "admission": admission.stats(),
+        "tenants": tenant_service.stats(include_tenants=False)
     }
 
+@app.get("/tenants")
+def get_tenants():
+    """
+    Tenant (sekolah) yang sedang dimuat beserta perkiraan memori dan entry cache-nya
+    """
+    return tenant_service.stats()
+
+@app.delete("/tenants/{school_id}")
+def unload_tenant(school_id: str):
+    """
+    Bongkar satu tenant dari memori (admin only in production); load ulang otomatis saat ada request
+    """
+    return {"unloaded": tenant_service.unload(school_id)}
+
+# Gauge dibaca saat scrape, tidak menambah biaya di jalur request
+Gauge("chatbot_cache_entries", "Jumlah entry di cache jawaban", lambda: len(cache_service.backend))
+Gauge("chatbot_cache_hits", "Cache hit sejak start", lambda: cache_service.hits)
+Gauge("chatbot_cache_misses", "Cache miss sejak start", lambda: cache_service.misses)
+Gauge("chatbot_single_flight_in_flight", "LLM call yang sedang berjalan",
+      lambda: answer_service.single_flight.stats()["in_flight"])
+Gauge("chatbot_tenants_loaded", "Tenant (sekolah) yang sedang dimuat", lambda: len(tenant_service))
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Metrics format Prometheus (counter, histogram latency per tahap, gauge cache)
+    """
+    answer_service.check_conversions()
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/debug/profile/start")
+def start_profile(interval_ms: float = 5.0, duration_s: float = 30.0):
+    """
+    Nyalakan sampling profiler saat runtime (admin only in production)
+    Berhenti otomatis setelah duration_s (maksimal PROFILER_MAX_SECONDS)
+    """
+    started = profiler.start(interval_ms / 1000, min(max(duration_s, 0.1), PROFILER_MAX_SECONDS))
+    return {"started": started, **profiler.stats()}
+
+@app.post("/debug/profile/stop", response_class=PlainTextResponse)
+def stop_profile(prefix: Optional[str] = None):
+    """
+    Hentikan profiler dan kembalikan stack format folded
+    (flamegraph.pl / speedscope); prefix="app." untuk hanya jalur kode aplikasi
+    """
+    profiler.stop()
+    return PlainTextResponse(profiler.folded(prefix))
+
+@app.get("/debug/profile")
+def profile_status():
+    """
+    Status sampling profiler
+    """
+    return profiler.stats()
+
 @app.post("/cache/clear")
-def clear_cache():
+def clear_cache(school_id: Optional[str] = None):
     """
     Endpoint untuk membersihkan cache (admin only in production)
+    school_id: hanya namespace cache sekolah tersebut
     """
-    cache_service.clear()
+    if school_id:
+        tenant_service.get(school_id).cache.clear()
+    else:
+        cache_service.clear()
     return {"message": "Cache cleared successfully"}
 
+@app.post("/data/reload")
+def reload_data(force: bool = False, school_id: Optional[str] = None):
+    """
+    Reload data sekolah tanpa restart (admin only in production)
+    Snapshot baru dibangun di thread worker lalu ditukar secara atomik,
+    hanya cache dari section yang berubah yang di-invalidate
+    school_id: reload data tenant tersebut (jika sedang dimuat)
+    """
+    if school_id:
+        return tenant_service.reload(school_id, force=force)
+    return retrieval_service.reload(force=force)
+
 @app.post("/stats/reset")
 def reset_stats():
     """
     Reset statistik answer service (admin only in production)
     """
     answer_service.reset_stats()
+    retrieval_service.direct_answers.reset_stats()
+    retrieval_service.structured_queries.reset_stats()
     return {"message": "Statistics reset successfully"}
 
 # For Vercel serverless compatibility
@@ -0,0 +1,43 @@
+"""
+Bangun snapshot retrieval (pickle) untuk cold start cepat
+Server memuat file ini saat startup alih-alih parse JSON + membangun indeks,
+selama sidik jari data / mapping / rule masih cocok (jika tidak, otomatis dibangun ulang)
+
+Usage: python scripts/build_snapshot.py [--out data/retrieval_snapshot.pkl]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import RETRIEVAL_SNAPSHOT_PATH
+from app.services.retrieval_service import RetrievalService
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bangun snapshot retrieval untuk cold start")
+    parser.add_argument("--data", default="data/info_sekolah.json")
+    parser.add_argument("--out", default=RETRIEVAL_SNAPSHOT_PATH)
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    RetrievalService(args.data, snapshot_path=None)
+    build_ms = (time.perf_counter() - start) * 1000
+    
+    # Menulis snapshot jika belum ada / sudah tidak cocok dengan data
+    service = RetrievalService(args.data, snapshot_path=args.out)
+    
+    # Verifikasi: instance baru harus bisa memuat snapshot tanpa parse JSON
+    start = time.perf_counter()
+    check = RetrievalService(args.data, snapshot_path=args.out)
+    load_ms = (time.perf_counter() - start) * 1000
+    if check.snapshot_source != "pickle":
+        print(f"Gagal menulis snapshot ke {args.out}")
+        sys.exit(1)
+    
+    print(f"{args.out}: {os.path.getsize(args.out) / 1024:.1f} KB, data {service.data_hash}, "
+          f"parse JSON + build {build_ms:.1f} ms vs load pickle {load_ms:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Prerender jawaban FAQ saat build
+Menyusun korpus pertanyaan dari keyword_mapping dan section JSON (+ file pertanyaan opsional),
+menjawabnya lewat pipeline AnswerService (paralel terbatas), lalu menulis artifact
+yang di-memory-map server saat startup (app/services/answer_table.py)
+
+Usage:
+    python scripts/prerender_answers.py [--questions faq.txt] [--out data/answers.bin]
+                                        [--concurrency 4] [--dry-run]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import ANSWER_TABLE_PATH, PRERENDER_CONCURRENCY
+from app.core.text import normalize_question
+from app.services.answer_service import answer_service
+from app.services.answer_table import write_answer_table
+from app.services.retrieval_service import retrieval_service
+
+# Hanya jawaban yang benar-benar berasal dari LLM (atau cache hasil LLM) yang disimpan
+PRERENDER_SOURCES = ("llm", "cache")
+
+def build_corpus(extra_questions: List[str]) -> List[str]:
+    """
+    Korpus pertanyaan unik (per key ter-normalisasi):
+    file pertanyaan dulu, lalu keyword, section, dan nama item di section list
+    Pertanyaan yang sudah dijawab direct answer / structured query dilewati (tier itu sudah 0 LLM call)
+    """
+    data = retrieval_service.data
+    candidates = list(extra_questions)
+    candidates += [f"jelaskan {keyword}" for keyword in retrieval_service.keyword_mapping]
+    candidates += [f"jelaskan {section.replace('_', ' ')}" for section in data]
+    for section, value in data.items():
+        if not isinstance(value, list):
+            continue
+        for item in value:
+            name = item if isinstance(item, str) else None
+            if isinstance(item, dict):
+                name = item.get("nama") or item.get("judul")
+            if name:
+                candidates.append(f"jelaskan {section.replace('_', ' ')} {name}")
+    
+    corpus, seen = [], set()
+    for question in candidates:
+        key = normalize_question(question)
+        if (not key or key in seen or retrieval_service.get_direct_answer(question)
+                or retrieval_service.get_structured_answer(question, count=False)):
+            continue
+        seen.add(key)
+        corpus.append(question)
+    return corpus
+
+async def prerender(questions: List[str], concurrency: int) -> Dict[str, Any]:
+    batch = await answer_service.aget_answers_batch(questions, concurrency)
+    answers, skipped = {}, []
+    for question, result in zip(questions, batch["results"]):
+        if result["source"] in PRERENDER_SOURCES:
+            answers[question] = result["jawaban"]
+        else:
+            skipped.append((question, result["source"]))
+    return {"answers": answers, "skipped": skipped}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prerender jawaban FAQ ke answer table")
+    parser.add_argument("--questions", help="File berisi satu pertanyaan per baris")
+    parser.add_argument("--out", default=ANSWER_TABLE_PATH)
+    parser.add_argument("--concurrency", type=int, default=PRERENDER_CONCURRENCY)
+    parser.add_argument("--dry-run", action="store_true", help="Tampilkan korpus tanpa memanggil LLM")
+    args = parser.parse_args()
+    
+    extra = []
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            extra = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    
+    corpus = build_corpus(extra)
+    if args.dry_run:
+        print("\n".join(corpus))
+        print(f"{len(corpus)} pertanyaan")
+        return
+    
+    # Artifact lama tidak boleh ikut menjawab saat membangun yang baru
+    answer_service.answer_table.close()
+    
+    start = time.perf_counter()
+    result = asyncio.run(prerender(corpus, args.concurrency))
+    size = write_answer_table(args.out, result["answers"], retrieval_service.data_hash)
+    duration = time.perf_counter() - start
+    
+    for question, source in result["skipped"]:
+        print(f"  dilewati ({source}): {question}")
+    print(f"{len(result['answers'])}/{len(corpus)} jawaban -> {args.out} "
+          f"({size / 1024:.1f} KB, data {retrieval_service.data_hash}, {duration:.1f}s)")
+    if not result["answers"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Latih intent router dari data berlabel dan tulis bobotnya (JSON)
+Server memuat file ini saat routing pertama selama sidik jari data latih + parameter masih cocok
+(jika tidak, model dilatih ulang otomatis). Laporan: akurasi k-fold, akurasi di atas
+INTENT_MIN_CONFIDENCE, dan pertanyaan sekolah yang akan tersalah-rute ke sapaan / penolakan
+
+Usage: python scripts/train_intent_router.py [--data data/intents.tsv] [--out data/intent_model.json] [--folds 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import INTENT_DATA_PATH, INTENT_MODEL_PATH, INTENT_MIN_CONFIDENCE
+from app.services.intent_router import INTENTS, IntentModel, load_examples, load_intent_model
+
+NO_LLM_INTENTS = ("greeting", "off_topic")
+
+def cross_validate(examples: List[Tuple[str, str]], folds: int, seed: int = 0) -> Dict[str, object]:
+    order = list(range(len(examples)))
+    random.Random(seed).shuffle(order)
+    correct, confident, confident_correct = 0, 0, 0
+    per_intent = {intent: [0, 0] for intent in INTENTS}
+    misrouted = []
+    for fold in range(folds):
+        held_out = set(order[fold::folds])
+        model = IntentModel.train([examples[index] for index in order if index not in held_out])
+        for index in held_out:
+            label, question = examples[index]
+            intent, confidence = model.predict(question)
+            per_intent[label][1] += 1
+            if intent == label:
+                correct += 1
+                per_intent[label][0] += 1
+            if confidence >= INTENT_MIN_CONFIDENCE:
+                confident += 1
+                confident_correct += intent == label
+                # Salah rute yang merugikan: pertanyaan sekolah dijawab template / ditolak
+                if intent in NO_LLM_INTENTS and label not in NO_LLM_INTENTS:
+                    misrouted.append((question, label, intent, round(confidence, 3)))
+    return {
+        "accuracy": round(correct / len(examples), 3),
+        "confident": confident,
+        "confident_accuracy": round(confident_correct / confident, 3) if confident else 0.0,
+        "per_intent": {intent: round(hit / total, 3) if total else 0.0 for intent, (hit, total) in per_intent.items()},
+        "misrouted": misrouted
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latih intent router")
+    parser.add_argument("--data", default=INTENT_DATA_PATH)
+    parser.add_argument("--out", default=INTENT_MODEL_PATH)
+    parser.add_argument("--folds", type=int, default=5)
+    args = parser.parse_args()
+    
+    examples = load_examples(args.data)
+    report = cross_validate(examples, args.folds)
+    print(f"{len(examples)} contoh, {args.folds}-fold: akurasi {report['accuracy']}, "
+          f"confidence >= {INTENT_MIN_CONFIDENCE}: {report['confident']} contoh, akurasi {report['confident_accuracy']}")
+    print("per intent: " + ", ".join(f"{intent} {value}" for intent, value in report["per_intent"].items()))
+    for question, label, intent, confidence in report["misrouted"]:
+        print(f"  salah rute {label} -> {intent} ({confidence}): {question}")
+    
+    if os.path.exists(args.out):
+        os.remove(args.out)
+    _, info = load_intent_model(args.data, args.out)
+    
+    # Verifikasi: proses baru cukup memuat bobot tanpa training
+    start = time.perf_counter()
+    _, check = load_intent_model(args.data, args.out)
+    load_ms = (time.perf_counter() - start) * 1000
+    if check["source"] != "json":
+        print(f"Gagal menulis model ke {args.out}")
+        sys.exit(1)
+    print(f"{args.out}: {os.path.getsize(args.out) / 1024:.1f} KB, {info['features']} fitur, "
+          f"training {info['load_ms']:.1f} ms vs load {load_ms:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Batch: duplikat dengan ejaan berbeda berbagi satu LLM call, metadata tetap milik masing-masing item
+"""
+import asyncio
+from app.core.llm_gateway import LLMGateway
+from app.services.answer_service import AnswerService
+from app.services.cache_backends import MemoryBackend
+from app.services.cache_service import CacheService
+from benchmarks.fake_llm import FakeChatModel
+
+def make_service() -> AnswerService:
+    service = AnswerService(cache=CacheService(MemoryBackend(), warm_entries=0))
+    service.llm = LLMGateway(FakeChatModel(0.0, ttft=0.0), requests_per_minute=0)
+    service.admission.enabled = False
+    return service
+
+def test_coalesced_duplicates_keep_their_own_normalization():
+    service = make_service()
+    questions = ["fasilitas lab kuliner", "fasilitass lab kulinr", "fasilitas lab kuliner", "fasiltas lab kulinr"]
+    keys = {service.cache._generate_key(service._normalize(question)[0]) for question in questions}
+    assert len(keys) == 1
+    
+    batch = asyncio.run(service.aget_answers_batch(questions))
+    results = batch["results"]
+    assert batch["metadata"]["llm_groups"] == 1
+    assert len({result["jawaban"] for result in results}) == 1
+    
+    assert "normalized" not in results[0]["metadata"]
+    assert "normalized" not in results[2]["metadata"]
+    assert results[1]["metadata"]["normalized"]["corrections"] == service._normalize(questions[1])[1]["corrections"]
+    assert results[3]["metadata"]["normalized"]["corrections"] == service._normalize(questions[3])[1]["corrections"]
+    assert [bool(result["metadata"].get("coalesced")) for result in results] == [False, True, True, True]
@@ -0,0 +1,36 @@
+"""
+Answer table: jawaban prerender di-memory-map, hanya aktif untuk data yang sama
+"""
+from app.services.answer_table import AnswerTable, write_answer_table
+
+ANSWERS = {
+    "jurusan apa saja?": "Ada enam jurusan.",
+    "berapa biaya spp": "SPP gratis.",
+}
+
+def test_lookup_by_normalized_question(tmp_path):
+    path = str(tmp_path / "answers.bin")
+    write_answer_table(path, ANSWERS, "hash-data")
+    table = AnswerTable(path)
+    assert table.load("hash-data")
+    
+    assert table.lookup("apa saja jurusan di smkn 4") == "Ada enam jurusan."
+    assert table.lookup("Berapa biaya SPP?") == "SPP gratis."
+    assert table.lookup("kapan pendaftaran dibuka") is None
+    assert table.stats()["hits"] == 2 and table.stats()["misses"] == 1
+    assert table.contains("jurusan apa saja")
+    table.close()
+
+def test_inactive_when_data_changed(tmp_path):
+    path = str(tmp_path / "answers.bin")
+    write_answer_table(path, ANSWERS, "hash-lama")
+    table = AnswerTable(path)
+    assert not table.load("hash-baru")
+    assert table.lookup("jurusan apa saja") is None
+    assert not table.stats()["active"]
+    table.close()
+
+def test_missing_artifact_is_inactive(tmp_path):
+    table = AnswerTable(str(tmp_path / "tidak-ada.bin"))
+    assert not table.load("hash-data")
+    assert table.lookup("jurusan apa saja") is None
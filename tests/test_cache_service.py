@@ -0,0 +1,61 @@
+"""
+CacheService async: backend dengan I/O tidak dipanggil di thread event loop
+"""
+import asyncio
+import threading
+from app.services.answer_service import answer_service
+from app.services.cache_backends import MemoryBackend, NamespacedBackend, SQLiteBackend
+from app.services.cache_service import CacheService
+
+class RecordingBackend(MemoryBackend):
+    """
+    Memory backend yang mencatat thread pemanggil get/set
+    """
+    def __init__(self, blocking: bool):
+        super().__init__()
+        self.blocking = blocking
+        self.threads = []
+    
+    def get(self, key):
+        self.threads.append(threading.get_ident())
+        return super().get(key)
+    
+    def set(self, key, question, value, sections=()):
+        self.threads.append(threading.get_ident())
+        super().set(key, question, value, sections)
+
+async def roundtrip(cache: CacheService):
+    await cache.aset("jadwal bengkel las", "Senin sampai Jumat.")
+    return await cache.aget("jadwal bengkel las"), threading.get_ident()
+
+def test_blocking_backend_runs_off_the_event_loop():
+    backend = RecordingBackend(blocking=True)
+    value, loop_thread = asyncio.run(roundtrip(CacheService(backend=backend, warm_entries=0)))
+    assert value == "Senin sampai Jumat."
+    assert len(backend.threads) == 2 and loop_thread not in backend.threads
+
+def test_memory_backend_stays_inline():
+    backend = RecordingBackend(blocking=False)
+    value, loop_thread = asyncio.run(roundtrip(CacheService(backend=backend, warm_entries=0)))
+    assert value == "Senin sampai Jumat."
+    assert backend.threads == [loop_thread, loop_thread]
+
+def test_backend_blocking_flags(tmp_path):
+    sqlite = SQLiteBackend(str(tmp_path / "cache.db"))
+    assert MemoryBackend.blocking is False and sqlite.blocking is True
+    assert NamespacedBackend(sqlite, "sekolah-a").blocking is True
+    assert NamespacedBackend(MemoryBackend(), "sekolah-b").blocking is False
+
+def test_async_cache_hit_reads_backend_in_thread(monkeypatch):
+    backend = RecordingBackend(blocking=True)
+    cache = CacheService(backend=backend, warm_entries=0)
+    cache.set("bagaimana suasana bengkel las", "Bengkel las luas dan lengkap.")
+    backend.threads.clear()
+    monkeypatch.setattr(answer_service, "cache", cache)
+    
+    async def ask():
+        return await answer_service.aget_answer("bagaimana suasana bengkel las"), threading.get_ident()
+    
+    result, loop_thread = asyncio.run(ask())
+    assert result["source"] == "cache"
+    assert backend.threads and loop_thread not in backend.threads
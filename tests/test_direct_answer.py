@@ -0,0 +1,68 @@
+"""
+Direct answer rule: hanya menjawab pertanyaan tentang data profil sekolah itu sendiri
+"""
+import json
+import os
+import pytest
+from app.services.answer_service import answer_service
+from app.services.direct_answer import DirectAnswerEngine
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "info_sekolah.json")
+
+@pytest.fixture(scope="module")
+def engine():
+    with open(DATA_PATH, encoding="utf-8") as f:
+        return DirectAnswerEngine(json.load(f))
+
+@pytest.mark.parametrize("question, rule", [
+    ("alamat sekolah dimana?", "alamat"),
+    ("smkn 4 bojonegoro di mana?", "alamat"),
+    ("dimana alamatnya", "alamat"),
+    ("alamatnya dimana?", "alamat"),
+    ("lokasinya di mana ya kak", "alamat"),
+    ("email sekolah apa", "email"),
+    ("instagram smkn 4", "instagram"),
+    ("ig nya apa", "instagram"),
+    ("no telp sekolah", "telepon"),
+    ("website sekolah", "website"),
+    ("kapan sekolah ini didirikan", "tahun_berdiri"),
+    ("jumlah guru", "jumlah_guru"),
+    ("berapa jumlah siswa", "jumlah_siswa"),
+    ("siapa kepala sekolah", "kepala_sekolah"),
+])
+def test_profile_questions_are_answered(engine, question, rule):
+    before = engine.hits[rule]
+    assert engine.match(question) is not None
+    assert engine.hits[rule] == before + 1
+
+@pytest.mark.parametrize("question", [
+    "dimana ruang lab RPL?",
+    "dimana kantinnya",
+    "dimana rumah pak budi",
+    "PKL dimana saja?",
+    "alamat email pak budi",
+    "email guru bahasa inggris",
+    "ig osis apa",
+    "nomor hp kepala sekolah",
+    "kapan ekskul pramuka didirikan",
+    "berapa jumlah siswa per kelas",
+    "jumlah siswa laki laki",
+    "berapa jumlah guru jurusan rpl",
+    "website ppdb",
+    "siapa wakil kepala sekolah",
+])
+def test_unrelated_questions_are_not_answered(engine, question):
+    assert engine.match(question, count=False) is None
+
+def test_ig_matches_whole_word_only(engine):
+    assert engine.match("big data itu apa", count=False) is None
+
+def test_title_is_separated_without_double_period(engine):
+    answer = engine.match("siapa kepala sekolah", count=False)
+    assert answer.endswith("Abdul Fatah, S.Pd., M.MPd.")
+    assert ".." not in answer
+
+def test_slang_address_question_is_answered():
+    result = answer_service.get_answer("dmn alamatnya")
+    assert result["source"] == "direct"
+    assert "berlokasi di" in result["jawaban"]
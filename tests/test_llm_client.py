@@ -0,0 +1,31 @@
+"""
+Client LLM asli (langchain-groq versi yang di-pin) bisa dibuat dengan opsi pool dari get_llm()
+"""
+import os
+import re
+from importlib.metadata import version
+import httpx
+import pytest
+from app.core.llm import get_llm
+
+REQUIREMENTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "requirements.txt")
+
+def pinned(package: str) -> str:
+    with open(REQUIREMENTS, encoding="utf-8") as f:
+        for line in f:
+            match = re.match(rf"{re.escape(package)}(\[[^\]]*\])?==(\S+)", line.strip())
+            if match:
+                return match.group(2)
+    raise AssertionError(f"{package} tidak di-pin di requirements.txt")
+
+@pytest.mark.parametrize("package", ["langchain-groq", "langchain-core", "groq", "httpx", "pydantic"])
+def test_installed_matches_pin(package):
+    assert version(package) == pinned(package)
+
+def test_get_llm_builds_pooled_client():
+    llm = get_llm()
+    assert llm.max_retries == 0
+    assert isinstance(llm.client._client._client, httpx.Client)
+    assert isinstance(llm.async_client._client._client, httpx.AsyncClient)
+    assert "http_client" not in llm.model_kwargs
+    assert "http_async_client" not in llm.model_kwargs
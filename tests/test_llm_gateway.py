@@ -0,0 +1,90 @@
+"""
+LLM gateway: sinyal AIMD dari error dan antrian FIFO
+"""
+import asyncio
+import threading
+import time
+import pytest
+from app.core.llm_gateway import LLMGateway, LLMUnavailableError
+from benchmarks.fake_llm import FakeMessage, FakeProviderError
+
+class FailingLLM:
+    def __init__(self, error: Exception):
+        self.error = error
+    
+    def invoke(self, prompt: str):
+        raise self.error
+    
+    async def ainvoke(self, prompt: str):
+        raise self.error
+
+class RecordingLLM:
+    def __init__(self):
+        self.order = []
+    
+    async def ainvoke(self, prompt: str):
+        self.order.append(prompt)
+        await asyncio.sleep(0.01)
+        return FakeMessage(prompt)
+
+@pytest.mark.parametrize("error", [FakeProviderError(500, "Internal error"), ConnectionError("reset")])
+def test_fast_server_failures_do_not_raise_limit(error):
+    gateway = LLMGateway(FailingLLM(error), requests_per_minute=0, max_retries=0)
+    initial = gateway.limiter.limit
+    for _ in range(20):
+        with pytest.raises(LLMUnavailableError):
+            gateway.invoke("q")
+    assert gateway.limiter.limit < initial
+    assert gateway.limiter.in_flight == 0
+
+def test_request_errors_leave_limit_unchanged():
+    gateway = LLMGateway(FailingLLM(FakeProviderError(400, "bad request")), requests_per_minute=0, max_retries=0)
+    initial = gateway.limiter.limit
+    for _ in range(5):
+        with pytest.raises(LLMUnavailableError):
+            gateway.invoke("q")
+    assert gateway.limiter.limit == initial
+
+def test_waiters_are_admitted_in_fifo_order():
+    llm = RecordingLLM()
+    gateway = LLMGateway(llm, requests_per_minute=0, queue_timeout=5)
+    gateway.limiter.limit = gateway.limiter.maximum = 1.0
+    
+    async def run():
+        tasks = []
+        for index in range(6):
+            tasks.append(asyncio.create_task(gateway.ainvoke(str(index))))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+    
+    asyncio.run(run())
+    assert llm.order == [str(index) for index in range(6)]
+    assert gateway.queued == 0
+
+def test_sync_waiter_is_woken_by_release():
+    gateway = LLMGateway(RecordingLLM(), requests_per_minute=0, queue_timeout=5)
+    gateway.limiter.limit = gateway.limiter.maximum = 1.0
+    gateway._acquire(time.monotonic() + 1)
+    admitted = threading.Event()
+    
+    def waiter():
+        gateway._acquire(time.monotonic() + 5)
+        admitted.set()
+    
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.05)
+    assert not admitted.is_set() and gateway.queued == 1
+    start = time.monotonic()
+    gateway._release(0.01)
+    assert admitted.wait(1)
+    assert time.monotonic() - start < 0.5
+    thread.join()
+
+def test_queue_deadline_raises_and_leaves_queue():
+    gateway = LLMGateway(RecordingLLM(), requests_per_minute=0)
+    gateway.limiter.limit = 1.0
+    gateway._acquire(time.monotonic() + 1)
+    with pytest.raises(LLMUnavailableError):
+        gateway._acquire(time.monotonic() + 0.05)
+    assert gateway.queued == 0
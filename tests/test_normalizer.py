@@ -0,0 +1,45 @@
+"""
+Normalizer: slang dan typo ditulis ulang sebelum direct answer dan cache
+"""
+from app.services.answer_service import answer_service
+from app.services.normalizer import QuestionNormalizer
+
+normalizer = QuestionNormalizer()
+
+def test_slang_and_typos_are_rewritten():
+    question, corrections = normalizer.normalize("brp siswa")
+    assert question == "berapa siswa"
+    assert corrections
+    
+    question, _ = normalizer.normalize("jurusn apa saja yg ada")
+    assert "jurusan" in question.split()
+
+def test_correct_question_is_untouched():
+    assert normalizer.normalize("berapa jumlah siswa") == ("berapa jumlah siswa", [])
+
+def test_short_and_numeric_tokens_are_kept():
+    question, _ = normalizer.normalize("jadwal kelas 10 rpl")
+    assert "10" in question.split() and "rpl" in question.split()
+
+def test_normalized_question_reaches_direct_answer():
+    result = answer_service.get_answer("brp siswa")
+    assert result["source"] == "direct"
+    assert result["metadata"]["normalized"]["question"] == "berapa siswa"
+
+def test_conversion_is_checked_when_stats_are_read(monkeypatch):
+    answer_service.check_conversions()
+    checks = []
+    get_direct_answer = answer_service.retrieval.get_direct_answer
+    
+    def recording(question, count=True):
+        if not count:
+            checks.append(question)
+        return get_direct_answer(question, count=count)
+    
+    monkeypatch.setattr(answer_service.retrieval, "get_direct_answer", recording)
+    before = answer_service.normalizer.stats()["converted"]["direct"]
+    assert answer_service.get_answer("brp siswa")["source"] == "direct"
+    assert checks == []
+    
+    assert answer_service.get_stats()["normalizer"]["converted"]["direct"] == before + 1
+    assert checks == ["brp siswa"]
@@ -0,0 +1,44 @@
+"""
+Structured query: jawaban pasti dari indeks data, atau menolak (diserahkan ke retrieval / LLM)
+"""
+import json
+import os
+import pytest
+from app.services.answer_service import answer_service
+from app.services.query_engine import StructuredQueryEngine
+from app.services.retrieval_service import JURUSAN_ALIASES
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "info_sekolah.json")
+
+@pytest.fixture(scope="module")
+def engine():
+    with open(DATA_PATH, encoding="utf-8") as f:
+        return StructuredQueryEngine(json.load(f), JURUSAN_ALIASES)
+
+def test_classes_per_jurusan(engine):
+    name, answer = engine.match("berapa kelas jurusan rpl")
+    assert name == "kelas_jurusan"
+    assert "Rekayasa Perangkat Lunak" in answer and "4 kelas" in answer
+
+def test_achievements_by_year(engine):
+    name, answer = engine.match("prestasi tahun 2023")
+    assert name == "prestasi"
+    assert "2023" in answer and "Web Development" in answer
+
+def test_alias_resolves_to_data_name(engine):
+    name, answer = engine.match("berapa kelas jurusan tata boga")
+    assert "Kuliner" in answer
+
+def test_unknown_jurusan_is_declined(engine):
+    declined = engine.declined
+    assert engine.match("berapa kelas jurusan animasi") is None
+    assert engine.declined == declined + 1
+
+@pytest.mark.parametrize("question", ["apa itu rpl", "jelaskan prestasi sekolah"])
+def test_explanations_are_left_to_the_llm(engine, question):
+    assert engine.match(question) is None
+
+def test_structured_source_through_answer_service():
+    result = answer_service.get_answer("ada berapa kelas teknik pengelasan")
+    assert result["source"] == "structured"
+    assert "2 kelas" in result["jawaban"]
@@ -0,0 +1,74 @@
+"""
+Admission control: burst per client lalu 429 + Retry-After, kuota LLM per client, antrean LLM penuh
+"""
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.core import rate_limit
+from app.core.rate_limit import AdmissionController, GCRALimiter, OverloadedError
+import main
+
+class FakeBucket:
+    rate = 1.0
+    tokens = 0.0
+
+class FakeGateway:
+    def __init__(self, queued: int = 0):
+        self.queued = queued
+        self.queue_timeout = 5.0
+        self.bucket = FakeBucket()
+
+def test_gcra_allows_burst_then_waits():
+    limiter = GCRALimiter(per_minute=60, burst=3)
+    assert [limiter.acquire("ip:a", now=100.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    wait = limiter.acquire("ip:a", now=100.0)
+    assert wait == pytest.approx(1.0)
+    assert limiter.acquire("ip:b", now=100.0) == 0.0
+    assert limiter.acquire("ip:a", now=101.0) == 0.0
+
+def test_burst_then_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(main.admission, "enabled", True)
+    monkeypatch.setattr(main.admission, "requests", GCRALimiter(per_minute=60, burst=2))
+    client = TestClient(main.app)
+    statuses = [client.post("/ask", json={"question": "jurusan apa saja"}) for _ in range(3)]
+    
+    assert [response.status_code for response in statuses] == [200, 200, 429]
+    rejected = statuses[-1]
+    assert rejected.headers["retry-after"] == "1"
+    assert rejected.json()["reason"] == "client_rate_limited"
+    # Client lain punya bucket sendiri
+    other = client.post("/ask", json={"question": "jurusan apa saja"}, headers={"X-API-Key": "lain"})
+    assert other.status_code == 200
+
+def test_llm_quota_per_client():
+    controller = AdmissionController(gateway=FakeGateway())
+    controller.enabled = True
+    controller.llm_requests = GCRALimiter(per_minute=6, burst=1)
+    token = rate_limit._current_client.set("ip:a")
+    try:
+        controller.admit_llm()
+        with pytest.raises(OverloadedError) as error:
+            controller.admit_llm()
+    finally:
+        rate_limit._current_client.reset(token)
+    assert error.value.reason == "client_llm_quota"
+    assert error.value.retry_after == pytest.approx(10.0, rel=0.01)
+    # Tanpa client (script in-process) selalu diterima
+    controller.admit_llm()
+
+def test_full_llm_queue_sheds_load():
+    controller = AdmissionController(gateway=FakeGateway(queued=100))
+    controller.enabled = True
+    token = rate_limit._current_client.set("ip:a")
+    try:
+        with pytest.raises(OverloadedError) as error:
+            controller.admit_llm()
+    finally:
+        rate_limit._current_client.reset(token)
+    assert error.value.reason == "llm_queue_full"
+    assert error.value.retry_after > 0
+
+def test_overloaded_handler_sets_retry_after():
+    response = asyncio.run(main.overloaded_handler(None, OverloadedError("llm_queue_full", 2.2)))
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "3"
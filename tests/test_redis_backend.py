@@ -0,0 +1,67 @@
+"""
+RedisBackend (fakeredis): hot set dan section set tidak tumbuh tanpa batas
+"""
+import time
+import pytest
+from app.services.cache_backends import NamespacedBackend, RedisBackend
+
+fakeredis = pytest.importorskip("fakeredis")
+
+PREFIX = "test:cache:"
+
+def make_backend(**kwargs) -> RedisBackend:
+    return RedisBackend(client=fakeredis.FakeRedis(decode_responses=True), prefix=PREFIX, **kwargs)
+
+def section_members(backend: RedisBackend, section: str) -> set:
+    return backend._client.smembers(backend._section_key(section))
+
+def test_overflow_trims_hot_set_and_sections():
+    backend = make_backend(max_entries=10)
+    removed = []
+    backend.on_remove = removed.append
+    for index in range(10):
+        backend.set(f"k{index}", f"q{index}", "v", ["profil"])
+    for index in range(1, 10):
+        backend.get(f"k{index}")
+    backend.set("k10", "q10", "v", ["profil"])
+    
+    assert len(backend) == 10
+    assert removed == ["k0"]
+    assert backend.get("k0") is None
+    assert "k0" not in section_members(backend, "profil")
+    assert backend._client.hlen(backend._meta_key) == 10
+    assert backend._client.zcard(backend._expiry_key) == 10
+    assert backend.stats()["evictions"] == 1
+
+def test_sweep_removes_expired_members():
+    backend = make_backend(ttl=1, max_entries=100)
+    for index in range(5):
+        backend.set(f"k{index}", f"q{index}", "v", ["jurusan", "profil"])
+    time.sleep(1.1)
+    backend.set("fresh", "q", "v", ["jurusan"])
+    
+    assert backend.sweep() == 5
+    assert len(backend) == 1
+    assert section_members(backend, "jurusan") == {"fresh"}
+    assert section_members(backend, "profil") == set()
+    assert backend._client.hkeys(backend._meta_key) == ["fresh"]
+
+def test_invalidate_and_delete_clean_other_sections():
+    backend = make_backend()
+    backend.set("a", "qa", "v", ["jurusan", "prestasi"])
+    backend.set("b", "qb", "v", ["prestasi"])
+    assert backend.invalidate_sections(["jurusan"]) == 1
+    assert section_members(backend, "prestasi") == {"b"}
+    backend.delete("b")
+    assert section_members(backend, "prestasi") == set()
+    assert len(backend) == 0
+    assert backend._client.hlen(backend._meta_key) == 0
+
+def test_namespace_clear_leaves_no_members():
+    backend = make_backend()
+    tenant = NamespacedBackend(backend, "sekolah2")
+    tenant.set("k", "q", "v", ["profil"])
+    backend.set("k", "q", "v", ["profil"])
+    tenant.clear()
+    assert section_members(backend, "sekolah2:profil") == set()
+    assert len(backend) == 1
@@ -0,0 +1,47 @@
+"""
+Reload data: file rusak / hilang tidak menggantikan snapshot yang sedang aktif
+"""
+import json
+import os
+import pytest
+from app.services.retrieval_service import RetrievalService
+
+DATA = {"profil": {"nama": "SMK Negeri 9 Contoh", "alamat": "Jl. Contoh 1"}}
+
+def write_data(path, text, mtime):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.utime(path, (mtime, mtime))
+
+@pytest.fixture
+def service(tmp_path):
+    path = str(tmp_path / "info_sekolah.json")
+    write_data(path, json.dumps(DATA), 1_000_000)
+    return RetrievalService(path, snapshot_path=None, school_name=None)
+
+@pytest.mark.parametrize("text", ["", "{\"profil\": {", "{}", "[]"])
+def test_invalid_file_keeps_old_snapshot(service, text):
+    write_data(service.data_path, text, 1_000_100)
+    result = service.reload()
+    assert result["reloaded"] is False
+    assert result["reason"].startswith("data tidak valid")
+    assert service.data == DATA
+    assert service._loaded_mtime == 1_000_000
+    assert service.stats()["failed_reloads"] == 1
+
+def test_missing_file_keeps_old_snapshot(service):
+    os.remove(service.data_path)
+    assert service.reload(force=True)["reloaded"] is False
+    assert service.data == DATA
+
+def test_fixed_file_is_picked_up_on_retry(service):
+    write_data(service.data_path, "{\"profil\": {", 1_000_100)
+    assert service.reload()["reloaded"] is False
+    
+    fixed = {"profil": {"nama": "SMK Negeri 9 Contoh", "alamat": "Jl. Baru 2"}}
+    write_data(service.data_path, json.dumps(fixed), 1_000_200)
+    result = service.reload()
+    assert result["reloaded"] is True and result["changed_sections"] == ["profil"]
+    assert service.data == fixed
+    assert service._loaded_mtime == 1_000_200
+    assert service.stats()["last_reload_error"] is None
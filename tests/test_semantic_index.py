@@ -0,0 +1,45 @@
+"""
+Semantic cache: near-duplicate cocok, pertanyaan yang beda satu token penting tidak
+"""
+import pytest
+from app.services.cache_backends import MemoryBackend
+from app.services.cache_service import CacheService
+from app.services.semantic_index import SemanticIndex
+
+THRESHOLD = 0.7
+
+DIFFERENT = [
+    ("bagaimana cara daftar kelas rpl untuk siswa baru tahun ini",
+     "bagaimana cara daftar kelas tkj untuk siswa baru tahun ini"),
+    ("berapa jumlah siswa yang diterima pada penerimaan tahun 2023",
+     "berapa jumlah siswa yang diterima pada penerimaan tahun 2022"),
+    ("jadwal pelajaran kelas 10 jurusan rekayasa perangkat lunak",
+     "jadwal pelajaran kelas 11 jurusan rekayasa perangkat lunak"),
+    ("syarat pendaftaran jalur prestasi ppdb sekolah",
+     "syarat pendaftaran jalur zonasi ppdb sekolah"),
+    ("siapa nama kepala sekolah smkn 4 bojonegoro sekarang",
+     "siapa nama wakil kepala sekolah smkn 4 bojonegoro sekarang"),
+]
+
+SIMILAR = [
+    ("jurusan apa saja?", "apa saja jurusan di smkn 4"),
+    ("fasilitas laboratorium komputer sekolah", "fasilitas laboratorium komputr sekolah"),
+]
+
+@pytest.mark.parametrize("cached, asked", DIFFERENT)
+def test_index_rejects_questions_differing_in_one_token(cached, asked):
+    index = SemanticIndex(THRESHOLD)
+    index.add("cached", cached)
+    assert index.lookup(asked) is None
+
+@pytest.mark.parametrize("cached, asked", SIMILAR)
+def test_index_matches_near_duplicates(cached, asked):
+    index = SemanticIndex(THRESHOLD)
+    index.add("cached", cached)
+    assert index.lookup(asked)[0] == "cached"
+
+@pytest.mark.parametrize("cached, asked", DIFFERENT)
+def test_cache_does_not_serve_other_answer(cached, asked):
+    cache = CacheService(MemoryBackend(), warm_entries=0)
+    cache.set(cached, "jawaban untuk pertanyaan lain")
+    assert cache.get(asked) is None
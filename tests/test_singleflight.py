@@ -0,0 +1,69 @@
+"""
+Single-flight async: pembatalan pemanggil pertama tidak menggagalkan duplikat
+"""
+import asyncio
+import pytest
+from app.core.singleflight import SingleFlight
+
+def test_followers_survive_leader_cancellation():
+    flight = SingleFlight()
+    calls = []
+    
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "jawaban"
+    
+    async def run():
+        leader = asyncio.create_task(flight.ado("k", work))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flight.ado("k", work)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+    
+    assert asyncio.run(run()) == [("jawaban", True)] * 3
+    assert calls == [1]
+    assert not flight.in_flight("k")
+
+def test_work_is_cancelled_when_every_caller_leaves():
+    flight = SingleFlight()
+    state = {"finished": False, "cancelled": False}
+    
+    async def work():
+        try:
+            await asyncio.sleep(0.05)
+            state["finished"] = True
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+    
+    async def run():
+        callers = [asyncio.create_task(flight.ado("k", work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        assert not flight.in_flight("k")
+        # Pemanggil baru memulai pekerjaan baru, bukan menumpang task yang dibatalkan
+        return await flight.ado("k", work)
+    
+    assert asyncio.run(run()) == (None, False)
+    assert state["cancelled"] and state["finished"]
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight()
+    
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("provider error")
+    
+    async def run():
+        return await asyncio.gather(*(flight.ado("k", work) for _ in range(3)), return_exceptions=True)
+    
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.stats()["coalesced_calls"] == 2
@@ -0,0 +1,44 @@
+"""
+Multi-sekolah: tenant dimuat lazy dari TENANTS_DIR, sekolah tidak dikenal = 404
+"""
+import json
+import os
+import pytest
+from fastapi.testclient import TestClient
+from app.services.cache_backends import MemoryBackend
+from app.services.cache_service import CacheService
+from app.services.tenant_service import TenantService, UnknownTenantError
+import main
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "info_sekolah.json")
+
+@pytest.fixture
+def tenants(tmp_path):
+    with open(DATA_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    data["profil"]["nama"] = "SMK Negeri 9 Contoh"
+    data["jurusan"] = ["Kuliner", "Perhotelan"]
+    with open(tmp_path / "smkn9-contoh.json", "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return TenantService(tenants_dir=str(tmp_path), snapshot_dir=None,
+                         cache=CacheService(MemoryBackend(), warm_entries=0))
+
+def test_unknown_school_returns_404():
+    client = TestClient(main.app)
+    for school_id in ("sekolah-tidak-ada", "../info_sekolah"):
+        response = client.post("/ask", json={"question": "jurusan apa saja", "school_id": school_id})
+        assert response.status_code == 404
+        assert school_id in response.json()["detail"]
+
+def test_tenant_answers_from_its_own_data(tenants):
+    service = tenants.get("smkn9-contoh")
+    answer = service.get_answer("jurusan apa saja")
+    assert answer["source"] == "direct"
+    assert "2 jurusan" in answer["jawaban"] and "Kuliner" in answer["jawaban"]
+    assert tenants.get("smkn9-contoh") is service
+    assert tenants.loads == 1
+
+def test_default_service_without_school_id(tenants):
+    assert tenants.get(None) is main.answer_service
+    with pytest.raises(UnknownTenantError):
+        tenants.get("smkn9-lain")
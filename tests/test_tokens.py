@@ -0,0 +1,73 @@
+"""
+Tokenizer: encoding di-load sekali dengan batas waktu, gagal / macet = estimasi heuristik
+tokens_saved dihitung dari jumlah berjalan, tanpa tokenizer di jalur hit
+"""
+import sys
+import time
+import types
+import pytest
+from app.core import tokens
+from app.services import answer_service as answer_module
+
+@pytest.fixture
+def fresh_tokens(monkeypatch):
+    monkeypatch.setattr(tokens, "_encoding", None)
+    monkeypatch.setattr(tokens, "_encoding_loaded", False)
+    tokens.count_tokens.cache_clear()
+    yield tokens
+    tokens.count_tokens.cache_clear()
+
+def fake_tiktoken(get_encoding):
+    module = types.ModuleType("tiktoken")
+    module.get_encoding = get_encoding
+    return module
+
+def test_stalled_download_falls_back_to_heuristic(fresh_tokens, monkeypatch):
+    def stalled(name):
+        time.sleep(5)
+    
+    monkeypatch.setitem(sys.modules, "tiktoken", fake_tiktoken(stalled))
+    start = time.perf_counter()
+    assert fresh_tokens.load_encoding(timeout=0.1) is None
+    assert time.perf_counter() - start < 1
+    assert fresh_tokens.tokenizer_name() == "heuristic"
+    assert fresh_tokens.count_tokens("berapa jumlah siswa") == fresh_tokens._estimate_tokens("berapa jumlah siswa")
+
+def test_failed_download_falls_back_to_heuristic(fresh_tokens, monkeypatch):
+    def offline(name):
+        raise OSError("network unreachable")
+    
+    monkeypatch.setitem(sys.modules, "tiktoken", fake_tiktoken(offline))
+    assert fresh_tokens.load_encoding(timeout=1) is None
+    assert fresh_tokens.tokenizer_name() == "heuristic"
+
+def test_encoding_is_loaded_once(fresh_tokens, monkeypatch):
+    calls = []
+    
+    class Encoding:
+        def encode(self, text):
+            return text.split()
+    
+    def get_encoding(name):
+        calls.append(name)
+        return Encoding()
+    
+    monkeypatch.setitem(sys.modules, "tiktoken", fake_tiktoken(get_encoding))
+    fresh_tokens.load_encoding(timeout=1)
+    assert fresh_tokens.count_tokens("satu dua tiga") == 3
+    fresh_tokens.load_encoding(timeout=1)
+    assert calls == ["cl100k_base"]
+
+def test_saved_tokens_use_running_totals(monkeypatch):
+    def not_on_hit_path(*args):
+        raise AssertionError("tidak boleh dipanggil per jawaban")
+    
+    totals = answer_module._TokenTotals()
+    totals.add(300, 50, 200)
+    totals.add(500, 30, 120)
+    monkeypatch.setattr(answer_module, "LLM_TOKEN_TOTALS", totals)
+    monkeypatch.setattr(answer_module, "count_tokens", not_on_hit_path)
+    monkeypatch.setattr(answer_module.LLM_TOKENS, "values", not_on_hit_path)
+    
+    # rata-rata prompt 400 + 80 karakter x (80 token / 320 karakter)
+    assert answer_module.answer_service._record_saved_tokens("direct", "x" * 80) == 420